@@ -0,0 +1,292 @@
+"""Ejecución del pipeline completo sin interfaz gráfica (apto para cron).
+
+Ejemplo:
+    python cli.py --proyecto 3 --plantilla 7 --usuario superadmin \
+        --csv /datos/emision_marzo.csv --salida /srv/pdfs/marzo \
+        --workers 4 --chunk-size 500 --modo-salida combinado --progreso json
+
+Etapas: ingesta (CSVService) -> match (padrón) -> emision (PDFGenerator)
+        -> archivo (EmissionService: emisiones_final y acumulados).
+Si la emisión se interrumpe (Ctrl+C / SIGTERM) queda pausada con checkpoint y
+una nueva ejecución con el mismo --sesion la reanuda. En las demás etapas Ctrl+C
+interrumpe de inmediato (código 2; el match se descarta, la ingesta conserva los
+lotes ya insertados) y SIGTERM tiene su comportamiento por defecto.
+"""
+import argparse
+import contextlib
+import json
+import os
+import signal
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+ETAPAS = ('ingesta', 'match', 'emision', 'archivo')
+CODIGO_OK = 0
+CODIGO_ERROR = 1
+CODIGO_INTERRUMPIDO = 2
+
+
+class ReporteProgreso:
+    """Escribe el avance en texto legible o como líneas JSON (una por evento)"""
+
+    def __init__(self, formato: str, salida):
+        self.formato = formato
+        self.salida = salida
+        self.inicio_etapa = {}
+        self.resumen = {}
+        self._ultimo_reporte = 0.0
+
+    def iniciar_etapa(self, etapa: str):
+        self.inicio_etapa[etapa] = time.monotonic()
+        self.evento('inicio_etapa', etapa=etapa)
+
+    def terminar_etapa(self, etapa: str, **datos):
+        duracion = time.monotonic() - self.inicio_etapa.get(etapa, time.monotonic())
+        procesados = datos.get('procesados', 0)
+        datos['duracion_segundos'] = round(duracion, 3)
+        datos['por_segundo'] = round(procesados / duracion, 2) if duracion > 0 else None
+        self.resumen[etapa] = datos
+        self.evento('fin_etapa', etapa=etapa, **datos)
+
+    def progreso(self, etapa: str, procesados: int, total: int, forzar: bool = False):
+        """Reporta avance como máximo cada segundo (o al final)"""
+        ahora = time.monotonic()
+        if not forzar and procesados < total and ahora - self._ultimo_reporte < 1.0:
+            return
+        self._ultimo_reporte = ahora
+
+        transcurrido = ahora - self.inicio_etapa.get(etapa, ahora)
+        por_segundo = procesados / transcurrido if transcurrido > 0 else 0.0
+        eta = (total - procesados) / por_segundo if por_segundo > 0 else None
+        self.evento(
+            'progreso', etapa=etapa, procesados=procesados, total=total,
+            porcentaje=round(procesados * 100 / total, 1) if total else 0.0,
+            por_segundo=round(por_segundo, 2),
+            eta_segundos=round(eta, 1) if eta is not None else None
+        )
+
+    def evento(self, tipo: str, **datos):
+        if self.formato == 'json':
+            self.salida.write(json.dumps({'evento': tipo, 'ts': round(time.time(), 3), **datos},
+                                         ensure_ascii=False, default=str) + "\n")
+        else:
+            detalle = ", ".join(f"{k}={v}" for k, v in datos.items() if v is not None)
+            self.salida.write(f"[{time.strftime('%H:%M:%S')}] {tipo}: {detalle}\n")
+        self.salida.flush()
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Pipeline de emisión sin interfaz gráfica")
+    parser.add_argument('--proyecto', type=int, required=True, help="ID del proyecto")
+    parser.add_argument('--plantilla', type=int, required=True, help="ID de la plantilla")
+    parser.add_argument('--usuario', required=True, help="Usuario (nombre de usuario o ID) que ejecuta")
+    parser.add_argument('--csv', help="CSV de emisión a cargar (requerido para la etapa de ingesta)")
+    parser.add_argument('--sesion', help="Sesión existente a reutilizar o reanudar")
+    parser.add_argument('--salida', required=True, help="Carpeta de salida de los PDFs")
+    parser.add_argument('--etapas', default=",".join(ETAPAS),
+                        help=f"Etapas a ejecutar separadas por coma ({','.join(ETAPAS)})")
+    parser.add_argument('--workers', type=int, default=1, help="Procesos para generar PDFs en paralelo")
+    parser.add_argument('--chunk-size', type=int, default=100, help="Registros por lote (checkpoint)")
+    parser.add_argument('--modo-salida', choices=('individual', 'combinado'), default='individual',
+                        help="individual: un PDF por registro; combinado: además un PDF único")
+    parser.add_argument('--dias-acumulacion', type=int, default=30,
+                        help="Antigüedad (días) para mover emisiones finales a acumulados")
+    parser.add_argument('--estrategia-match', choices=('sql', 'indice'), default=None,
+                        help="sql: consulta por registro; indice: índice de claves en memoria "
+                             "(por defecto MATCH_STRATEGY)")
+    parser.add_argument('--progreso', choices=('texto', 'json'), default='texto',
+                        help="Formato del avance en la salida estándar")
+    parser.add_argument('--dir-metricas', default=None,
+                        help="Carpeta del reporte de métricas JSON/.prom (por defecto METRICS_DIR)")
+    return parser
+
+
+def resolver_usuario(db, valor: str):
+    from core.models import Usuario
+    if valor.isdigit():
+        return db.query(Usuario).filter(Usuario.id == int(valor)).first()
+    return db.query(Usuario).filter(Usuario.usuario == valor).first()
+
+
+def escribir_metricas(metricas, directorio, reporte: ReporteProgreso):
+    """Reporte JSON y textfile de Prometheus de la corrida"""
+    try:
+        rutas = metricas.escribir_reporte(directorio)
+        reporte.evento('metricas', documentos=metricas.reporte()['documentos'], **rutas)
+    except OSError as e:
+        reporte.evento('aviso', mensaje=f"No se pudo escribir el reporte de métricas: {e}")
+
+
+@contextlib.contextmanager
+def pausa_con_senales(interrupcion: dict, reporte: ReporteProgreso):
+    """Ctrl+C / SIGTERM piden pausa solo mientras dura la emisión (la única etapa con
+    checkpoint); al salir se restauran los manejadores anteriores"""
+    def al_interrumpir(signum, frame):
+        interrupcion['senal'] = 'pausada'
+        reporte.evento('interrupcion', mensaje="Se pausará al terminar el lote actual")
+
+    senales = [signal.SIGINT] + ([signal.SIGTERM] if hasattr(signal, 'SIGTERM') else [])
+    anteriores = {senal: signal.getsignal(senal) for senal in senales}
+    for senal in senales:
+        signal.signal(senal, al_interrumpir)
+    try:
+        yield
+    finally:
+        for senal, manejador in anteriores.items():
+            signal.signal(senal, manejador)
+
+
+def ejecutar_pipeline(args, reporte: ReporteProgreso) -> int:
+    from config.database import SessionBulk
+    from core.models import Proyecto, Plantilla
+    from core.csv_service import CSVService
+    from core.emission_service import EmissionService
+    from core.metricas_pipeline import MetricasPipeline
+
+    etapas = [e.strip() for e in args.etapas.split(',') if e.strip()]
+    invalidas = [e for e in etapas if e not in ETAPAS]
+    if invalidas:
+        reporte.evento('error', mensaje=f"Etapas no válidas: {', '.join(invalidas)}")
+        return CODIGO_ERROR
+    if 'ingesta' in etapas and not args.csv:
+        reporte.evento('error', mensaje="La etapa de ingesta requiere --csv")
+        return CODIGO_ERROR
+    if 'ingesta' not in etapas and not args.sesion:
+        reporte.evento('error', mensaje="Sin etapa de ingesta se requiere --sesion")
+        return CODIGO_ERROR
+
+    interrupcion = {'senal': None}
+
+    db = SessionBulk()
+    sesion_id = args.sesion
+    try:
+        proyecto = db.query(Proyecto).filter(Proyecto.id == args.proyecto).first()
+        plantilla = db.query(Plantilla).filter(Plantilla.id == args.plantilla,
+                                               Plantilla.proyecto_id == args.proyecto).first()
+        usuario = resolver_usuario(db, args.usuario)
+        if not proyecto or not plantilla or not usuario:
+            reporte.evento('error', mensaje="Proyecto, plantilla o usuario no encontrado")
+            return CODIGO_ERROR
+
+        sesion_id = args.sesion or str(uuid.uuid4())
+        reporte.evento('inicio', proyecto=proyecto.nombre, plantilla=plantilla.nombre,
+                       sesion_id=sesion_id, etapas=etapas, workers=args.workers,
+                       chunk_size=args.chunk_size)
+
+        csv_service = CSVService(db)
+        emission_service = EmissionService(db)
+        metricas = MetricasPipeline('cli', sesion_id)
+
+        if 'ingesta' in etapas:
+            reporte.iniciar_etapa('ingesta')
+            metricas.iniciar_etapa('ingesta')
+            exito, registros, errores = csv_service.procesar_csv(
+                args.csv, proyecto.id, usuario.id, sesion_id,
+                callback_progreso=lambda procesados, total: reporte.progreso('ingesta', procesados, total)
+            )
+            metricas.terminar_etapa('ingesta', registros, errores=len(errores))
+            reporte.terminar_etapa('ingesta', procesados=registros, errores=len(errores))
+            if not exito:
+                reporte.evento('error', etapa='ingesta', errores=errores[:10])
+                return CODIGO_ERROR
+
+        if 'match' in etapas:
+            reporte.iniciar_etapa('match')
+            metricas.iniciar_etapa('match')
+
+            def avance_match(procesados, total):
+                metricas.avance('match', procesados, total)
+                reporte.progreso('match', procesados, total)
+
+            exito, registros_match, errores = csv_service.hacer_match_padron(
+                proyecto.id, sesion_id, plantilla.id, args.estrategia_match,
+                callback_progreso=avance_match
+            )
+            stats = csv_service.obtener_estadisticas_sesion(sesion_id)
+            metricas.terminar_etapa('match', stats['total_registros'], match_ok=registros_match)
+            reporte.terminar_etapa('match', procesados=stats['total_registros'],
+                                   match_ok=registros_match, errores=len(errores))
+            if not exito:
+                reporte.evento('error', etapa='match', errores=errores[:10])
+                return CODIGO_ERROR
+
+        if 'emision' in etapas:
+            reporte.iniciar_etapa('emision')
+            ejecucion = emission_service.crear_o_reanudar_ejecucion(
+                proyecto.id, plantilla.id, sesion_id, usuario.id, args.salida, args.chunk_size
+            )
+            ejecucion_id = ejecucion.id
+            with pausa_con_senales(interrupcion, reporte):
+                estado, total, exitosos, errores = emission_service.ejecutar_emision(
+                    ejecucion_id,
+                    callback_progreso=lambda procesados, total, cuenta, exito: reporte.progreso('emision', procesados, total),
+                    verificar_control=lambda: interrupcion['senal'],
+                    workers=args.workers,
+                    metricas=metricas
+                )
+            reporte.terminar_etapa('emision', procesados=exitosos, total=total, estado=estado,
+                                   errores=len(errores))
+            if estado == 'pausada':
+                reporte.evento('pausado', sesion_id=sesion_id,
+                               mensaje=f"Reanudar con --sesion {sesion_id} --etapas emision,archivo")
+                escribir_metricas(metricas, args.dir_metricas, reporte)
+                return CODIGO_INTERRUMPIDO
+            if estado != 'completada':
+                reporte.evento('error', etapa='emision', errores=errores[:10])
+                return CODIGO_ERROR
+
+            if args.modo_salida == 'combinado':
+                ruta_combinado = os.path.join(args.salida, f"emision_{sesion_id[:8]}.pdf")
+                exito, documentos, errores = emission_service.combinar_pdfs_ejecucion(ejecucion_id, ruta_combinado)
+                reporte.evento('combinado', exito=exito, documentos=documentos,
+                               ruta=ruta_combinado, errores=errores[:10])
+
+        if 'archivo' in etapas:
+            reporte.iniciar_etapa('archivo')
+            metricas.iniciar_etapa('archivo')
+            exito, movidos, errores = emission_service.mover_a_emisiones_final(sesion_id, usuario.id)
+            metricas.terminar_etapa('archivo', movidos)
+            if not exito:
+                reporte.terminar_etapa('archivo', procesados=0, errores=len(errores))
+                reporte.evento('error', etapa='archivo', errores=errores[:10])
+                return CODIGO_ERROR
+            exito, acumulados, errores_acum = emission_service.acumular_emisiones(
+                proyecto.id, args.dias_acumulacion
+            )
+            reporte.terminar_etapa('archivo', procesados=movidos, acumulados=acumulados,
+                                   errores=len(errores) + len(errores_acum))
+
+        reporte.evento('fin', sesion_id=sesion_id, resumen=reporte.resumen)
+        escribir_metricas(metricas, args.dir_metricas, reporte)
+        return CODIGO_OK
+
+    except KeyboardInterrupt:
+        db.rollback()
+        reporte.evento('interrumpido', sesion_id=sesion_id,
+                       mensaje="Interrumpido fuera de la emisión; la etapa en curso no se completó")
+        return CODIGO_INTERRUMPIDO
+    except Exception as e:
+        db.rollback()
+        reporte.evento('error', mensaje=f"Error general: {str(e)}")
+        return CODIGO_ERROR
+    finally:
+        db.close()
+
+
+def main() -> int:
+    args = crear_parser().parse_args()
+    salida = sys.stdout
+    reporte = ReporteProgreso(args.progreso, salida)
+
+    if args.progreso == 'json':
+        # Los servicios escriben trazas con print: mandarlas a stderr para dejar stdout solo con JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            return ejecutar_pipeline(args, reporte)
+    return ejecutar_pipeline(args, reporte)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,120 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import NullPool
 from config.settings import settings
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_size=10,
-    max_overflow=20,
-    echo=False  # Cambiar a True para debug
-)
+# Claves de configuracion_sistema que ajustan el pool (se editan en PanelConfiguracion)
+CLAVES_POOL = ('db_max_conexiones', 'db_pool_timeout', 'db_pool_activo',
+               'db_pool_recycle', 'db_pool_pre_ping', 'db_statement_timeout')
+
+
+def leer_configuracion_pool() -> dict:
+    """Opciones de pool guardadas en configuracion_sistema (vacío si no hay tabla o conexión).
+    Abre una conexión aparte: solo la usa configurar_engine(), no la importación del módulo."""
+    bootstrap = create_engine(settings.DATABASE_URL, poolclass=NullPool,
+                              connect_args={'connect_timeout': 5})
+    try:
+        with bootstrap.connect() as conn:
+            filas = conn.execute(
+                text("SELECT clave, valor FROM configuracion_sistema WHERE clave = ANY(:claves)"),
+                {"claves": list(CLAVES_POOL)}
+            )
+            return {clave: valor for clave, valor in filas if valor not in (None, '')}
+    except Exception:
+        return {}
+    finally:
+        bootstrap.dispose()
+
+
+def opciones_engine(configuracion: dict = None) -> dict:
+    """Parámetros de create_engine para el uso interactivo: settings, con lo guardado encima"""
+    configuracion = configuracion or {}
+    es_verdadero = lambda valor: str(valor).lower() in ('1', 'true', 'si', 'sí')
+
+    statement_timeout_ms = int(configuracion.get('db_statement_timeout', settings.DB_STATEMENT_TIMEOUT_MS))
+    opciones = {
+        'pool_pre_ping': es_verdadero(configuracion.get('db_pool_pre_ping', settings.DB_POOL_PRE_PING)),
+        'echo': False,  # Cambiar a True para debug
+    }
+    if statement_timeout_ms > 0:
+        opciones['connect_args'] = {'options': f'-c statement_timeout={statement_timeout_ms}'}
+
+    if not es_verdadero(configuracion.get('db_pool_activo', True)):
+        opciones['poolclass'] = NullPool
+        return opciones
+
+    # Máx. conexiones es el tope total: pool fijo + desborde
+    max_conexiones = int(configuracion.get('db_max_conexiones', settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW))
+    pool_size = min(settings.DB_POOL_SIZE, max_conexiones)
+    opciones.update({
+        'pool_size': pool_size,
+        'max_overflow': max_conexiones - pool_size,
+        'pool_timeout': int(configuracion.get('db_pool_timeout', settings.DB_POOL_TIMEOUT)),
+        'pool_recycle': int(configuracion.get('db_pool_recycle', settings.DB_POOL_RECYCLE)),
+    })
+    return opciones
+
+
+def opciones_engine_bulk() -> dict:
+    """Perfil para trabajos masivos: sin tope de conexiones, sin statement_timeout
+    y lotes grandes en executemany / INSERT de varias filas"""
+    return {
+        'pool_size': settings.DB_BULK_POOL_SIZE,
+        'max_overflow': -1,
+        'pool_pre_ping': True,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'executemany_mode': 'values_plus_batch',
+        'insertmanyvalues_page_size': settings.DB_BULK_PAGE_SIZE,
+        'executemany_batch_page_size': settings.DB_BULK_BATCH_PAGE_SIZE,
+        'echo': False,
+    }
+
+
+def _crear_engine(opciones: dict):
+    nuevo = create_engine(settings.DATABASE_URL, **opciones)
+    if settings.SQL_METRICS_ENABLED:
+        from utils.metricas_sql import instalar_metricas_sql
+        instalar_metricas_sql(nuevo, settings.SQL_SLOW_MS)
+    return nuevo
+
+
+# Al importar solo se usan los valores de settings (sin tocar la BD). configurar_engine()
+# puede reemplazar el engine interactivo: obtenerlo siempre con get_engine(), no importarlo por nombre
+_engine = _crear_engine(opciones_engine())
+engine_bulk = _crear_engine(opciones_engine_bulk())
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+SessionBulk = sessionmaker(autocommit=False, autoflush=False, bind=engine_bulk)
+
+_pool_configurado = False
+
+
+def get_engine():
+    """Engine interactivo vigente"""
+    return _engine
+
+
+def configurar_engine():
+    """Aplica al engine interactivo las opciones de pool guardadas en configuracion_sistema.
+
+    Se llama una vez al arrancar (main.py, worker.py); lo que se cambie en el panel de
+    configuración se aplica hasta reiniciar la aplicación o el worker. Las sesiones
+    abiertas antes siguen con el engine anterior hasta cerrarse.
+    """
+    global _engine, _pool_configurado
+    if _pool_configurado:
+        return _engine
+    _pool_configurado = True
+
+    configuracion = leer_configuracion_pool()
+    if configuracion:
+        anterior = _engine
+        _engine = _crear_engine(opciones_engine(configuracion))
+        SessionLocal.configure(bind=_engine)
+        anterior.dispose()
+    return _engine
+
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 def get_db():
@@ -17,4 +122,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -11,12 +11,34 @@ class Settings:
     DB_USER = os.getenv("DB_USER", "postgres")
     DB_PASSWORD = os.getenv("DB_PASSWORD", "root")
     
+    # Pool de conexiones (configuracion_sistema tiene prioridad al arrancar, ver configurar_engine en config/database.py)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # Segundos esperando una conexión libre
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Reabrir conexiones con más de N segundos
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = sin límite
+    DB_BULK_POOL_SIZE = int(os.getenv("DB_BULK_POOL_SIZE", "2"))  # Perfil de trabajos masivos (worker, CLI)
+    DB_BULK_PAGE_SIZE = int(os.getenv("DB_BULK_PAGE_SIZE", "10000"))  # Filas por INSERT de varias filas
+    DB_BULK_BATCH_PAGE_SIZE = int(os.getenv("DB_BULK_BATCH_PAGE_SIZE", "1000"))  # Sentencias por lote en executemany
+    
     # App
     APP_NAME = "Sistema de Correspondencia"
     APP_VERSION = "1.0.0"
+    STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))  # Presupuesto de importación al arranque
+    PADRON_SCHEMA_TTL_SECONDS = float(os.getenv("PADRON_SCHEMA_TTL_SECONDS", "300"))  # Vigencia de la caché de esquemas
+    PADRON_SCHEMA_RELOAD_SECONDS = float(os.getenv("PADRON_SCHEMA_RELOAD_SECONDS", "10"))  # Mínimo entre recargas por un padrón desconocido
+    MATCH_STRATEGY = os.getenv("MATCH_STRATEGY", "sql")  # 'sql' (consulta por registro) o 'indice' (índice de claves en memoria)
+    KEY_INDEX_CACHE_DIR = os.getenv("KEY_INDEX_CACHE_DIR", os.path.join("cache", "indices_claves"))
+    SQL_METRICS_ENABLED = os.getenv("SQL_METRICS_ENABLED", "true").lower() == "true"  # Medición por sentencia (utils/metricas_sql.py)
+    SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "500"))  # Sentencias más lentas se registran como SQL lento
+    SQL_TOP_N = int(os.getenv("SQL_TOP_N", "10"))  # Sentencias en el resumen por trabajo
+    METRICS_DIR = os.getenv("METRICS_DIR", os.path.join("reportes", "metricas"))  # Reportes JSON y .prom de cada corrida
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))  # Eventos de bitácora por INSERT
+    AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "2"))  # Espera máxima antes de escribir un lote
     
     # Security
-    BCRYPT_ROUNDS = 12
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # Costo de bcrypt; los hashes con otro costo se regeneran al iniciar sesión
     
     @property
     def DATABASE_URL(self):
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 from core.models import Usuario, Bitacora
 from utils.logger import auditoria
+from utils.security import requiere_rehash, generar_hashes_password
+from typing import Dict, List, Tuple
 import datetime
 import socket
 
@@ -44,6 +46,10 @@ class AuthService:
                 self.registrar_intento_fallido(usuario, ip_address, user_agent, "Contraseña incorrecta")
                 return None, "Credenciales incorrectas"
             
+            # Regenerar el hash si se creó con otro costo (se guarda junto con el último login)
+            if requiere_rehash(user.contraseña_hash):
+                user.set_password(password)
+            
             # Actualizar último login
             user.ultimo_login = datetime.datetime.now()
             self.db.commit()
@@ -94,4 +100,55 @@ class AuthService:
             return False
         
         proyectos_permitidos = [p.strip() for p in usuario.proyecto_permitido.split(',')]
-        return str(proyecto_id) in proyectos_permitidos
\ No newline at end of file
+        return str(proyecto_id) in proyectos_permitidos
+
+    def crear_usuarios(self, usuarios: List[Dict], usuario_admin_id: int = None) -> Tuple[int, List[str]]:
+        """
+        Alta masiva de usuarios: dicts con nombre, usuario, password, rol y
+        opcionalmente proyecto_permitido. Los hashes se calculan en un pool de procesos.
+        Returns: (creados, errores)
+        """
+        errores = []
+        existentes = {
+            u for (u,) in self.db.query(Usuario.usuario).filter(
+                Usuario.usuario.in_([datos.get('usuario') for datos in usuarios])
+            )
+        }
+
+        validos = []
+        for datos in usuarios:
+            if not datos.get('usuario') or not datos.get('password') or not datos.get('rol'):
+                errores.append(f"Registro incompleto: {datos.get('usuario') or datos.get('nombre')}")
+            elif datos['usuario'] in existentes:
+                errores.append(f"El usuario {datos['usuario']} ya existe")
+            else:
+                existentes.add(datos['usuario'])
+                validos.append(datos)
+
+        if not validos:
+            return 0, errores
+
+        try:
+            hashes = generar_hashes_password([datos['password'] for datos in validos])
+            for datos, password_hash in zip(validos, hashes):
+                self.db.add(Usuario(
+                    nombre=datos.get('nombre') or datos['usuario'],
+                    usuario=datos['usuario'],
+                    contraseña_hash=password_hash,
+                    rol=datos['rol'],
+                    activo=True,
+                    proyecto_permitido=datos.get('proyecto_permitido')
+                ))
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            return 0, errores + [f"Error creando usuarios: {str(e)}"]
+
+        auditoria(
+            db=self.db,
+            usuario_id=usuario_admin_id,
+            accion="crear_usuarios",
+            modulo="auth",
+            detalles={"usuarios": [datos['usuario'] for datos in validos]}
+        )
+        return len(validos), errores
@@ -0,0 +1,80 @@
+# core/cache_match.py - Caché persistente de resultados de match
+"""Caché entre sesiones de (padrón, versión, clave normalizada) -> id en el padrón.
+
+Las mismas cuentas se emiten día tras día contra un padrón que cambia poco:
+cada clave se resuelve contra el padrón una sola vez por versión de datos.
+También se guardan los resultados sin match (padron_id NULL).
+
+La versión es config_json['version_datos'] del padrón; PadronService la
+incrementa en cada carga y borra aquí las entradas de ese padrón.
+"""
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+
+SEPARADOR_CLAVE = '\x1f'
+TAMANO_LOTE_CACHE = 5000
+
+
+def clave_cache_match(cuenta: Optional[str], codigo_afiliado: Optional[str], reglas: List[str]) -> str:
+    """Clave del registro tal como la compara el match: las reglas del proyecto tal cual
+    (sin reglas, el valor crudo; un ' 123' y un '123' son claves distintas)"""
+    from core.normalizacion_claves import normalizar_valor
+
+    return SEPARADOR_CLAVE.join(
+        normalizar_valor(valor or '', reglas) for valor in (cuenta, codigo_afiliado)
+    )
+
+
+def buscar_en_cache(db: Session, uuid_padron: str, version: int, firma_reglas: str,
+                    claves: Iterable[str]) -> Dict[str, Optional[int]]:
+    """{clave: id_padron o None} de las claves ya resueltas para esta versión"""
+    claves = list(claves)
+    resueltas = {}
+    query = text("""
+        SELECT clave, padron_id FROM cache_match_padron
+        WHERE uuid_padron = :uuid_padron AND version_datos = :version
+        AND firma_reglas = :firma AND clave IN :claves
+    """).bindparams(bindparam('claves', expanding=True))
+
+    for inicio in range(0, len(claves), TAMANO_LOTE_CACHE):
+        lote = claves[inicio:inicio + TAMANO_LOTE_CACHE]
+        for fila in db.execute(query, {
+            "uuid_padron": uuid_padron, "version": version, "firma": firma_reglas, "claves": lote
+        }):
+            resueltas[fila.clave] = fila.padron_id
+    return resueltas
+
+
+def guardar_en_cache(db: Session, uuid_padron: str, version: int, firma_reglas: str,
+                     resultados: Dict[str, Optional[int]]):
+    """Inserta o reemplaza resultados (se confirma con la transacción del match)"""
+    if not resultados:
+        return
+    from psycopg2.extras import execute_values
+
+    cursor = db.connection().connection.cursor()
+    execute_values(
+        cursor,
+        """
+        INSERT INTO cache_match_padron (uuid_padron, firma_reglas, clave, version_datos, padron_id)
+        VALUES %s
+        ON CONFLICT (uuid_padron, firma_reglas, clave)
+        DO UPDATE SET version_datos = EXCLUDED.version_datos, padron_id = EXCLUDED.padron_id,
+                      fecha_actualizacion = CURRENT_TIMESTAMP
+        """,
+        [(uuid_padron, firma_reglas, clave, version, id_padron) for clave, id_padron in resultados.items()],
+        page_size=1000
+    )
+
+
+def invalidar_cache_match(db: Session, uuid_padron: str, firma_reglas: Optional[str] = None):
+    """Descarta las entradas del padrón, o solo las de una firma de reglas
+    (dentro de la transacción en curso)"""
+    if firma_reglas is None:
+        db.execute(text("DELETE FROM cache_match_padron WHERE uuid_padron = :uuid_padron"),
+                   {"uuid_padron": uuid_padron})
+    else:
+        db.execute(text("DELETE FROM cache_match_padron WHERE uuid_padron = :uuid_padron "
+                        "AND firma_reglas = :firma"),
+                   {"uuid_padron": uuid_padron, "firma": firma_reglas})
@@ -0,0 +1,213 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from datetime import datetime, timedelta
+import threading
+from typing import Dict, List, Optional
+from core.models import TrabajoCola
+
+TIPOS_TRABAJO = ('ingesta', 'match', 'emision', 'archivo', 'carga_padron')
+ESTADOS_FINALES = ('completado', 'error', 'cancelado', 'pausado')
+INTERVALO_LATIDO_SEGUNDOS = 30  # Muy por debajo de minutos_sin_heartbeat de la recuperación
+
+
+class ColaTrabajosService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def encolar(self, tipo: str, parametros: Dict, usuario_id: int = None,
+                proyecto_id: int = None, prioridad: int = 0) -> TrabajoCola:
+        """Registra un trabajo nuevo en la cola"""
+        if tipo not in TIPOS_TRABAJO:
+            raise ValueError(f"Tipo de trabajo no soportado: {tipo}")
+
+        trabajo = TrabajoCola(
+            tipo=tipo,
+            estado='pendiente',
+            prioridad=prioridad,
+            parametros=parametros,
+            progreso=0,
+            mensaje="En cola",
+            intentos=0,
+            usuario_id=usuario_id,
+            proyecto_id=proyecto_id
+        )
+        self.db.add(trabajo)
+        self.db.commit()
+        return trabajo
+
+    def reclamar_trabajo(self, worker_id: str, tipos: List[str] = None) -> Optional[TrabajoCola]:
+        """Toma el siguiente trabajo pendiente; SKIP LOCKED permite varios workers en paralelo"""
+        filtro_tipos = "AND tipo = ANY(:tipos)" if tipos else ""
+        try:
+            fila = self.db.execute(text(f"""
+                UPDATE cola_trabajos
+                SET estado = 'en_proceso',
+                    worker_id = :worker_id,
+                    intentos = COALESCE(intentos, 0) + 1,
+                    fecha_inicio = NOW(),
+                    fecha_heartbeat = NOW(),
+                    mensaje = 'Iniciando'
+                WHERE id = (
+                    SELECT id FROM cola_trabajos
+                    WHERE estado = 'pendiente' {filtro_tipos}
+                    ORDER BY prioridad DESC, id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING id
+            """), {"worker_id": worker_id, "tipos": list(tipos or [])}).fetchone()
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        if not fila:
+            return None
+        return self.obtener_trabajo(fila[0])
+
+    def obtener_trabajo(self, trabajo_id: int) -> Optional[TrabajoCola]:
+        """Obtiene un trabajo con su estado más reciente"""
+        trabajo = self.db.query(TrabajoCola).filter(TrabajoCola.id == trabajo_id).first()
+        if trabajo:
+            self.db.refresh(trabajo)
+        return trabajo
+
+    def actualizar_progreso(self, trabajo_id: int, progreso: int, mensaje: str) -> Optional[str]:
+        """Guarda progreso y heartbeat; regresa la solicitud de control pendiente ('pausar'/'cancelar')"""
+        fila = self.db.execute(text("""
+            UPDATE cola_trabajos
+            SET progreso = :progreso, mensaje = :mensaje, fecha_heartbeat = NOW()
+            WHERE id = :id
+            RETURNING control
+        """), {"id": trabajo_id, "progreso": int(progreso), "mensaje": mensaje}).fetchone()
+        self.db.commit()
+        return fila[0] if fila else None
+
+    def latido(self, trabajo_id: int, worker_id: str) -> Optional[str]:
+        """Renueva el heartbeat mientras el trabajo siga asignado a este worker; regresa el control"""
+        fila = self.db.execute(text("""
+            UPDATE cola_trabajos
+            SET fecha_heartbeat = NOW()
+            WHERE id = :id AND worker_id = :worker_id AND estado = 'en_proceso'
+            RETURNING control
+        """), {"id": trabajo_id, "worker_id": worker_id}).fetchone()
+        self.db.commit()
+        return fila[0] if fila else None
+
+    def completar(self, trabajo_id: int, resultado: Dict, estado: str = 'completado'):
+        """Marca el trabajo como terminado"""
+        trabajo = self.obtener_trabajo(trabajo_id)
+        if not trabajo:
+            return
+        trabajo.estado = estado
+        trabajo.resultado = resultado
+        trabajo.progreso = 100 if estado == 'completado' else trabajo.progreso
+        trabajo.mensaje = resultado.get('mensaje', estado) if isinstance(resultado, dict) else estado
+        trabajo.fecha_fin = datetime.now()
+        self.db.commit()
+
+    def fallar(self, trabajo_id: int, error: str):
+        """Registra un error; el trabajo vuelve a la cola mientras tenga intentos"""
+        trabajo = self.obtener_trabajo(trabajo_id)
+        if not trabajo:
+            return
+        if (trabajo.intentos or 0) < (trabajo.max_intentos or 1) and trabajo.control != 'cancelar':
+            trabajo.estado = 'pendiente'
+            trabajo.worker_id = None
+            trabajo.mensaje = f"Reintento pendiente: {error}"
+        else:
+            trabajo.estado = 'error'
+            trabajo.mensaje = error
+            trabajo.resultado = {'errores': [error]}
+            trabajo.fecha_fin = datetime.now()
+        self.db.commit()
+
+    def solicitar_control(self, trabajo_id: int, control: str) -> bool:
+        """Pide a un trabajo pausar o cancelar; si aún no se toma se resuelve directamente"""
+        if control not in ('pausar', 'cancelar'):
+            raise ValueError(f"Control no soportado: {control}")
+
+        trabajo = self.obtener_trabajo(trabajo_id)
+        if not trabajo or trabajo.estado in ESTADOS_FINALES:
+            return False
+
+        if trabajo.estado == 'pendiente':
+            trabajo.estado = 'cancelado' if control == 'cancelar' else 'pausado'
+            trabajo.fecha_fin = datetime.now()
+        trabajo.control = control
+        self.db.commit()
+        return True
+
+    def recuperar_trabajos_abandonados(self, minutos_sin_heartbeat: int = 10) -> int:
+        """Trabajos de workers que dejaron de reportar: regresan a la cola mientras tengan
+        intentos; si ya no, o si se pidió cancelarlos, se cierran"""
+        limite = datetime.now() - timedelta(minutes=minutos_sin_heartbeat)
+        try:
+            cerrados = self.db.execute(text("""
+                UPDATE cola_trabajos
+                SET estado = CASE WHEN control = 'cancelar' THEN 'cancelado' ELSE 'error' END,
+                    worker_id = NULL,
+                    mensaje = CASE WHEN control = 'cancelar' THEN 'Cancelado (worker inactivo)'
+                                   ELSE 'Worker inactivo y sin intentos restantes' END,
+                    fecha_fin = NOW()
+                WHERE estado = 'en_proceso' AND fecha_heartbeat < :limite
+                  AND (control = 'cancelar' OR COALESCE(intentos, 0) >= COALESCE(max_intentos, 1))
+            """), {"limite": limite})
+            recuperados = self.db.execute(text("""
+                UPDATE cola_trabajos
+                SET estado = 'pendiente', worker_id = NULL, mensaje = 'Recuperado de worker inactivo'
+                WHERE estado = 'en_proceso' AND fecha_heartbeat < :limite
+            """), {"limite": limite})
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return (cerrados.rowcount or 0) + (recuperados.rowcount or 0)
+
+    def obtener_trabajos(self, usuario_id: int = None, proyecto_id: int = None,
+                         limite: int = 50) -> List[TrabajoCola]:
+        """Lista los trabajos más recientes"""
+        query = self.db.query(TrabajoCola)
+        if usuario_id:
+            query = query.filter(TrabajoCola.usuario_id == usuario_id)
+        if proyecto_id:
+            query = query.filter(TrabajoCola.proyecto_id == proyecto_id)
+        return query.order_by(TrabajoCola.id.desc()).limit(limite).all()
+
+
+class LatidoTrabajo:
+    """Hilo que mantiene fecha_heartbeat al día mientras se ejecuta un trabajo.
+
+    Las etapas largas (COPY, match, carga del padrón) no llaman a reportar durante
+    minutos; sin el latido otro worker recuperaría el trabajo y lo ejecutaría dos veces.
+    Usa su propia sesión para no mezclarse con la transacción del trabajo.
+    """
+
+    def __init__(self, trabajo_id: int, worker_id: str, intervalo: float = INTERVALO_LATIDO_SEGUNDOS):
+        self.trabajo_id = trabajo_id
+        self.worker_id = worker_id
+        self.intervalo = intervalo
+        self.detenido = threading.Event()
+        self.hilo = threading.Thread(target=self._bucle, name=f"latido-{trabajo_id}", daemon=True)
+
+    def __enter__(self):
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.detenido.set()
+        self.hilo.join(self.intervalo)
+        return False
+
+    def _bucle(self):
+        from config.database import SessionLocal
+
+        while not self.detenido.wait(self.intervalo):
+            db = SessionLocal()
+            try:
+                ColaTrabajosService(db).latido(self.trabajo_id, self.worker_id)
+            except Exception as e:
+                db.rollback()
+                print(f"⚠️ Latido del trabajo {self.trabajo_id}: {e}")
+            finally:
+                db.close()
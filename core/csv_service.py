@@ -2,12 +2,21 @@ import pandas as pd
 import csv
 import chardet
 from sqlalchemy.orm import Session
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Tuple, Optional
 import os
 from core.models import EmisionTemp, Proyecto
-from datetime import datetime
+from datetime import datetime, date
+from decimal import Decimal
 import uuid
-from sqlalchemy import text
+from sqlalchemy import text, func
+from core.normalizacion_claves import obtener_reglas, normalizar_serie, normalizar_valor, expresion_sql, firma_reglas
+from core.cache_match import clave_cache_match, buscar_en_cache, guardar_en_cache
+from utils.metricas_sql import medir_sql
+
+ESTRATEGIAS_MATCH = ('sql', 'indice')
+TAMANO_LOTE_MATCH = 5000  # ids del padrón por consulta en el match con índice
+INTERVALO_AVANCE_MATCH = 1000  # registros entre avisos de progreso del match por SQL
+TAMANO_LOTE_INGESTA = 1000  # registros por inserción masiva en emisiones_temp
 
 class CSVService:
     def __init__(self, db: Session):
@@ -66,10 +75,14 @@ class CSVService:
         except Exception as e:
             return False, [], [f"Error leyendo archivo: {str(e)}"]
     
+    @medir_sql('procesar_csv')
     def procesar_csv(self, file_path: str, proyecto_id: int, usuario_id: int, 
-                    sesion_id: str = None) -> Tuple[bool, int, List[str]]:
+                    sesion_id: str = None, callback_progreso: Callable = None,
+                    verificar_control: Callable = None) -> Tuple[bool, int, List[str]]:
         """
         Procesa el CSV y carga los datos en la tabla temporal
+        callback_progreso(procesados, total) se llama tras cada lote insertado
+        verificar_control() -> 'cancelada' detiene la carga y borra lo ya insertado de la sesión
         Retorna: (éxito, registros_procesados, errores)
         """
         if not sesion_id:
@@ -88,33 +101,52 @@ class CSVService:
             df = pd.read_csv(file_path, encoding=encoding, dtype=str)
             df = df.where(pd.notnull(df), None)  # Convertir NaN a None
             
+            # Claves normalizadas (vectorizado); datos_json conserva el valor original
+            reglas = self._reglas_normalizacion(proyecto_id)
+            claves = {}
+            for columna in ('cuenta', 'codigo_afiliado'):
+                if columna in df.columns:
+                    claves[columna] = normalizar_serie(df[columna], reglas).tolist()
+                else:
+                    claves[columna] = [''] * len(df)
+            
+            registros = df.to_dict('records')
+            fecha_carga = datetime.now()
             registros_procesados = 0
             errores_procesamiento = []
             
-            for index, row in df.iterrows():
+            for inicio in range(0, len(registros), TAMANO_LOTE_INGESTA):
+                fin = min(inicio + TAMANO_LOTE_INGESTA, len(registros))
+                lote = [
+                    {
+                        'proyecto_id': proyecto_id,
+                        'usuario_id': usuario_id,
+                        'datos_json': registros[i],
+                        'cuenta': claves['cuenta'][i],
+                        'codigo_afiliado': claves['codigo_afiliado'][i],
+                        'estado': 'pendiente',
+                        'sesion_id': sesion_id,
+                        'fecha_carga': fecha_carga
+                    }
+                    for i in range(inicio, fin)
+                ]
                 try:
-                    # Crear registro temporal
-                    registro_temp = EmisionTemp(
-                        proyecto_id=proyecto_id,
-                        usuario_id=usuario_id,
-                        datos_json=row.to_dict(),
-                        cuenta=row.get('cuenta', ''),
-                        codigo_afiliado=row.get('codigo_afiliado', ''),
-                        estado='pendiente',
-                        sesion_id=sesion_id,
-                        fecha_carga=datetime.now()
-                    )
-                    
-                    self.db.add(registro_temp)
-                    registros_procesados += 1
-                    
-                    # Commit cada 100 registros para no saturar
-                    if registros_procesados % 100 == 0:
-                        self.db.commit()
-                        
+                    self.db.bulk_insert_mappings(EmisionTemp, lote)
+                    self.db.commit()
+                    registros_procesados += len(lote)
                 except Exception as e:
-                    error_msg = f"Fila {index + 2}: {str(e)}"  # +2 por encabezado y base 0
-                    errores_procesamiento.append(error_msg)
+                    self.db.rollback()
+                    # +2 por encabezado y base 0
+                    errores_procesamiento.append(f"Filas {inicio + 2}-{fin + 1}: {str(e)}")
+                
+                if callback_progreso:
+                    callback_progreso(fin, len(registros))
+                if verificar_control and verificar_control() == 'cancelada':
+                    self.db.query(EmisionTemp).filter(
+                        EmisionTemp.sesion_id == sesion_id
+                    ).delete(synchronize_session=False)
+                    self.db.commit()
+                    return False, 0, ["Ingesta cancelada"]
             
             # Commit final
             self.db.commit()
@@ -125,60 +157,113 @@ class CSVService:
             self.db.rollback()
             return False, 0, [f"Error general en procesamiento: {str(e)}"]
     
-    def hacer_match_padron(self, proyecto_id: int, sesion_id: str) -> Tuple[bool, int, List[str]]:
-        """Hace match REAL con la tabla de padrón"""
+    @medir_sql('hacer_match_padron')
+    def hacer_match_padron(self, proyecto_id: int, sesion_id: str,
+                           plantilla_id: Optional[int] = None,
+                           estrategia: Optional[str] = None,
+                           callback_progreso: Callable = None,
+                           verificar_control: Callable = None) -> Tuple[bool, int, List[str]]:
+        """
+        Hace match REAL con la tabla de padrón.
+        Solo se copian a datos_json las columnas del padrón que usa la plantilla
+        (o, sin plantilla, las que usan las plantillas activas del proyecto).
+        estrategia: 'sql' (una consulta por registro) o 'indice' (índice de claves
+        en memoria). Por defecto settings.MATCH_STRATEGY.
+        Las claves ya resueltas para la versión actual del padrón salen de
+        cache_match_padron; las filas con match se leen en bloque.
+        callback_progreso(procesados, total) se llama tras la caché, durante la
+        resolución de las claves nuevas y al terminarla.
+        verificar_control() -> 'cancelada' descarta el match (rollback) antes de guardarlo.
+        """
+        from core.padron_service import PadronService
+        
+        if estrategia is None:
+            from config.settings import settings
+            estrategia = settings.MATCH_STRATEGY
+        if estrategia not in ESTRATEGIAS_MATCH:
+            return False, 0, [f"Estrategia de match no válida: {estrategia}"]
+        
         try:
-            # 1. Obtener proyecto y tabla de padrón
+            # 1. Obtener proyecto y tabla de padrón (tabla_padron guarda el UUID del padrón)
             proyecto = self.db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
             if not proyecto or not proyecto.tabla_padron:
                 return False, 0, ["No se encontró tabla de padrón configurada"]
             
-            # 2. Obtener registros temporales
+            padron_service = PadronService(self.db)
+            identificador = padron_service.obtener_padron_por_uuid(proyecto.tabla_padron)
+            nombre_tabla = identificador.nombre_tabla if identificador else proyecto.tabla_padron
+            
+            columnas_tabla = padron_service.obtener_tipos_columnas(nombre_tabla)
+            if not columnas_tabla:
+                return False, 0, [f"No existe la tabla de padrón {nombre_tabla}"]
+            
+            # 2. Proyección: columnas referenciadas por la(s) plantilla(s)
+            proyeccion = self._columnas_para_match(proyecto_id, plantilla_id, columnas_tabla)
+            select_columnas = ", ".join(['id'] + [c for c in proyeccion if c != 'id'])
+            
+            # Reglas de normalización de claves del proyecto. Sus índices funcionales se crean
+            # al guardar las reglas; aquí solo se revisa que existan (crearlos bloquearía el padrón)
+            reglas = obtener_reglas(proyecto.config_json)
+            if reglas and estrategia == 'sql':
+                faltantes = padron_service.indices_normalizados_faltantes(nombre_tabla, reglas)
+                if faltantes:
+                    print(f"⚠️ Faltan índices de claves normalizadas ({', '.join(faltantes)}): "
+                          f"el match por SQL recorrerá el padrón; se crean al guardar el proyecto")
+            
+            # 3. Obtener registros temporales
             registros_temp = self.db.query(EmisionTemp).filter(
                 EmisionTemp.proyecto_id == proyecto_id,
                 EmisionTemp.sesion_id == sesion_id,
                 EmisionTemp.estado == 'pendiente'
             ).all()
             
-            registros_match = 0
+            if not registros_temp:
+                return True, 0, []
+            
+            # 4. Claves ya resueltas para esta versión del padrón (caché entre sesiones)
+            version = padron_service.version_padron(identificador) if identificador else 0
+            firma = firma_reglas(reglas)
+            claves = {r.id: clave_cache_match(r.cuenta, r.codigo_afiliado, reglas) for r in registros_temp}
+            resueltos = buscar_en_cache(self.db, proyecto.tabla_padron, version, firma, set(claves.values()))
+            
+            # 5. Solo las claves nunca vistas van contra el padrón
+            pendientes = [r for r in registros_temp if claves[r.id] not in resueltos]
+            total = len(registros_temp)
+            desde_cache = total - len(pendientes)
+            if callback_progreso:
+                callback_progreso(desde_cache, total)
             errores = []
+            if pendientes:
+                if estrategia == 'indice':
+                    ids_nuevos, errores = self._resolver_ids_indice(proyecto.tabla_padron, pendientes, reglas)
+                else:
+                    avance_sql = None
+                    if callback_progreso:
+                        avance_sql = lambda resueltos_sql: callback_progreso(desde_cache + resueltos_sql, total)
+                    ids_nuevos, errores = self._resolver_ids_sql(nombre_tabla, pendientes, reglas, avance_sql)
+                if callback_progreso:
+                    callback_progreso(total, total)
+                
+                nuevos = {claves[id_registro]: id_padron for id_registro, id_padron in ids_nuevos.items()}
+                guardar_en_cache(self.db, proyecto.tabla_padron, version, firma, nuevos)
+                resueltos.update(nuevos)
             
-            # 3. Consulta dinámica a la tabla de padrón
-            nombre_tabla = proyecto.tabla_padron
+            if verificar_control and verificar_control() == 'cancelada':
+                self.db.rollback()
+                return False, 0, ["Match cancelado"]
             
-            for registro in registros_temp:
-                try:
-                    # Construir consulta SQL dinámica
-                    query = f"""
-                        SELECT * FROM {nombre_tabla} 
-                        WHERE cuenta = :cuenta 
-                        OR codigo_afiliado = :codigo
-                        LIMIT 1
-                    """
-                    
-                    result = self.db.execute(
-                        text(query), 
-                        {
-                            "cuenta": registro.cuenta,
-                            "codigo": registro.codigo_afiliado
-                        }
-                    ).fetchone()
-                    
-                    if result:
-                        # Match encontrado, combinar datos
-                        datos_padron = dict(result._mapping)
-                        datos_combinados = {**registro.datos_json, **datos_padron}
-                        registro.datos_json = datos_combinados
-                        registro.estado = 'match_ok'
-                        registros_match += 1
-                    else:
-                        registro.estado = 'no_match'
-                        registro.error_mensaje = "No encontrado en padrón"
-                        
-                except Exception as e:
-                    registro.estado = 'error'
-                    registro.error_mensaje = str(e)
-                    errores.append(f"Registro {registro.id}: {str(e)}")
+            # 6. Lectura en bloque de las filas con match y combinación en datos_json
+            ids_padron = {
+                r.id: resueltos[claves[r.id]] for r in registros_temp
+                if claves[r.id] in resueltos and r.estado != 'error'
+            }
+            registros_match = self._aplicar_filas_padron(
+                nombre_tabla, select_columnas, proyeccion, registros_temp, ids_padron
+            )
+            
+            if verificar_control and verificar_control() == 'cancelada':
+                self.db.rollback()
+                return False, 0, ["Match cancelado"]
             
             self.db.commit()
             return True, registros_match, errores
@@ -187,6 +272,306 @@ class CSVService:
             self.db.rollback()
             return False, 0, [f"Error en match: {str(e)}"]
     
+    def _aplicar_resultado_match(self, registro: EmisionTemp, fila, proyeccion: List[str]) -> bool:
+        """Combina en datos_json las columnas proyectadas de la fila del padrón (None = sin match)"""
+        if fila is None:
+            registro.estado = 'no_match'
+            registro.error_mensaje = "No encontrado en padrón"
+            return False
+        
+        datos_padron = {
+            columna: self._valor_json(valor)
+            for columna, valor in fila._mapping.items()
+            if columna in proyeccion
+        }
+        registro.datos_json = {**(registro.datos_json or {}), **datos_padron}
+        registro.estado = 'match_ok'
+        return True
+    
+    def _aplicar_filas_padron(self, nombre_tabla: str, select_columnas: str, proyeccion: List[str],
+                              registros_temp: List[EmisionTemp], ids_padron: Dict[int, Optional[int]]) -> int:
+        """Lee en bloque las filas del padrón resueltas y aplica el resultado a cada registro"""
+        from sqlalchemy import bindparam
+        
+        filas = {}
+        ids_unicos = sorted({i for i in ids_padron.values() if i is not None})
+        query = text(f"SELECT {select_columnas} FROM {nombre_tabla} WHERE id IN :ids").bindparams(
+            bindparam('ids', expanding=True)
+        )
+        for inicio in range(0, len(ids_unicos), TAMANO_LOTE_MATCH):
+            lote = ids_unicos[inicio:inicio + TAMANO_LOTE_MATCH]
+            for fila in self.db.execute(query, {"ids": lote}):
+                filas[fila.id] = fila
+        
+        registros_match = 0
+        for registro in registros_temp:
+            if registro.id not in ids_padron:
+                continue  # Error al resolver: ya quedó marcado
+            if self._aplicar_resultado_match(registro, filas.get(ids_padron[registro.id]), proyeccion):
+                registros_match += 1
+        return registros_match
+    
+    def _resolver_ids_sql(self, nombre_tabla: str, registros_temp: List[EmisionTemp],
+                          reglas: List[str], callback_progreso: Callable = None
+                          ) -> Tuple[Dict[int, Optional[int]], List[str]]:
+        """
+        Una consulta por registro contra el padrón.
+        callback_progreso(resueltos) cada INTERVALO_AVANCE_MATCH registros.
+        Returns: ({emision_temp_id: id_padron o None}, errores)
+        """
+        # Con reglas, la comparación usa la misma expresión que el índice funcional
+        query = text(f"""
+            SELECT id FROM {nombre_tabla} 
+            WHERE {expresion_sql('cuenta', reglas)} = :cuenta 
+            OR {expresion_sql('codigo_afiliado', reglas)} = :codigo
+            LIMIT 1
+        """)
+        
+        ids_padron = {}
+        errores = []
+        for numero, registro in enumerate(registros_temp, 1):
+            if callback_progreso and numero % INTERVALO_AVANCE_MATCH == 0:
+                callback_progreso(numero)
+            try:
+                ids_padron[registro.id] = self.db.execute(
+                    query,
+                    {
+                        "cuenta": normalizar_valor(registro.cuenta, reglas),
+                        "codigo": normalizar_valor(registro.codigo_afiliado, reglas)
+                    }
+                ).scalar()
+            except Exception as e:
+                registro.estado = 'error'
+                registro.error_mensaje = str(e)
+                errores.append(f"Registro {registro.id}: {str(e)}")
+        return ids_padron, errores
+    
+    def _resolver_ids_indice(self, uuid_padron: str, registros_temp: List[EmisionTemp],
+                             reglas: Optional[List[str]] = None) -> Tuple[Dict[int, Optional[int]], List[str]]:
+        """
+        Resuelve toda la lista con el índice de claves en memoria (searchsorted).
+        Returns: ({emision_temp_id: id_padron o None}, errores)
+        """
+        from core.indice_claves import obtener_indice, arreglo_claves
+        
+        reglas = reglas or []
+        indice = obtener_indice(self.db, uuid_padron, reglas)
+        if indice is None:
+            raise RuntimeError("No se pudo construir el índice de claves del padrón")
+        
+        # Misma prioridad y misma normalización que la consulta SQL: primero cuenta, después código
+        cuentas = arreglo_claves(normalizar_valor(r.cuenta, reglas) for r in registros_temp)
+        codigos = arreglo_claves(normalizar_valor(r.codigo_afiliado, reglas) for r in registros_temp)
+        ids_padron = indice.buscar('cuenta', cuentas)
+        sin_cuenta = (ids_padron < 0) & (codigos != b'')
+        ids_padron[sin_cuenta] = indice.buscar('codigo_afiliado', codigos[sin_cuenta])
+        ids_padron[(cuentas == b'') & (codigos == b'')] = -1
+        
+        return {
+            registro.id: (id_padron if id_padron >= 0 else None)
+            for registro, id_padron in zip(registros_temp, ids_padron.tolist())
+        }, []
+    
+    def _reglas_normalizacion(self, proyecto_id: int) -> List[str]:
+        proyecto = self.db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+        return obtener_reglas(proyecto.config_json) if proyecto else []
+    
+    def _columnas_para_match(self, proyecto_id: int, plantilla_id: Optional[int],
+                             columnas_tabla: Dict[str, str]) -> List[str]:
+        """Columnas del padrón a copiar en datos_json"""
+        from core.plantilla_service import PlantillaService
+        from core.padron_service import COLUMNAS_INTERNAS_PADRON
+        
+        plantilla_service = PlantillaService(self.db)
+        if plantilla_id:
+            referenciadas = plantilla_service.obtener_columnas_referenciadas(plantilla_id)
+        else:
+            referenciadas = plantilla_service.obtener_columnas_referenciadas_proyecto(proyecto_id)
+        
+        if referenciadas:
+            return [c for c in referenciadas if c in columnas_tabla]
+        
+        # Sin plantillas todavía: todas las columnas de datos (sin las internas)
+        return [c for c in columnas_tabla if c not in COLUMNAS_INTERNAS_PADRON]
+    
+    @staticmethod
+    def _valor_json(valor):
+        """Convierte valores de la BD a tipos serializables en datos_json"""
+        if isinstance(valor, (datetime, date)):
+            return valor.isoformat()
+        if isinstance(valor, Decimal):
+            return str(valor)
+        return valor
+    
+    # ===== SEGUNDA PASADA: CANDIDATOS POR SIMILITUD =====
+    
+    def buscar_candidatos_similares(self, proyecto_id: int, sesion_id: str, limite_por_registro: int = 3,
+                                    umbral: float = 0.3) -> Tuple[bool, int, List[str]]:
+        """
+        Busca en el padrón candidatos para los registros 'no_match' de la sesión
+        con pg_trgm (una sola consulta para toda la sesión, índices GiST con
+        búsqueda de vecinos más cercanos: solo se leen los k más parecidos).
+        Los candidatos quedan en candidatos_match para revisión; no se hace merge.
+        Returns: (éxito, registros_con_candidatos, errores)
+        """
+        from core.padron_service import PadronService
+        
+        try:
+            proyecto = self.db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+            if not proyecto or not proyecto.tabla_padron:
+                return False, 0, ["No se encontró tabla de padrón configurada"]
+            
+            padron_service = PadronService(self.db)
+            nombre_tabla = padron_service._nombre_tabla_padron(proyecto.tabla_padron)
+            if not nombre_tabla:
+                return False, 0, ["Padrón no encontrado"]
+            
+            exito, columnas, errores = padron_service.crear_indices_trigrama(proyecto.tabla_padron)
+            if not exito:
+                return False, 0, errores
+            if not columnas:
+                return False, 0, ["El padrón no tiene columnas de clave o nombre para comparar"]
+            
+            # Una subconsulta LATERAL por columna: el filtro % y el ORDER BY <-> (distancia)
+            # usan el índice GiST de esa columna y se detienen al juntar :limite candidatos
+            partes = []
+            for columna in columnas:
+                if columna in ('cuenta', 'codigo_afiliado'):
+                    valor_temp = f"t.{columna}"
+                else:
+                    valor_temp = f"(t.datos_json ->> '{columna}')"
+                partes.append(f"""
+                    SELECT t.id AS emision_temp_id, '{columna}' AS columna, {valor_temp} AS valor_buscado,
+                           c.id AS padron_id, c.valor_padron, c.similitud
+                    FROM emisiones_temp t
+                    CROSS JOIN LATERAL (
+                        SELECT p.id, p.{columna}::text AS valor_padron,
+                               similarity(p.{columna}::text, {valor_temp}) AS similitud
+                        FROM {nombre_tabla} p
+                        WHERE p.{columna}::text % {valor_temp}
+                        ORDER BY p.{columna}::text <-> {valor_temp}
+                        LIMIT :limite
+                    ) c
+                    WHERE t.sesion_id = :sesion_id AND t.proyecto_id = :proyecto_id
+                    AND t.estado = 'no_match' AND COALESCE({valor_temp}, '') <> ''
+                """)
+            
+            self.db.execute(text(f"SET LOCAL pg_trgm.similarity_threshold = {float(umbral)}"))
+            self.db.execute(text("""
+                DELETE FROM candidatos_match WHERE sesion_id = :sesion_id AND estado = 'pendiente'
+            """), {"sesion_id": sesion_id})
+            
+            # Un padrón encontrado por varias columnas cuenta una vez (con su mejor similitud)
+            self.db.execute(text(f"""
+                INSERT INTO candidatos_match (emision_temp_id, proyecto_id, sesion_id, padron_id, columna,
+                                              valor_buscado, valor_padron, similitud, rango, estado)
+                SELECT emision_temp_id, :proyecto_id, :sesion_id, padron_id, columna,
+                       valor_buscado, valor_padron, similitud, rango, 'pendiente'
+                FROM (
+                    SELECT m.*, row_number() OVER (
+                        PARTITION BY emision_temp_id ORDER BY similitud DESC, padron_id
+                    ) AS rango
+                    FROM (
+                        SELECT DISTINCT ON (emision_temp_id, padron_id) *
+                        FROM ({' UNION ALL '.join(partes)}) u
+                        ORDER BY emision_temp_id, padron_id, similitud DESC
+                    ) m
+                ) r
+                WHERE rango <= :limite
+            """), {"sesion_id": sesion_id, "proyecto_id": proyecto_id, "limite": limite_por_registro})
+            
+            con_candidatos = self.db.execute(text("""
+                SELECT COUNT(DISTINCT emision_temp_id) FROM candidatos_match
+                WHERE sesion_id = :sesion_id AND estado = 'pendiente'
+            """), {"sesion_id": sesion_id}).scalar() or 0
+            
+            self.db.commit()
+            return True, con_candidatos, []
+            
+        except Exception as e:
+            self.db.rollback()
+            return False, 0, [f"Error buscando candidatos: {str(e)}"]
+    
+    def obtener_candidatos_sesion(self, sesion_id: str, estado: str = 'pendiente') -> List[Dict]:
+        """Candidatos para revisión, agrupables por registro (ordenados por registro y rango)"""
+        from core.models import CandidatoMatch
+        
+        filas = self.db.query(CandidatoMatch, EmisionTemp).join(
+            EmisionTemp, EmisionTemp.id == CandidatoMatch.emision_temp_id
+        ).filter(
+            CandidatoMatch.sesion_id == sesion_id,
+            CandidatoMatch.estado == estado
+        ).order_by(CandidatoMatch.emision_temp_id, CandidatoMatch.rango).all()
+        
+        return [
+            {
+                'id': candidato.id,
+                'emision_temp_id': registro.id,
+                'cuenta': registro.cuenta,
+                'codigo_afiliado': registro.codigo_afiliado,
+                'columna': candidato.columna,
+                'valor_buscado': candidato.valor_buscado,
+                'valor_padron': candidato.valor_padron,
+                'padron_id': candidato.padron_id,
+                'similitud': float(candidato.similitud or 0),
+                'rango': candidato.rango,
+            }
+            for candidato, registro in filas
+        ]
+    
+    def resolver_candidato(self, candidato_id: int, aceptar: bool, usuario_id: int,
+                           plantilla_id: Optional[int] = None) -> Tuple[bool, str]:
+        """
+        Acepta (hace el match con esa fila del padrón) o rechaza un candidato.
+        Al aceptar, los demás candidatos del registro se rechazan.
+        """
+        from core.models import CandidatoMatch
+        from core.padron_service import PadronService
+        
+        try:
+            candidato = self.db.query(CandidatoMatch).filter(CandidatoMatch.id == candidato_id).first()
+            if not candidato or candidato.estado != 'pendiente':
+                return False, "Candidato no encontrado o ya revisado"
+            
+            candidato.estado = 'aceptado' if aceptar else 'rechazado'
+            candidato.usuario_revision_id = usuario_id
+            candidato.fecha_revision = datetime.now()
+            
+            if aceptar:
+                registro = self.db.query(EmisionTemp).filter(EmisionTemp.id == candidato.emision_temp_id).first()
+                proyecto = self.db.query(Proyecto).filter(Proyecto.id == candidato.proyecto_id).first()
+                padron_service = PadronService(self.db)
+                nombre_tabla = padron_service._nombre_tabla_padron(proyecto.tabla_padron)
+                
+                columnas_tabla = padron_service.obtener_tipos_columnas(nombre_tabla)
+                proyeccion = self._columnas_para_match(proyecto.id, plantilla_id, columnas_tabla)
+                select_columnas = ", ".join(['id'] + [c for c in proyeccion if c != 'id'])
+                fila = self.db.execute(
+                    text(f"SELECT {select_columnas} FROM {nombre_tabla} WHERE id = :id"),
+                    {"id": candidato.padron_id}
+                ).fetchone()
+                if not self._aplicar_resultado_match(registro, fila, proyeccion):
+                    self.db.rollback()
+                    return False, "La fila del padrón ya no existe"
+                registro.error_mensaje = None
+                
+                self.db.query(CandidatoMatch).filter(
+                    CandidatoMatch.emision_temp_id == candidato.emision_temp_id,
+                    CandidatoMatch.id != candidato.id,
+                    CandidatoMatch.estado == 'pendiente'
+                ).update({
+                    'estado': 'rechazado',
+                    'usuario_revision_id': usuario_id,
+                    'fecha_revision': datetime.now()
+                }, synchronize_session=False)
+            
+            self.db.commit()
+            return True, "Match aplicado" if aceptar else "Candidato rechazado"
+            
+        except Exception as e:
+            self.db.rollback()
+            return False, f"Error resolviendo candidato: {str(e)}"
+    
     def obtener_estadisticas_sesion(self, sesion_id: str) -> Dict:
         """Obtiene estadísticas de una sesión de procesamiento"""
         stats = {
@@ -197,16 +582,19 @@ class CSVService:
         }
         
         try:
-            registros = self.db.query(EmisionTemp).filter(EmisionTemp.sesion_id == sesion_id).all()
-            stats['total_registros'] = len(registros)
-            
-            for registro in registros:
-                if registro.estado == 'pendiente':
-                    stats['pendientes'] += 1
-                elif registro.estado == 'match_ok':
-                    stats['match_ok'] += 1
-                elif registro.estado == 'error':
-                    stats['con_errores'] += 1
+            # Conteo por estado en SQL (sin cargar los documentos de la sesión)
+            conteos = self.db.query(EmisionTemp.estado, func.count(EmisionTemp.id)).filter(
+                EmisionTemp.sesion_id == sesion_id
+            ).group_by(EmisionTemp.estado).all()
+            
+            for estado, cantidad in conteos:
+                stats['total_registros'] += cantidad
+                if estado == 'pendiente':
+                    stats['pendientes'] += cantidad
+                elif estado == 'match_ok':
+                    stats['match_ok'] += cantidad
+                elif estado == 'error':
+                    stats['con_errores'] += cantidad
                     
         except Exception as e:
             print(f"Error obteniendo estadísticas: {e}")
@@ -0,0 +1,325 @@
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, Optional
+import time
+from core.models import TrabajoCola
+
+MAX_ERRORES_RESULTADO = 50
+INTERVALO_CONTROL_SEGUNDOS = 2.0
+
+
+class SeguimientoTrabajo:
+    """Avance con pocas escrituras a la cola y la última solicitud de control recibida"""
+
+    def __init__(self, reportar: Callable[[int, str], Optional[str]]):
+        self.reportar = reportar
+        self.control = None
+        self.ultima_consulta = 0.0
+        self.ultimo_porcentaje = -1
+        self.ultimo_mensaje = ""
+
+    def avance(self, porcentaje: int, mensaje: str, forzar: bool = True) -> Optional[str]:
+        """Consulta la BD solo cuando cambia el porcentaje o cada pocos segundos (salvo forzar)"""
+        ahora = time.monotonic()
+        if forzar or porcentaje != self.ultimo_porcentaje or \
+                ahora - self.ultima_consulta >= INTERVALO_CONTROL_SEGUNDOS:
+            self.ultimo_porcentaje = porcentaje
+            self.ultimo_mensaje = mensaje
+            self.ultima_consulta = ahora
+            self.control = self.reportar(porcentaje, mensaje)
+        return self.control
+
+    @property
+    def cancelado(self) -> bool:
+        return self.control == 'cancelar'
+
+    def senal(self) -> Optional[str]:
+        """Para verificar_control de los servicios: 'cancelada' / 'pausada' / None"""
+        return {'cancelar': 'cancelada', 'pausar': 'pausada'}.get(self.control)
+
+    def senal_cancelacion(self) -> Optional[str]:
+        """Como senal(), para etapas que no se pueden pausar a medias (solo cancelar).
+        Vuelve a consultar la cola si la última lectura ya es vieja."""
+        self.avance(max(self.ultimo_porcentaje, 0), self.ultimo_mensaje, forzar=False)
+        return 'cancelada' if self.cancelado else None
+
+
+def resultado_cancelado(mensaje: str, **extra) -> Dict:
+    return {'estado': 'cancelado', 'mensaje': mensaje, 'errores': [], **extra}
+
+
+class EjecutorTrabajos:
+    """Ejecuta los trabajos de la cola con los servicios existentes (sin Qt)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def ejecutar(self, trabajo: TrabajoCola, reportar: Callable[[int, str], Optional[str]]) -> Dict:
+        """Despacha el trabajo según su tipo.
+
+        reportar(porcentaje, mensaje) guarda el avance y regresa el control pedido desde la UI.
+        El resultado incluye 'estado': 'completado', 'pausado', 'cancelado' o 'error'.
+        Solo la emisión se puede pausar; cancelar se atiende en todos los tipos entre
+        etapas (y por lote en la ingesta).
+        """
+        manejadores = {
+            'ingesta': self._ejecutar_ingesta,
+            'match': self._ejecutar_match,
+            'emision': self._ejecutar_emision,
+            'archivo': self._ejecutar_archivo,
+            'carga_padron': self._ejecutar_carga_padron,
+        }
+        manejador = manejadores.get(trabajo.tipo)
+        if not manejador:
+            return {'estado': 'error', 'mensaje': f"Tipo de trabajo no soportado: {trabajo.tipo}", 'errores': []}
+
+        resultado = manejador(trabajo.parametros or {}, reportar)
+        resultado['errores'] = list(resultado.get('errores', []))[:MAX_ERRORES_RESULTADO]
+        return resultado
+
+    def _ejecutar_ingesta(self, params: Dict, reportar: Callable) -> Dict:
+        """Carga el CSV a emisiones_temp y, salvo que se indique lo contrario, hace el match"""
+        from core.csv_service import CSVService
+        from core.metricas_pipeline import MetricasPipeline
+        csv_service = CSVService(self.db)
+        seguimiento = SeguimientoTrabajo(reportar)
+        metricas = MetricasPipeline('worker_ingesta', params['sesion_id'])
+
+        def avance_ingesta(procesados, total):
+            metricas.avance('ingesta', procesados, total)
+            seguimiento.avance(10 + int(procesados * 50 / total) if total else 10,
+                               f"Procesando registros del CSV: {metricas.texto_avance('ingesta')}", forzar=False)
+
+        try:
+            if seguimiento.avance(10, "Procesando registros del CSV...") == 'cancelar':
+                return resultado_cancelado("Ingesta cancelada antes de iniciar")
+            metricas.iniciar_etapa('ingesta')
+            exito, registros, errores = csv_service.procesar_csv(
+                params['file_path'], params['proyecto_id'], params['usuario_id'], params['sesion_id'],
+                callback_progreso=avance_ingesta,
+                verificar_control=seguimiento.senal_cancelacion
+            )
+            metricas.terminar_etapa('ingesta', registros, errores=len(errores))
+            if seguimiento.cancelado:
+                return resultado_cancelado("Ingesta cancelada; se descartaron los registros de la sesión")
+            if not exito:
+                return {'estado': 'error', 'mensaje': "Error procesando CSV", 'registros': registros, 'errores': errores}
+
+            registros_match = 0
+            if params.get('hacer_match', True):
+                if seguimiento.avance(60, "Realizando match con padrón...") == 'cancelar':
+                    return resultado_cancelado(f"Cancelado tras cargar {registros} registros (sin match)",
+                                               sesion_id=params['sesion_id'], registros=registros)
+                metricas.iniciar_etapa('match', total=registros)
+                exito, registros_match, errores_match = csv_service.hacer_match_padron(
+                    params['proyecto_id'], params['sesion_id'], params.get('plantilla_id'),
+                    params.get('estrategia_match'),
+                    callback_progreso=self._avance_match(seguimiento, metricas, 60, 40),
+                    verificar_control=seguimiento.senal_cancelacion
+                )
+                metricas.terminar_etapa('match', match_ok=registros_match)
+                errores = errores + errores_match
+                if seguimiento.cancelado:
+                    return resultado_cancelado(f"Cancelado tras cargar {registros} registros (sin match)",
+                                               sesion_id=params['sesion_id'], registros=registros)
+                if not exito:
+                    return {'estado': 'error', 'mensaje': "Error en match", 'registros': registros, 'errores': errores}
+
+            return {
+                'estado': 'completado',
+                'mensaje': f"{registros} registros cargados, {registros_match} con match",
+                'sesion_id': params['sesion_id'],
+                'registros': registros,
+                'registros_match': registros_match,
+                'errores': errores
+            }
+        finally:
+            self._escribir_metricas(metricas)
+
+    def _ejecutar_match(self, params: Dict, reportar: Callable) -> Dict:
+        """Match de una sesión ya cargada"""
+        from core.csv_service import CSVService
+        from core.metricas_pipeline import MetricasPipeline
+        seguimiento = SeguimientoTrabajo(reportar)
+        metricas = MetricasPipeline('worker_match', params['sesion_id'])
+
+        if seguimiento.avance(10, "Realizando match con padrón...") == 'cancelar':
+            return resultado_cancelado("Match cancelado antes de iniciar")
+        metricas.iniciar_etapa('match')
+        exito, registros_match, errores = CSVService(self.db).hacer_match_padron(
+            params['proyecto_id'], params['sesion_id'], params.get('plantilla_id'),
+            params.get('estrategia_match'),
+            callback_progreso=self._avance_match(seguimiento, metricas, 10, 90),
+            verificar_control=seguimiento.senal_cancelacion
+        )
+        metricas.terminar_etapa('match', match_ok=registros_match, errores=len(errores))
+        self._escribir_metricas(metricas)
+        if seguimiento.cancelado:
+            return resultado_cancelado("Match cancelado; la sesión quedó sin cambios")
+        return {
+            'estado': 'completado' if exito else 'error',
+            'mensaje': f"{registros_match} registros con match",
+            'registros_match': registros_match,
+            'errores': errores
+        }
+
+    def _ejecutar_emision(self, params: Dict, reportar: Callable) -> Dict:
+        """Emisión masiva; pausar/cancelar desde la UI llega por el campo control del trabajo"""
+        from core.emission_service import EmissionService
+        from core.metricas_pipeline import MetricasPipeline
+        emission_service = EmissionService(self.db)
+        metricas = MetricasPipeline('worker_emision', params.get('sesion_id'))
+
+        ejecucion = emission_service.crear_o_reanudar_ejecucion(
+            params['proyecto_id'], params['plantilla_id'], params['sesion_id'],
+            params['usuario_id'], params['ruta_salida'], params.get('tamano_lote', 100)
+        )
+
+        seguimiento = SeguimientoTrabajo(reportar)
+
+        def callback_progreso(procesados, total, cuenta, exito):
+            porcentaje = int(procesados * 100 / total) if total else 0
+            seguimiento.avance(porcentaje, f"Generando documentos: {metricas.texto_avance('render')}", forzar=False)
+
+        estado, total, exitosos, errores = emission_service.ejecutar_emision(
+            ejecucion.id,
+            callback_progreso=callback_progreso,
+            verificar_control=seguimiento.senal,
+            metricas=metricas
+        )
+        self._escribir_metricas(metricas)
+
+        estados_trabajo = {'completada': 'completado', 'pausada': 'pausado', 'cancelada': 'cancelado'}
+        return {
+            'estado': estados_trabajo.get(estado, 'error'),
+            'mensaje': f"{exitosos}/{total} documentos generados",
+            'ejecucion_id': ejecucion.id,
+            'total': total,
+            'exitosos': exitosos,
+            'errores': errores
+        }
+
+    def _ejecutar_archivo(self, params: Dict, reportar: Callable) -> Dict:
+        """Mueve la sesión a emisiones_final y acumula las emisiones antiguas del proyecto"""
+        from core.emission_service import EmissionService
+        from core.metricas_pipeline import MetricasPipeline
+        emission_service = EmissionService(self.db)
+        metricas = MetricasPipeline('worker_archivo', params['sesion_id'])
+
+        if reportar(10, "Moviendo registros a emisiones finales...") == 'cancelar':
+            return resultado_cancelado("Archivo cancelado antes de iniciar")
+        metricas.iniciar_etapa('archivo')
+        exito, movidos, errores = emission_service.mover_a_emisiones_final(
+            params['sesion_id'], params['usuario_id']
+        )
+        metricas.terminar_etapa('archivo', movidos, errores=len(errores))
+        self._escribir_metricas(metricas)
+        if not exito:
+            return {'estado': 'error', 'mensaje': "Error moviendo a emisiones finales", 'errores': errores}
+
+        acumulados = 0
+        if params.get('acumular', True):
+            if reportar(60, "Acumulando emisiones antiguas...") == 'cancelar':
+                return resultado_cancelado(f"{movidos} registros movidos; acumulación cancelada", movidos=movidos)
+            exito, acumulados, errores_acum = emission_service.acumular_emisiones(
+                params['proyecto_id'], params.get('dias_retroceso', 30)
+            )
+            errores = errores + errores_acum
+
+        return {
+            'estado': 'completado',
+            'mensaje': f"{movidos} registros movidos, {acumulados} acumulados",
+            'movidos': movidos,
+            'acumulados': acumulados,
+            'errores': errores
+        }
+
+    def _ejecutar_carga_padron(self, params: Dict, reportar: Callable) -> Dict:
+        """Carga un CSV completo a la tabla de padrón (o recarga solo una partición).
+        La carga en sí es una transacción: cancelar se atiende antes de cada paso."""
+        from core.padron_service import PadronService
+
+        if params.get('modo') == 'evolucionar':
+            # Cambios aditivos de esquema y luego carga delta (solo filas nuevas o cambiadas)
+            padron_service = PadronService(self.db)
+            if reportar(5, "Comparando estructura del CSV con el padrón...") == 'cancelar':
+                return resultado_cancelado("Carga cancelada antes de iniciar")
+            exito, cambios, incompatibles, avisos = padron_service.planificar_evolucion_esquema(
+                params['uuid_padron'], params['csv_path']
+            )
+            if not exito:
+                return {'estado': 'error', 'mensaje': "Error comparando esquema", 'errores': avisos}
+            if incompatibles:
+                # La carga delta fallaría o truncaría esas columnas: no se aplica nada
+                return {'estado': 'error', 'mensaje': "Columnas con tipo incompatible; requieren revisión manual",
+                        'errores': [incompatible['mensaje'] for incompatible in incompatibles]}
+            if reportar(10, f"Aplicando {len(cambios)} cambios de esquema...") == 'cancelar':
+                return resultado_cancelado("Carga cancelada antes de cambiar el esquema")
+            exito, aplicados, errores = padron_service.aplicar_evolucion_esquema(params['uuid_padron'], cambios)
+            if not exito:
+                return {'estado': 'error', 'mensaje': "Error aplicando cambios de esquema", 'errores': errores}
+            params = dict(params, modo='delta',
+                          columnas_mapeo=params.get('columnas_mapeo') or padron_service.mapeo_desde_csv(params['csv_path']))
+            if reportar(20, f"{aplicados} cambios de esquema aplicados") == 'cancelar':
+                return resultado_cancelado(f"{aplicados} cambios de esquema aplicados; carga delta cancelada")
+
+        if params.get('modo') == 'delta':
+            if reportar(25, "Comparando CSV contra el padrón (delta)...") == 'cancelar':
+                return resultado_cancelado("Carga delta cancelada antes de iniciar")
+
+            def confirmar(resumen: Dict) -> bool:
+                # El resumen queda en el mensaje del trabajo antes de aplicar; con solo_resumen
+                # es una vista previa y cancelar en este punto tampoco aplica nada
+                control = reportar(60, f"Delta: {resumen['nuevos']} nuevos, {resumen['actualizados']} "
+                                       f"actualizados, {resumen['eliminados']} a eliminar, "
+                                       f"{resumen['duplicados']} duplicados y {resumen['sin_clave']} "
+                                       f"sin llave en el CSV")
+                return not params.get('solo_resumen') and control != 'cancelar'
+
+            exito, resumen, errores = PadronService(self.db).actualizar_padron_delta(
+                params['uuid_padron'], params['csv_path'], params['columnas_mapeo'],
+                params.get('columna_clave', 'cuenta'), params.get('eliminar_faltantes', False),
+                confirmar=confirmar
+            )
+            if exito and not resumen['aplicado'] and not params.get('solo_resumen'):
+                return resultado_cancelado("Carga delta cancelada; el padrón quedó sin cambios", resumen=resumen)
+            prefijo = "" if resumen['aplicado'] else "Vista previa: "
+            return {
+                'estado': 'completado' if exito else 'error',
+                'mensaje': (f"{prefijo}{resumen['nuevos']} nuevos, {resumen['actualizados']} actualizados, "
+                            f"{resumen['eliminados']} eliminados, {resumen['sin_cambios']} sin cambios"),
+                'resumen': resumen,
+                'errores': errores
+            }
+        if reportar(10, "Cargando datos al padrón...") == 'cancelar':
+            return resultado_cancelado("Carga cancelada antes de iniciar")
+        if params.get('particion') is not None:
+            reportar(10, f"Recargando partición {params['particion']}...")
+            exito, registros, errores = PadronService(self.db).recargar_particion(
+                params['uuid_padron'], params['particion'], params['csv_path'], params['columnas_mapeo']
+            )
+        else:
+            exito, registros, errores = PadronService(self.db).cargar_datos_csv_a_padron(
+                params['uuid_padron'], params['csv_path'], params['columnas_mapeo']
+            )
+        return {
+            'estado': 'completado' if exito else 'error',
+            'mensaje': f"{registros} registros cargados al padrón",
+            'registros': registros,
+            'errores': errores
+        }
+
+    @staticmethod
+    def _avance_match(seguimiento: SeguimientoTrabajo, metricas, inicio: int, rango: int) -> Callable:
+        """callback_progreso del match: métricas y porcentaje del trabajo entre inicio e inicio + rango"""
+        def avance(procesados, total):
+            metricas.avance('match', procesados, total)
+            seguimiento.avance(inicio + int(procesados * rango / total) if total else inicio,
+                               f"Realizando match con padrón: {metricas.texto_avance('match')}", forzar=False)
+        return avance
+
+    @staticmethod
+    def _escribir_metricas(metricas):
+        try:
+            metricas.escribir_reporte()
+        except OSError as e:
+            print(f"⚠️ No se pudo escribir el reporte de métricas: {e}")
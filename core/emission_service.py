@@ -1,9 +1,37 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func, text
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import json
-from core.models import EmisionTemp, EmisionFinal, EmisionesAcumuladas, Proyecto, Plantilla, Usuario
+import os
+import re
+import time
+from core.models import EmisionTemp, EmisionFinal, EmisionesAcumuladas, Proyecto, Plantilla, Usuario, EjecucionEmision
+from utils.metricas_sql import medir_sql
+
+ESTADOS_REANUDABLES = ('pendiente', 'en_proceso', 'pausada', 'error')
+MAX_ERRORES_GUARDADOS = 100
+
+# Estado por proceso para la generación en paralelo (ProcessPoolExecutor)
+_generador_proceso = None
+_campos_proceso = None
+
+def _inicializar_renderizador(ruta_plantilla: str, campos: List[Dict]):
+    """Crea un PDFGenerator por proceso para no registrar fuentes en cada documento"""
+    global _generador_proceso, _campos_proceso
+    import signal
+    from core.pdf_generator import PDFGenerator
+    # Ctrl+C lo coordina el proceso principal (pausa con checkpoint), no los hijos
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _generador_proceso = PDFGenerator(ruta_plantilla)
+    _campos_proceso = campos
+
+def _renderizar_documento(tarea: Tuple[Dict, str]) -> Tuple[bool, float]:
+    """Genera un documento dentro de un proceso del pool; regresa (éxito, segundos)"""
+    datos, ruta_pdf = tarea
+    inicio = time.perf_counter()
+    exito = _generador_proceso.generar_pdf_con_datos(_campos_proceso, datos, ruta_pdf)
+    return exito, time.perf_counter() - inicio
 
 class EmissionService:
     def __init__(self, db: Session):
@@ -33,7 +61,7 @@ class EmissionService:
                         plantilla_id=registro_temp.plantilla_id,
                         usuario_id=usuario_id,
                         datos_completos=registro_temp.datos_json,
-                        archivo_generado=f"documento_{registro_temp.cuenta}.pdf",
+                        archivo_generado=self.nombre_archivo_registro(registro_temp),
                         fecha_generacion=datetime.now(),
                         estado_generacion='completado'
                     )
@@ -55,61 +83,352 @@ class EmissionService:
             self.db.rollback()
             return False, 0, [f"Error general moviendo a final: {str(e)}"]
     
-    def acumular_emisiones(self, proyecto_id: int, dias_retroceso: int = 30) -> Tuple[bool, int, List[str]]:
-        """Mueve emisiones finales a la tabla de acumulados para limpieza"""
+    # ===== EMISIÓN MASIVA CON CHECKPOINT =====
+    
+    def obtener_ejecucion_reanudable(self, sesion_id: str, plantilla_id: int = None) -> Optional[EjecucionEmision]:
+        """Obtiene la última ejecución interrumpida (pausada o caída) de una sesión.
+        Solo si le quedan registros después del checkpoint: una ejecución en error que
+        ya recorrió todo (p. ej. todos los documentos fallaron) no se reanuda, se empieza otra."""
+        query = self.db.query(EjecucionEmision).filter(
+            EjecucionEmision.sesion_id == sesion_id,
+            EjecucionEmision.estado.in_(ESTADOS_REANUDABLES)
+        )
+        if plantilla_id:
+            query = query.filter(EjecucionEmision.plantilla_id == plantilla_id)
+        ejecucion = query.order_by(EjecucionEmision.id.desc()).first()
+        if not ejecucion:
+            return None
+        
+        quedan_registros = self.db.query(
+            self.db.query(EmisionTemp.id).filter(
+                EmisionTemp.proyecto_id == ejecucion.proyecto_id,
+                EmisionTemp.sesion_id == ejecucion.sesion_id,
+                EmisionTemp.estado == 'match_ok',
+                EmisionTemp.id > (ejecucion.ultimo_id_procesado or 0)
+            ).exists()
+        ).scalar()
+        return ejecucion if quedan_registros else None
+    
+    def crear_o_reanudar_ejecucion(self, proyecto_id: int, plantilla_id: int, sesion_id: str,
+                                   usuario_id: int, ruta_salida: str, tamano_lote: int = 100) -> EjecucionEmision:
+        """Reanuda la ejecución interrumpida de la sesión o crea una nueva"""
+        ejecucion = self.obtener_ejecucion_reanudable(sesion_id, plantilla_id)
+        if ejecucion:
+            # Se respeta la ruta original para no partir la emisión en dos carpetas
+            ejecucion.tamano_lote = tamano_lote
+            self.db.commit()
+            return ejecucion
+        
+        ejecucion = EjecucionEmision(
+            proyecto_id=proyecto_id,
+            plantilla_id=plantilla_id,
+            usuario_id=usuario_id,
+            sesion_id=sesion_id,
+            ruta_salida=ruta_salida,
+            estado='pendiente',
+            tamano_lote=tamano_lote,
+            procesados=0,
+            exitosos=0,
+            fallidos=0,
+            ultimo_id_procesado=0,
+            errores_json=[]
+        )
+        self.db.add(ejecucion)
+        self.db.commit()
+        return ejecucion
+    
+    @medir_sql('ejecutar_emision')
+    def ejecutar_emision(self, ejecucion_id: int,
+                         callback_progreso: Callable = None,
+                         verificar_control: Callable = None,
+                         workers: int = 1,
+                         metricas=None) -> Tuple[str, int, int, List[str]]:
+        """Genera los PDFs de una ejecución por lotes guardando checkpoint tras cada lote.
+        
+        callback_progreso(procesados, total, cuenta, exito) se llama por registro.
+        metricas (MetricasPipeline, opcional) recibe las etapas render (generación y escritura
+        del PDF) y checkpoint, la latencia y los bytes de cada documento y las colas del pool.
+        verificar_control() devuelve None, 'pausada' o 'cancelada' y se consulta entre registros
+        (entre lotes cuando workers > 1, que reparte cada lote entre procesos).
+        Regresa (estado_final, total, exitosos, errores).
+        """
+        from core.pdf_generator import PDFGenerator
+        from core.plantilla_service import PlantillaService
+        
+        ejecucion = self.db.query(EjecucionEmision).filter(EjecucionEmision.id == ejecucion_id).first()
+        if not ejecucion:
+            return 'error', 0, 0, [f"Ejecución {ejecucion_id} no encontrada"]
+        
+        pool = None
         try:
-            fecha_limite = datetime.now() - timedelta(days=dias_retroceso)
+            plantilla = self.db.query(Plantilla).filter(Plantilla.id == ejecucion.plantilla_id).first()
+            campos = PlantillaService(self.db).obtener_campos_config(ejecucion.plantilla_id)
+            if not plantilla or not campos:
+                return self._finalizar_ejecucion(ejecucion, 'error', ["Plantilla no encontrada o sin campos configurados"])
             
-            # Obtener emisiones finales antiguas
-            emisiones_final = self.db.query(EmisionFinal).filter(
-                EmisionFinal.proyecto_id == proyecto_id,
-                EmisionFinal.fecha_creacion < fecha_limite
-            ).all()
+            os.makedirs(ejecucion.ruta_salida, exist_ok=True)
             
-            if not emisiones_final:
-                return True, 0, []  # No hay nada que acumular es éxito
+            filtro_base = [
+                EmisionTemp.proyecto_id == ejecucion.proyecto_id,
+                EmisionTemp.sesion_id == ejecucion.sesion_id,
+                EmisionTemp.estado == 'match_ok'
+            ]
+            ejecucion.total_registros = self.db.query(func.count(EmisionTemp.id)).filter(*filtro_base).scalar() or 0
+            if ejecucion.total_registros == 0:
+                return self._finalizar_ejecucion(ejecucion, 'error', ["No hay registros válidos para procesar"])
             
-            registros_acumulados = 0
-            errores = []
+            ejecucion.estado = 'en_proceso'
+            ejecucion.fecha_actualizacion = datetime.now()
+            self.db.commit()
             
-            for emision_final in emisiones_final:
-                try:
-                    # Crear registro acumulado
-                    acumulado = EmisionesAcumuladas(
-                        proyecto_id=emision_final.proyecto_id,
-                        plantilla_id=emision_final.plantilla_id,
-                        usuario_id=emision_final.usuario_id,
-                        cuenta=emision_final.datos_completos.get('cuenta', ''),
-                        codigo_afiliado=emision_final.datos_completos.get('codigo_afiliado', ''),
-                        nombre_afiliado=emision_final.datos_completos.get('nombre_afiliado', ''),
-                        datos_completos=emision_final.datos_completos,
-                        nombre_archivo=emision_final.archivo_generado,
-                        ruta_archivo=f"/acumulados/{emision_final.archivo_generado}",
-                        fecha_emision=emision_final.fecha_generacion,
-                        fecha_registro=datetime.now()
-                    )
-                    
-                    self.db.add(acumulado)
+            if workers and workers > 1:
+                from concurrent.futures import ProcessPoolExecutor
+                pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_inicializar_renderizador,
+                    initargs=(plantilla.ruta_archivo, campos)
+                )
+                generador = None
+            else:
+                generador = PDFGenerator(plantilla.ruta_archivo)
+            
+            errores = list(ejecucion.errores_json or [])
+            tamano_lote = max(1, ejecucion.tamano_lote or 100)
+            if metricas:
+                metricas.iniciar_etapa('render', total=ejecucion.total_registros, procesados=ejecucion.procesados)
+            
+            while True:
+                # Keyset sobre id: al reanudar se continúa justo después del último checkpoint
+                lote = self.db.query(EmisionTemp).filter(
+                    *filtro_base,
+                    EmisionTemp.id > ejecucion.ultimo_id_procesado
+                ).order_by(EmisionTemp.id).limit(tamano_lote).all()
+                
+                if not lote:
+                    break
+                
+                tareas = [
+                    (self._armar_datos_registro(registro),
+                     os.path.join(ejecucion.ruta_salida, self.nombre_archivo_registro(registro)))
+                    for registro in lote
+                ]
+                
+                resultados_pool = None
+                if pool:
+                    senal = verificar_control() if verificar_control else None
+                    if senal in ('pausada', 'cancelada'):
+                        self._guardar_checkpoint(ejecucion, errores)
+                        return self._finalizar_ejecucion(ejecucion, senal, errores)
+                    resultados_pool = pool.map(_renderizar_documento, tareas,
+                                               chunksize=max(1, len(tareas) // (workers * 4)))
+                    if metricas:
+                        metricas.profundidad_cola('documentos_en_pool', len(tareas))
+                
+                for registro, (datos, ruta_pdf) in zip(lote, tareas):
+                    if resultados_pool is not None:
+                        exito, segundos = next(resultados_pool)
+                    else:
+                        senal = verificar_control() if verificar_control else None
+                        if senal in ('pausada', 'cancelada'):
+                            self._guardar_checkpoint(ejecucion, errores)
+                            return self._finalizar_ejecucion(ejecucion, senal, errores)
+                        inicio = time.perf_counter()
+                        exito = generador.generar_pdf_con_datos(campos, datos, ruta_pdf)
+                        segundos = time.perf_counter() - inicio
                     
-                    # Eliminar de final (Quizá podría ser soft delete)
-                    self.db.delete(emision_final)
+                    ejecucion.procesados += 1
+                    if exito:
+                        ejecucion.exitosos += 1
+                    else:
+                        ejecucion.fallidos += 1
+                        if len(errores) < MAX_ERRORES_GUARDADOS:
+                            errores.append(f"Error generando documento de cuenta {registro.cuenta} (registro {registro.id})")
+                    ejecucion.ultimo_id_procesado = registro.id
                     
-                    registros_acumulados += 1
+                    if metricas:
+                        metricas.registrar_documento(segundos, os.path.getsize(ruta_pdf) if exito else 0)
+                        metricas.avance('render', ejecucion.procesados)
+                        metricas.profundidad_cola('registros_pendientes', ejecucion.total_registros - ejecucion.procesados)
                     
-                except Exception as e:
-                    errores.append(f"Error acumulando emisión {emision_final.id}: {str(e)}")
+                    if callback_progreso:
+                        callback_progreso(ejecucion.procesados, ejecucion.total_registros, registro.cuenta or '', exito)
+                
+                # Checkpoint por lote: lo confirmado aquí sobrevive a un cierre inesperado
+                inicio_checkpoint = time.perf_counter()
+                self._guardar_checkpoint(ejecucion, errores)
+                if metricas:
+                    metricas.profundidad_cola('documentos_en_pool', 0)
+                    metricas.sumar_tiempo('checkpoint', time.perf_counter() - inicio_checkpoint, len(lote))
             
-            if registros_acumulados > 0:
-                self.db.commit()
-                return True, registros_acumulados, errores
-            else:
-                self.db.rollback()
-                return False, 0, errores
+            if metricas:
+                metricas.terminar_etapa('render', exitosos=ejecucion.exitosos, fallidos=ejecucion.fallidos)
+            estado_final = 'completada' if ejecucion.exitosos > 0 else 'error'
+            return self._finalizar_ejecucion(ejecucion, estado_final, errores)
+            
+        except Exception as e:
+            self.db.rollback()
+            return self._finalizar_ejecucion(ejecucion, 'error', [f"Error general en emisión: {str(e)}"])
+        finally:
+            if pool:
+                pool.shutdown(wait=True)
+    
+    def combinar_pdfs_ejecucion(self, ejecucion_id: int, ruta_destino: str) -> Tuple[bool, int, List[str]]:
+        """Une en un solo PDF (en orden de registro) los documentos generados por una ejecución"""
+        import fitz  # PyMuPDF
+        
+        ejecucion = self.db.query(EjecucionEmision).filter(EjecucionEmision.id == ejecucion_id).first()
+        if not ejecucion:
+            return False, 0, [f"Ejecución {ejecucion_id} no encontrada"]
+        
+        documentos = 0
+        errores = []
+        combinado = fitz.open()
+        try:
+            ultimo_id = 0
+            while True:
+                lote = self.db.query(EmisionTemp).filter(
+                    EmisionTemp.proyecto_id == ejecucion.proyecto_id,
+                    EmisionTemp.sesion_id == ejecucion.sesion_id,
+                    EmisionTemp.estado == 'match_ok',
+                    EmisionTemp.id > ultimo_id
+                ).order_by(EmisionTemp.id).limit(1000).all()
+                if not lote:
+                    break
+                
+                for registro in lote:
+                    ultimo_id = registro.id
+                    ruta_pdf = os.path.join(ejecucion.ruta_salida, self.nombre_archivo_registro(registro))
+                    if not os.path.exists(ruta_pdf):
+                        errores.append(f"No existe el documento del registro {registro.id}")
+                        continue
+                    with fitz.open(ruta_pdf) as documento:
+                        combinado.insert_pdf(documento)
+                    documentos += 1
+            
+            if documentos == 0:
+                return False, 0, errores or ["No hay documentos para combinar"]
+            
+            combinado.save(ruta_destino, garbage=3, deflate=True)
+            return True, documentos, errores
+            
+        except Exception as e:
+            return False, documentos, errores + [f"Error combinando PDFs: {str(e)}"]
+        finally:
+            combinado.close()
+    
+    def cancelar_ejecucion(self, ejecucion_id: int) -> bool:
+        """Marca una ejecución como cancelada para que no se ofrezca reanudarla"""
+        try:
+            ejecucion = self.db.query(EjecucionEmision).filter(EjecucionEmision.id == ejecucion_id).first()
+            if not ejecucion:
+                return False
+            ejecucion.estado = 'cancelada'
+            ejecucion.fecha_fin = datetime.now()
+            self.db.commit()
+            return True
+        except Exception:
+            self.db.rollback()
+            return False
+    
+    @staticmethod
+    def nombre_archivo_registro(registro: EmisionTemp) -> str:
+        """Nombre determinista del PDF de un registro (regenerar un lote sobrescribe, no duplica)"""
+        cuenta = re.sub(r'[^\w\-]', '_', str(registro.cuenta or 'sin_cuenta'))
+        return f"documento_{cuenta}_{registro.id}.pdf"
+    
+    def _armar_datos_registro(self, registro: EmisionTemp) -> Dict:
+        """Une cuenta, código y datos del padrón en un solo diccionario para el generador"""
+        datos = {
+            'cuenta': registro.cuenta,
+            'codigo_afiliado': registro.codigo_afiliado
+        }
+        datos_json = registro.datos_json
+        if isinstance(datos_json, str):
+            try:
+                datos_json = json.loads(datos_json)
+            except ValueError:
+                datos_json = None
+        if isinstance(datos_json, dict):
+            datos.update(datos_json)
+        return datos
+    
+    def _guardar_checkpoint(self, ejecucion: EjecucionEmision, errores: List[str]):
+        """Confirma en BD el avance actual de la ejecución"""
+        ejecucion.errores_json = list(errores[:MAX_ERRORES_GUARDADOS])
+        ejecucion.fecha_actualizacion = datetime.now()
+        self.db.commit()
+    
+    def _finalizar_ejecucion(self, ejecucion: EjecucionEmision, estado: str,
+                             errores: List[str]) -> Tuple[str, int, int, List[str]]:
+        """Registra el estado final de la ejecución y arma el resultado"""
+        try:
+            ejecucion.estado = estado
+            ejecucion.errores_json = list(errores[:MAX_ERRORES_GUARDADOS])
+            ejecucion.fecha_actualizacion = datetime.now()
+            if estado in ('completada', 'cancelada'):
+                ejecucion.fecha_fin = datetime.now()
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            errores = errores + [f"No se pudo guardar el estado de la ejecución: {str(e)}"]
+        return estado, ejecucion.total_registros or 0, ejecucion.exitosos or 0, errores
+    
+    def acumular_emisiones(self, proyecto_id: int, dias_retroceso: int = 30) -> Tuple[bool, int, List[str]]:
+        """Mueve emisiones finales a la tabla de acumulados para limpieza.
+        
+        Una sola sentencia: DELETE ... RETURNING alimenta el INSERT y las claves
+        se extraen del JSONB en PostgreSQL (sin cargar los documentos en Python).
+        """
+        try:
+            fecha_limite = datetime.now() - timedelta(days=dias_retroceso)
+            
+            resultado = self.db.execute(text("""
+                WITH movidas AS (
+                    DELETE FROM emisiones_final
+                    WHERE proyecto_id = :proyecto_id AND fecha_creacion < :fecha_limite
+                    RETURNING proyecto_id, plantilla_id, usuario_id, datos_completos,
+                              archivo_generado, fecha_generacion
+                )
+                INSERT INTO emisiones_acumuladas (
+                    proyecto_id, plantilla_id, usuario_id, cuenta, codigo_afiliado, nombre_afiliado,
+                    datos_completos, nombre_archivo, ruta_archivo, fecha_emision, fecha_registro
+                )
+                SELECT proyecto_id, plantilla_id, usuario_id,
+                       LEFT(COALESCE(datos_completos ->> 'cuenta', ''), 50),
+                       LEFT(COALESCE(datos_completos ->> 'codigo_afiliado', ''), 50),
+                       LEFT(COALESCE(datos_completos ->> 'nombre_afiliado', ''), 200),
+                       datos_completos, archivo_generado, '/acumulados/' || archivo_generado,
+                       fecha_generacion, CURRENT_TIMESTAMP
+                FROM movidas
+            """), {"proyecto_id": proyecto_id, "fecha_limite": fecha_limite})
+            
+            registros_acumulados = resultado.rowcount
+            self.db.commit()
+            return True, registros_acumulados, []
                 
         except Exception as e:
             self.db.rollback()
             return False, 0, [f"Error general en acumulación: {str(e)}"]
     
+    def buscar_emisiones_por_datos(self, proyecto_id: int, filtros: Dict[str, str],
+                                   acumuladas: bool = False, limite: int = 100) -> List[Dict]:
+        """
+        Emisiones cuyo documento contiene los pares clave/valor indicados.
+        Usa el operador @> de JSONB, resuelto con el índice GIN (jsonb_path_ops).
+        """
+        tabla = 'emisiones_acumuladas' if acumuladas else 'emisiones_final'
+        columna_fecha = 'fecha_emision' if acumuladas else 'fecha_generacion'
+        columna_archivo = 'nombre_archivo' if acumuladas else 'archivo_generado'
+        
+        resultado = self.db.execute(text(f"""
+            SELECT id, cuenta, codigo_afiliado, {columna_archivo} AS archivo, {columna_fecha} AS fecha
+            FROM {tabla}
+            WHERE proyecto_id = :proyecto_id AND datos_completos @> CAST(:filtro AS jsonb)
+            ORDER BY {columna_fecha} DESC
+            LIMIT :limite
+        """), {"proyecto_id": proyecto_id, "filtro": json.dumps(filtros), "limite": limite})
+        return [dict(fila._mapping) for fila in resultado]
+    
     def limpiar_temporales(self, sesion_id: str = None, horas_antiguedad: int = 24) -> Tuple[bool, int, List[str]]:
         """Limpia registros temporales antiguos"""
         try:
@@ -0,0 +1,229 @@
+# core/export_service.py - Exportación masiva con COPY TO STDOUT
+"""Exportación de padrones y del historial de emisiones a CSV (opcionalmente .gz).
+
+Los datos salen de PostgreSQL con COPY ... TO STDOUT y se escriben al archivo en
+bloques conforme llegan: la memoria no crece con el tamaño de la exportación.
+
+Uso desde consola:
+    python -m core.export_service --fuente padron --proyecto 3 --salida padron.csv.gz
+    python -m core.export_service --fuente emisiones_final --proyecto 3 \
+        --desde 2024-01-01 --hasta 2024-01-31 --columnas id,archivo_generado --salida enero.csv
+"""
+import argparse
+import gzip
+import os
+import sys
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+
+# fuente: (tabla, columna de fecha para filtrar)
+FUENTES_EXPORTACION = {
+    'emisiones_final': ('emisiones_final', 'fecha_generacion'),
+    'emisiones_acumuladas': ('emisiones_acumuladas', 'fecha_emision'),
+    'padron': (None, 'fecha_creacion'),
+}
+
+TAMANO_BLOQUE_ESCRITURA = 1024 * 1024
+
+
+class EscritorPorBloques:
+    """Destino para copy_expert: junta lo que llega de COPY y lo escribe en bloques"""
+
+    def __init__(self, archivo, tamano_bloque: int = TAMANO_BLOQUE_ESCRITURA,
+                 callback_progreso: Optional[Callable[[int], None]] = None):
+        self.archivo = archivo
+        self.tamano_bloque = tamano_bloque
+        self.callback_progreso = callback_progreso
+        self.buffer = bytearray()
+        self.bytes_escritos = 0
+
+    def write(self, datos):
+        if isinstance(datos, str):
+            datos = datos.encode('utf-8')
+        self.buffer += datos
+        if len(self.buffer) >= self.tamano_bloque:
+            self.vaciar()
+        return len(datos)
+
+    def vaciar(self):
+        if not self.buffer:
+            return
+        self.archivo.write(self.buffer)
+        self.bytes_escritos += len(self.buffer)
+        self.buffer = bytearray()
+        if self.callback_progreso:
+            self.callback_progreso(self.bytes_escritos)
+
+
+class ExportService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def resolver_tabla(self, fuente: str, proyecto_id: Optional[int] = None,
+                       uuid_padron: Optional[str] = None) -> Optional[str]:
+        """Tabla física de la fuente (para 'padron' se resuelve el del proyecto)"""
+        if fuente not in FUENTES_EXPORTACION:
+            return None
+        tabla = FUENTES_EXPORTACION[fuente][0]
+        if tabla:
+            return tabla
+
+        from core.models import Proyecto
+        from core.padron_service import PadronService
+
+        if not uuid_padron and proyecto_id:
+            proyecto = self.db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+            uuid_padron = proyecto.tabla_padron if proyecto else None
+        if not uuid_padron:
+            return None
+        identificador = PadronService(self.db).obtener_padron_por_uuid(uuid_padron)
+        return identificador.nombre_tabla if identificador else None
+
+    def columnas_disponibles(self, fuente: str, proyecto_id: Optional[int] = None,
+                             uuid_padron: Optional[str] = None) -> List[str]:
+        from core.padron_service import PadronService
+
+        tabla = self.resolver_tabla(fuente, proyecto_id, uuid_padron)
+        if not tabla:
+            return []
+        padron_service = PadronService(self.db)
+        if FUENTES_EXPORTACION[fuente][0]:
+            return list(padron_service.columnas_catalogo(tabla))  # Tabla fija, no registrada como padrón
+        return list(padron_service.obtener_tipos_columnas(tabla))
+
+    def armar_consulta_copy(self, fuente: str, columnas: Optional[List[str]] = None,
+                            proyecto_id: Optional[int] = None, uuid_padron: Optional[str] = None,
+                            fecha_desde: Optional[date] = None, fecha_hasta: Optional[date] = None,
+                            sesion_id: Optional[str] = None) -> Tuple[Optional[str], List[str]]:
+        """
+        Sentencia COPY ... TO STDOUT para la fuente y filtros indicados.
+        Returns: (sql, errores)
+        """
+        tabla = self.resolver_tabla(fuente, proyecto_id, uuid_padron)
+        if not tabla:
+            return None, [f"Fuente no válida o padrón no encontrado: {fuente}"]
+
+        disponibles = self.columnas_disponibles(fuente, proyecto_id, uuid_padron)
+        columnas = list(columnas or disponibles)
+        invalidas = [c for c in columnas if c not in disponibles]
+        if invalidas:
+            return None, [f"Columnas inexistentes en {tabla}: {', '.join(invalidas)}"]
+
+        columna_fecha = FUENTES_EXPORTACION[fuente][1]
+        condiciones = []
+        params = {}
+
+        if fuente != 'padron' and proyecto_id:
+            condiciones.append("proyecto_id = %(proyecto_id)s")
+            params['proyecto_id'] = proyecto_id
+        if fecha_desde and columna_fecha in disponibles:
+            condiciones.append(f"{columna_fecha} >= %(fecha_desde)s")
+            params['fecha_desde'] = fecha_desde
+        if fecha_hasta and columna_fecha in disponibles:
+            # Hasta el final del día indicado
+            condiciones.append(f"{columna_fecha} < %(fecha_hasta)s")
+            params['fecha_hasta'] = fecha_hasta + timedelta(days=1)
+        if sesion_id:
+            if fuente != 'emisiones_final':
+                return None, ["El filtro por sesión solo aplica a emisiones_final"]
+            condiciones.append("emision_temp_id IN (SELECT id FROM emisiones_temp WHERE sesion_id = %(sesion_id)s)")
+            params['sesion_id'] = sesion_id
+
+        opciones = "WITH (FORMAT csv, HEADER true, ENCODING 'UTF8')"
+        lista_columnas = ', '.join(columnas)
+
+        if not condiciones:
+            # Sin filtros COPY lee la tabla directamente (más rápido que una consulta)
+            return f"COPY {tabla} ({lista_columnas}) TO STDOUT {opciones}", []
+
+        cursor = self.db.connection().connection.cursor()
+        consulta = cursor.mogrify(
+            f"SELECT {lista_columnas} FROM {tabla} WHERE {' AND '.join(condiciones)} ORDER BY id",
+            params
+        ).decode('utf-8')
+        return f"COPY ({consulta}) TO STDOUT {opciones}", []
+
+    def exportar(self, fuente: str, ruta_salida: str, columnas: Optional[List[str]] = None,
+                 proyecto_id: Optional[int] = None, uuid_padron: Optional[str] = None,
+                 fecha_desde: Optional[date] = None, fecha_hasta: Optional[date] = None,
+                 sesion_id: Optional[str] = None, comprimir: Optional[bool] = None,
+                 callback_progreso: Optional[Callable[[int], None]] = None) -> Tuple[bool, Dict, List[str]]:
+        """
+        Exporta la fuente a CSV. comprimir=None decide por la extensión (.gz).
+        Se escribe a un archivo .parcial que se renombra al terminar.
+        Returns: (éxito, {'registros', 'bytes', 'ruta'}, errores)
+        """
+        sql, errores = self.armar_consulta_copy(
+            fuente, columnas, proyecto_id, uuid_padron, fecha_desde, fecha_hasta, sesion_id
+        )
+        if not sql:
+            return False, {}, errores
+
+        if comprimir is None:
+            comprimir = ruta_salida.endswith('.gz')
+        ruta_parcial = ruta_salida + '.parcial'
+
+        try:
+            directorio = os.path.dirname(os.path.abspath(ruta_salida))
+            os.makedirs(directorio, exist_ok=True)
+
+            # compresslevel bajo: la exportación queda limitada por disco, no por CPU
+            abrir = (lambda ruta: gzip.open(ruta, 'wb', compresslevel=3)) if comprimir else (lambda ruta: open(ruta, 'wb'))
+            with abrir(ruta_parcial) as archivo:
+                escritor = EscritorPorBloques(archivo, callback_progreso=callback_progreso)
+                cursor = self.db.connection().connection.cursor()
+                cursor.copy_expert(sql, escritor)
+                escritor.vaciar()
+                registros = cursor.rowcount
+
+            os.replace(ruta_parcial, ruta_salida)
+            self.db.commit()
+
+            print(f"✅ Exportados {registros} registros a {ruta_salida}")
+            return True, {
+                'registros': registros,
+                'bytes': os.path.getsize(ruta_salida),
+                'ruta': ruta_salida
+            }, []
+
+        except Exception as e:
+            self.db.rollback()
+            if os.path.exists(ruta_parcial):
+                os.remove(ruta_parcial)
+            return False, {}, [f"Error exportando {fuente}: {str(e)}"]
+
+
+def _fecha(valor: str) -> date:
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser = argparse.ArgumentParser(description="Exportación de padrones y emisiones a CSV")
+    parser.add_argument('--fuente', choices=tuple(FUENTES_EXPORTACION), required=True)
+    parser.add_argument('--salida', required=True, help="Archivo destino (.csv o .csv.gz)")
+    parser.add_argument('--proyecto', type=int, help="ID del proyecto")
+    parser.add_argument('--padron', help="UUID del padrón (en lugar de --proyecto)")
+    parser.add_argument('--columnas', help="Columnas separadas por coma (por defecto todas)")
+    parser.add_argument('--desde', type=_fecha, help="Fecha inicial AAAA-MM-DD")
+    parser.add_argument('--hasta', type=_fecha, help="Fecha final AAAA-MM-DD (incluida)")
+    parser.add_argument('--sesion', help="Sesión de emisión (solo emisiones_final)")
+    args = parser.parse_args()
+
+    from config.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        exito, resumen, errores = ExportService(db).exportar(
+            args.fuente, args.salida,
+            columnas=[c.strip() for c in args.columnas.split(',')] if args.columnas else None,
+            proyecto_id=args.proyecto, uuid_padron=args.padron,
+            fecha_desde=args.desde, fecha_hasta=args.hasta, sesion_id=args.sesion
+        )
+    finally:
+        db.close()
+
+    for error in errores:
+        print(f"❌ {error}")
+    sys.exit(0 if exito else 1)
@@ -0,0 +1,77 @@
+# core/historial_service.py - Búsqueda en el historial de emisiones
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from core.models import Usuario
+from core.project_service import ProjectService
+
+
+class HistorialService:
+    """Consulta emisiones_final y emisiones_acumuladas a través de v_historial_emisiones.
+
+    Paginación por keyset sobre (fecha_emision, origen, id) descendente: cada
+    página continúa después de la última fila de la anterior, sin OFFSET.
+    Solo se consultan proyectos visibles para el usuario (PermissionError si no).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _verificar_acceso(self, proyecto_id: int, usuario: Usuario):
+        permitidos = {p.id for p in ProjectService(self.db).obtener_proyectos_usuario(usuario)}
+        if proyecto_id not in permitidos:
+            raise PermissionError("No tiene acceso a este proyecto")
+
+    def buscar(self, proyecto_id: int, usuario: Usuario,
+               cuenta: Optional[str] = None, codigo_afiliado: Optional[str] = None,
+               fecha_desde: Optional[date] = None, fecha_hasta: Optional[date] = None,
+               despues_de: Optional[Tuple] = None, limite: int = 50) -> Tuple[List[Dict], Optional[Tuple]]:
+        """
+        Emisiones del proyecto, de la más reciente a la más antigua.
+        despues_de: cursor devuelto por la página anterior
+        Returns: (registros, cursor_siguiente o None si no hay más)
+        """
+        self._verificar_acceso(proyecto_id, usuario)
+        condiciones = ["proyecto_id = :proyecto_id", "fecha_emision IS NOT NULL"]
+        params = {"proyecto_id": proyecto_id, "limite": limite + 1}
+
+        if cuenta:
+            condiciones.append("cuenta = :cuenta")
+            params["cuenta"] = cuenta.strip()
+        if codigo_afiliado:
+            condiciones.append("codigo_afiliado = :codigo_afiliado")
+            params["codigo_afiliado"] = codigo_afiliado.strip()
+        if fecha_desde:
+            condiciones.append("fecha_emision >= :fecha_desde")
+            params["fecha_desde"] = fecha_desde
+        if fecha_hasta:
+            # Hasta el final del día indicado
+            condiciones.append("fecha_emision < :fecha_hasta")
+            params["fecha_hasta"] = fecha_hasta + timedelta(days=1)
+        if despues_de:
+            condiciones.append("(fecha_emision, origen, id) < (:cursor_fecha, :cursor_origen, :cursor_id)")
+            params["cursor_fecha"], params["cursor_origen"], params["cursor_id"] = despues_de
+
+        resultado = self.db.execute(text(f"""
+            SELECT origen, id, proyecto_id, plantilla_id, usuario_id, cuenta, codigo_afiliado,
+                   nombre_afiliado, archivo, fecha_emision
+            FROM v_historial_emisiones
+            WHERE {' AND '.join(condiciones)}
+            ORDER BY fecha_emision DESC, origen DESC, id DESC
+            LIMIT :limite
+        """), params)
+        registros = [dict(fila._mapping) for fila in resultado]
+
+        cursor = None
+        if len(registros) > limite:
+            registros = registros[:limite]
+            ultimo = registros[-1]
+            cursor = (ultimo['fecha_emision'], ultimo['origen'], ultimo['id'])
+        return registros, cursor
+
+    def ultima_emision(self, proyecto_id: int, usuario: Usuario, cuenta: Optional[str] = None,
+                       codigo_afiliado: Optional[str] = None) -> Optional[Dict]:
+        """Respuesta directa a "¿se envió carta a X y cuándo?" (la más reciente)"""
+        registros, _ = self.buscar(proyecto_id, usuario, cuenta=cuenta, codigo_afiliado=codigo_afiliado, limite=1)
+        return registros[0] if registros else None
@@ -0,0 +1,203 @@
+# core/indice_claves.py - Índice de claves del padrón para match en memoria
+"""Índice ordenado de las claves del padrón (cuenta, codigo_afiliado -> id).
+
+Las claves se leen una vez por lotes (cursor del servidor) a arreglos de NumPy
+de bytes UTF-8 ordenados y el match de toda una sesión se resuelve con
+np.searchsorted; después solo se leen de la base las filas del padrón que
+hicieron match. Las claves se normalizan con las reglas del proyecto tal cual,
+igual que la estrategia 'sql' (sin reglas se comparan los valores crudos).
+
+El índice se guarda en disco por padrón (settings.KEY_INDEX_CACHE_DIR) junto con
+la versión de datos del padrón (config_json['version_datos']) y la firma de las
+reglas de normalización; se reconstruye solo cuando alguna de las dos cambia. PadronService incrementa la versión en cada
+carga o actualización, las modificaciones hechas por fuera deben llamar a
+invalidar_indice().
+"""
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+from sqlalchemy.orm import Session
+
+if TYPE_CHECKING:
+    import numpy as np
+
+COLUMNAS_CLAVE = ('cuenta', 'codigo_afiliado')
+TAMANO_LOTE_LECTURA = 200000
+FORMATO_INDICE = 2  # 2: claves como bytes UTF-8 (los índices en disco anteriores se reconstruyen)
+
+_INDICES: Dict[str, 'IndiceClavesPadron'] = {}
+_LOCK_INDICES = threading.Lock()
+
+
+def arreglo_claves(valores: Iterable[Optional[str]]) -> 'np.ndarray':
+    """Claves como bytes UTF-8 de ancho fijo: ocupan un byte por carácter ASCII
+    (el dtype '<U' usa cuatro) y se comparan igual en el índice y en la búsqueda"""
+    import numpy as np
+
+    return np.array([(valor or '').encode('utf-8') for valor in valores], dtype=np.bytes_)
+
+
+class IndiceClavesPadron:
+    """Claves ordenadas y el id del padrón en la misma posición, por columna"""
+
+    def __init__(self, version: int, claves: Dict[str, Tuple['np.ndarray', 'np.ndarray']],
+                 firma_reglas: str = ''):
+        self.version = version
+        self.claves = claves  # {columna: (claves_ordenadas, ids)}
+        self.firma_reglas = firma_reglas  # Reglas de normalización aplicadas a las claves
+
+    def vigente(self, version: int, firma_reglas: str) -> bool:
+        return self.version == version and self.firma_reglas == firma_reglas
+
+    @property
+    def total_claves(self) -> int:
+        return sum(len(ids) for _, ids in self.claves.values())
+
+    @classmethod
+    def construir(cls, db: Session, nombre_tabla: str, columnas_tabla, version: int,
+                  reglas: Optional[List[str]] = None) -> 'IndiceClavesPadron':
+        import numpy as np
+        import pandas as pd
+        from core.normalizacion_claves import normalizar_serie, firma_reglas
+
+        reglas = reglas or []
+
+        columnas = [c for c in COLUMNAS_CLAVE if c in columnas_tabla]
+        claves = {}
+        if not columnas:
+            return cls(version, claves, firma_reglas(reglas))
+
+        # Cursor del servidor por lotes: ni el resultado completo ni un DataFrame
+        # con todas las claves llegan a memoria, solo los arreglos compactos
+        partes = {columna: ([], []) for columna in columnas}
+        cursor = db.connection().connection.cursor(name="indice_claves")
+        try:
+            cursor.itersize = TAMANO_LOTE_LECTURA
+            cursor.execute(
+                f"SELECT id, {', '.join(f'{c}::text' for c in columnas)} FROM {nombre_tabla} ORDER BY id"
+            )
+            while True:
+                filas = cursor.fetchmany(TAMANO_LOTE_LECTURA)
+                if not filas:
+                    break
+                lote = pd.DataFrame(filas, columns=['id'] + columnas)
+                for columna in columnas:
+                    serie = normalizar_serie(lote[columna], reglas)
+                    validas = (serie.notna() & (serie != '')).to_numpy()
+                    valores, ids = partes[columna]
+                    valores.append(arreglo_claves(serie[validas]))
+                    ids.append(lote['id'].to_numpy(dtype=np.int64)[validas])
+        finally:
+            cursor.close()
+
+        for columna, (valores, ids) in partes.items():
+            valores = np.concatenate(valores) if valores else arreglo_claves([])
+            ids = np.concatenate(ids) if ids else np.array([], dtype=np.int64)
+            # Orden estable: ante claves repetidas queda primero el id menor
+            orden = np.argsort(valores, kind='stable')
+            claves[columna] = (valores[orden], ids[orden])
+
+        return cls(version, claves, firma_reglas(reglas))
+
+    def buscar(self, columna: str, valores: 'np.ndarray') -> 'np.ndarray':
+        """Id del padrón para cada valor (-1 si no existe)"""
+        import numpy as np
+
+        resultado = np.full(len(valores), -1, dtype=np.int64)
+        if columna not in self.claves or not len(valores):
+            return resultado
+
+        ordenadas, ids = self.claves[columna]
+        if not len(ordenadas):
+            return resultado
+
+        posiciones = np.searchsorted(ordenadas, valores)
+        posiciones_validas = np.minimum(posiciones, len(ordenadas) - 1)
+        encontrados = (posiciones < len(ordenadas)) & (ordenadas[posiciones_validas] == valores)
+        resultado[encontrados] = ids[posiciones_validas[encontrados]]
+        return resultado
+
+    def guardar(self, ruta: str):
+        import numpy as np
+
+        arreglos = {'version': np.array(self.version, dtype=np.int64),
+                    'formato': np.array(FORMATO_INDICE, dtype=np.int64),
+                    'firma_reglas': np.array(self.firma_reglas)}
+        for columna, (ordenadas, ids) in self.claves.items():
+            arreglos[f'{columna}__claves'] = ordenadas
+            arreglos[f'{columna}__ids'] = ids
+
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'wb') as f:
+            np.savez(f, **arreglos)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str) -> Optional['IndiceClavesPadron']:
+        import numpy as np
+
+        if not os.path.exists(ruta):
+            return None
+        with np.load(ruta, allow_pickle=False) as archivo:
+            if 'formato' not in archivo.files or int(archivo['formato']) != FORMATO_INDICE:
+                return None
+            claves = {
+                columna: (archivo[f'{columna}__claves'], archivo[f'{columna}__ids'])
+                for columna in COLUMNAS_CLAVE if f'{columna}__claves' in archivo.files
+            }
+            firma = str(archivo['firma_reglas']) if 'firma_reglas' in archivo.files else ''
+            return cls(int(archivo['version']), claves, firma)
+
+
+def _ruta_indice(uuid_padron: str) -> str:
+    from config.settings import settings
+    return os.path.join(settings.KEY_INDEX_CACHE_DIR, f"{uuid_padron}.npz")
+
+
+def obtener_indice(db: Session, uuid_padron: str,
+                   reglas: Optional[List[str]] = None) -> Optional[IndiceClavesPadron]:
+    """Índice vigente del padrón: memoria, luego disco, y si no, se construye"""
+    from core.padron_service import PadronService
+    from core.normalizacion_claves import firma_reglas
+
+    firma = firma_reglas(reglas or [])
+    padron_service = PadronService(db)
+    identificador = padron_service.obtener_padron_por_uuid(uuid_padron)
+    if not identificador:
+        return None
+    version = padron_service.version_padron(identificador)
+
+    with _LOCK_INDICES:
+        indice = _INDICES.get(uuid_padron)
+        if indice and indice.vigente(version, firma):
+            return indice
+
+        ruta = _ruta_indice(uuid_padron)
+        try:
+            indice = IndiceClavesPadron.cargar(ruta)
+        except Exception as e:
+            print(f"⚠️ Índice de claves ilegible, se reconstruye: {e}")
+            indice = None
+
+        if not indice or not indice.vigente(version, firma):
+            print(f"🔑 Construyendo índice de claves de {identificador.nombre_tabla} (versión {version})...")
+            columnas_tabla = padron_service.obtener_tipos_columnas(identificador.nombre_tabla)
+            indice = IndiceClavesPadron.construir(db, identificador.nombre_tabla, columnas_tabla, version, reglas)
+            try:
+                indice.guardar(ruta)
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar el índice de claves: {e}")
+            print(f"✅ Índice de claves listo: {indice.total_claves} claves")
+
+        _INDICES[uuid_padron] = indice
+        return indice
+
+
+def invalidar_indice(uuid_padron: str):
+    """Descarta el índice en memoria y en disco (por cambios hechos fuera de PadronService)"""
+    with _LOCK_INDICES:
+        _INDICES.pop(uuid_padron, None)
+        ruta = _ruta_indice(uuid_padron)
+        if os.path.exists(ruta):
+            os.remove(ruta)
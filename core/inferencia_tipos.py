@@ -0,0 +1,254 @@
+"""Inferencia de tipos de columna para CSVs de padrón.
+
+Lee una muestra repartida en todo el archivo (inicio, bloques al azar y final)
+en lugar de solo las primeras filas, y evalúa cada tipo candidato con
+operaciones vectorizadas (regex de pandas y formatos de fecha explícitos).
+Por cada columna informa tipo, confianza, longitud máxima y el tipo SQL sugerido.
+"""
+import io
+import math
+import os
+import random
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PATRON_ENTERO = r'[+-]?\d+'
+PATRON_DECIMAL = r'[+-]?(?:\d+\.\d*|\.\d+|\d+)'
+PATRON_CEROS_IZQUIERDA = r'[+-]?0\d+(?:\.\d*)?'
+
+# Solo literales y formatos que PostgreSQL acepta tal cual en COPY (el CSV se
+# carga sin transformar): 'si'/'verdadero' o fechas dd/mm/aaaa quedan como
+# VARCHAR, porque con DateStyle MDY '25/12/2024' falla y '05/12/2024' sería 12 de mayo
+VALORES_BOOLEANOS = {'true', 'false', 't', 'f', 'yes', 'no', 'y', 'n', 'on', 'off'}
+
+# (formato strptime, regex de filtrado previo); año primero = ISO, sin ambigüedad
+FORMATOS_FECHA = [
+    ('%Y-%m-%d', r'\d{4}-\d{1,2}-\d{1,2}'),
+    ('%Y/%m/%d', r'\d{4}/\d{1,2}/\d{1,2}'),
+]
+FORMATOS_FECHA_HORA = [
+    ('%Y-%m-%d %H:%M:%S', r'\d{4}-\d{1,2}-\d{1,2} \d{1,2}:\d{2}:\d{2}'),
+    ('%Y-%m-%dT%H:%M:%S', r'\d{4}-\d{1,2}-\d{1,2}T\d{1,2}:\d{2}:\d{2}'),
+    ('%Y-%m-%d %H:%M', r'\d{4}-\d{1,2}-\d{1,2} \d{1,2}:\d{2}'),
+]
+
+LIMITE_INTEGER = 2 ** 31 - 1
+LIMITE_BIGINT = 2 ** 63 - 1
+TAMANOS_VARCHAR = (10, 20, 50, 100, 150, 255, 500, 1000)
+
+# Proporción mínima de valores que deben cumplir un tipo para elegirlo:
+# un solo valor inválido hace fallar la carga, así que por defecto es 100%
+UMBRAL_TIPO = 1.0
+UMBRAL_ALTERNATIVA = 0.9
+
+
+def detectar_encoding(ruta: str, bytes_muestra: int = 1024 * 1024) -> str:
+    """Detecta el encoding con el primer MB (no lee el archivo completo)"""
+    import chardet
+    with open(ruta, 'rb') as f:
+        resultado = chardet.detect(f.read(bytes_muestra))
+    return resultado.get('encoding') or 'utf-8'
+
+
+def muestrear_csv(ruta: str, encoding: str = 'utf-8', filas_inicio: int = 2000,
+                  filas_azar: int = 2000, filas_final: int = 1000, bloques_azar: int = 20,
+                  semilla: Optional[int] = None) -> 'pd.DataFrame':
+    """
+    Muestra del CSV como texto (dtype=str, vacíos como '').
+    df.attrs['archivo_completo'] indica si la muestra es el archivo entero.
+    """
+    import pandas as pd
+
+    cabeza = pd.read_csv(ruta, encoding=encoding, dtype=str, keep_default_na=False, nrows=filas_inicio)
+    if len(cabeza) < filas_inicio:
+        cabeza.attrs['archivo_completo'] = True
+        return cabeza
+
+    tamano = os.path.getsize(ruta)
+    rng = random.Random(semilla)
+    lineas = []
+
+    with open(ruta, 'rb') as f:
+        encabezado = f.readline()
+        inicio_datos = f.tell()
+
+        # Longitud promedio de línea (para ubicar el final)
+        for _ in range(200):
+            if not f.readline():
+                break
+        largo_linea = max(1, (f.tell() - inicio_datos) // 200)
+
+        # Bloques al azar: saltar a un byte, descartar la línea parcial y leer seguidas
+        filas_por_bloque = max(1, filas_azar // bloques_azar)
+        for desplazamiento in sorted(rng.randrange(inicio_datos, tamano) for _ in range(bloques_azar)):
+            f.seek(desplazamiento)
+            f.readline()
+            for _ in range(filas_por_bloque):
+                linea = f.readline()
+                if not linea:
+                    break
+                lineas.append(linea)
+
+        # Final del archivo
+        f.seek(max(inicio_datos, tamano - largo_linea * filas_final * 2))
+        f.readline()
+        lineas.extend(f.readlines()[-filas_final:])
+
+    lineas = [l if l.endswith(b'\n') else l + b'\n' for l in lineas]
+    resto = pd.read_csv(io.BytesIO(encabezado + b''.join(lineas)), encoding=encoding, dtype=str,
+                        keep_default_na=False, on_bad_lines='skip')
+    # Filas partidas (comillas con saltos de línea) quedan descartadas por on_bad_lines
+    resto = resto[[c for c in cabeza.columns if c in resto.columns]]
+
+    muestra = pd.concat([cabeza, resto], ignore_index=True)
+    muestra.attrs['archivo_completo'] = False
+    return muestra
+
+
+def _proporcion(coincide: 'pd.Series') -> float:
+    return float(coincide.mean()) if len(coincide) else 0.0
+
+
+def _mejor_formato_fecha(valores: 'pd.Series', formatos) -> Tuple[Optional[str], float]:
+    """Formato explícito que interpreta más valores (sin caer en dateutil)"""
+    import pandas as pd
+
+    mejor, mejor_proporcion = None, 0.0
+    for formato, patron in formatos:
+        candidatos = valores.str.fullmatch(patron)
+        if _proporcion(candidatos) <= mejor_proporcion:
+            continue
+        interpretados = pd.to_datetime(valores, format=formato, errors='coerce').notna()
+        proporcion = _proporcion(interpretados)
+        if proporcion > mejor_proporcion:
+            mejor, mejor_proporcion = formato, proporcion
+            if proporcion == 1.0:
+                break
+    return mejor, mejor_proporcion
+
+
+def _tamano_varchar(longitud_max: int, archivo_completo: bool) -> Optional[int]:
+    """Tamaño de VARCHAR con holgura si la longitud viene de una muestra (None = TEXT)"""
+    requerido = longitud_max if archivo_completo else math.ceil(longitud_max * 1.5)
+    for tamano in TAMANOS_VARCHAR:
+        if requerido <= tamano:
+            return tamano
+    return None
+
+
+def inferir_tipo_serie(serie: 'pd.Series', archivo_completo: bool = False,
+                       umbral: float = UMBRAL_TIPO) -> Dict:
+    """Infiere el tipo de una columna (valores como texto)"""
+    import pandas as pd
+
+    texto = serie.astype(str).str.strip()
+    valores = texto[(texto != '') & serie.notna()]
+    total = len(valores)
+
+    info = {
+        'tipo': 'texto',
+        'confianza': 1.0,
+        'muestra': total,
+        'nulos': int(len(serie) - total),
+        'longitud_max': int(valores.str.len().max()) if total else 0,
+        'formato_fecha': None,
+        'tipo_alternativo': None,
+        'atipicos': [],
+    }
+
+    if total == 0:
+        info['tipo_sql'] = tipo_sql(info, archivo_completo)
+        return info
+
+    proporciones = {}
+    ceros_izquierda = valores.str.fullmatch(PATRON_CEROS_IZQUIERDA).any()
+
+    # Números (con ceros a la izquierda son claves: se conservan como texto)
+    if not ceros_izquierda:
+        es_entero = valores.str.fullmatch(PATRON_ENTERO)
+        proporciones['entero'] = _proporcion(es_entero)
+        es_decimal = valores.str.fullmatch(PATRON_DECIMAL)
+        proporciones['decimal'] = _proporcion(es_decimal)
+
+    minusculas = valores.str.lower()
+    proporciones['booleano'] = _proporcion(minusculas.isin(VALORES_BOOLEANOS))
+
+    formato_hora, proporciones['fecha_hora'] = _mejor_formato_fecha(valores, FORMATOS_FECHA_HORA)
+    formato_fecha, proporciones['fecha'] = _mejor_formato_fecha(valores, FORMATOS_FECHA)
+
+    # Del más específico al más general
+    for tipo in ('entero', 'decimal', 'booleano', 'fecha_hora', 'fecha'):
+        if proporciones.get(tipo, 0.0) >= umbral:
+            info['tipo'] = tipo
+            info['confianza'] = round(proporciones[tipo], 4)
+            break
+    else:
+        tipo_alt, proporcion_alt = max(proporciones.items(), key=lambda item: item[1])
+        if proporcion_alt >= UMBRAL_ALTERNATIVA:
+            # Casi todos cumplen: sugerirlo y mostrar los valores que lo impiden
+            info['tipo_alternativo'] = tipo_alt
+            info['confianza'] = round(1 - proporcion_alt, 4)
+            if tipo_alt in ('entero', 'decimal'):
+                patron = PATRON_ENTERO if tipo_alt == 'entero' else PATRON_DECIMAL
+                info['atipicos'] = valores[~valores.str.fullmatch(patron)].head(5).tolist()
+
+    if info['tipo'] == 'entero':
+        maximo = pd.to_numeric(valores.str.lstrip('+-'), errors='coerce').max()
+        if valores.str.lstrip('+-').str.len().max() > 18 or maximo > LIMITE_BIGINT:
+            info['tipo'] = 'decimal'
+        elif maximo > LIMITE_INTEGER:
+            info['tipo'] = 'entero_grande'
+
+    if info['tipo'] == 'decimal':
+        partes = valores.str.lstrip('+-').str.split('.', n=1, expand=True)
+        info['digitos_enteros'] = int(partes[0].str.len().max())
+        info['decimales'] = int(partes[1].fillna('').str.len().max()) if partes.shape[1] > 1 else 0
+
+    if info['tipo'] == 'fecha_hora':
+        info['formato_fecha'] = formato_hora
+    elif info['tipo'] == 'fecha':
+        info['formato_fecha'] = formato_fecha
+
+    info['tipo_sql'] = tipo_sql(info, archivo_completo)
+    return info
+
+
+def tipo_sql(info: Dict, archivo_completo: bool = False) -> str:
+    """Tipo PostgreSQL para el resultado de la inferencia"""
+    tipo = info['tipo']
+    if tipo == 'entero':
+        return 'INTEGER'
+    if tipo == 'entero_grande':
+        return 'BIGINT'
+    if tipo == 'decimal':
+        decimales = max(2, info.get('decimales', 2))
+        precision = max(15, info.get('digitos_enteros', 0) + decimales + 2)
+        return f'NUMERIC({precision}, {decimales})'
+    if tipo == 'fecha':
+        return 'DATE'
+    if tipo == 'fecha_hora':
+        return 'TIMESTAMP'
+    if tipo == 'booleano':
+        return 'BOOLEAN'
+
+    tamano = _tamano_varchar(max(1, info.get('longitud_max', 0)), archivo_completo)
+    return f'VARCHAR({tamano})' if tamano else 'TEXT'
+
+
+def inferir_tipos_csv(ruta: str, encoding: Optional[str] = None, **opciones_muestra) -> List[Dict]:
+    """Inferencia para todas las columnas del CSV; un dict por columna en orden"""
+    encoding = encoding or detectar_encoding(ruta)
+    muestra = muestrear_csv(ruta, encoding, **opciones_muestra)
+    archivo_completo = muestra.attrs.get('archivo_completo', False)
+
+    resultado = []
+    for columna in muestra.columns:
+        info = inferir_tipo_serie(muestra[columna], archivo_completo)
+        info['nombre_original'] = columna
+        info['ejemplos'] = [v for v in muestra[columna].head(50).tolist() if v and v.strip()][:3]
+        # Una muestra sin nulos no garantiza que el archivo no los tenga
+        info['nullable'] = info['nulos'] > 0 or not archivo_completo
+        resultado.append(info)
+    return resultado
@@ -0,0 +1,248 @@
+# core/metricas_pipeline.py - Métricas por etapa del pipeline de emisión
+"""Avance, rendimiento y reporte de una corrida del pipeline.
+
+Etapas: ingesta -> match -> render (PDF por documento, generado y escrito a
+disco) -> checkpoint (commit por lote) -> archivo (emisiones_final). Cada etapa
+lleva procesados, total, tasa y ETA; los documentos además latencia p50/p95 y bytes escritos, y
+se pueden registrar profundidades de cola (documentos en el pool, pendientes).
+
+Al terminar, escribir_reporte() deja en settings.METRICS_DIR un JSON de la
+corrida y un archivo .prom en formato textfile de Prometheus (node_exporter
+--collector.textfile.directory) con los valores de la última corrida.
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+ETAPAS_PIPELINE = ('ingesta', 'match', 'render', 'checkpoint', 'archivo')
+UNIDADES_ETAPA = {'ingesta': 'filas', 'match': 'registros', 'render': 'docs',
+                  'checkpoint': 'docs', 'archivo': 'registros'}
+MAX_MUESTRAS_LATENCIA = 50000  # Muestreo de reservorio por encima de este número
+PREFIJO_PROMETHEUS = 'merge_pipeline'
+
+
+def formatear_eta(segundos: Optional[float]) -> str:
+    if segundos is None:
+        return "--:--"
+    segundos = int(segundos)
+    horas, resto = divmod(segundos, 3600)
+    minutos, segundos = divmod(resto, 60)
+    return f"{horas}:{minutos:02d}:{segundos:02d}" if horas else f"{minutos}:{segundos:02d}"
+
+
+def percentil(valores_ordenados: List[float], fraccion: float) -> Optional[float]:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not valores_ordenados:
+        return None
+    indice = min(len(valores_ordenados) - 1, max(0, math.ceil(fraccion * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+
+class MetricasPipeline:
+    """Métricas de una corrida (un hilo o proceso la alimenta; lecturas desde otro son seguras)"""
+
+    def __init__(self, nombre: str, sesion_id: Optional[str] = None):
+        self.nombre = nombre
+        self.sesion_id = sesion_id
+        self.inicio = time.time()
+        self.etapas: Dict[str, Dict] = {}
+        self.colas: Dict[str, int] = {}
+        self.latencias: List[float] = []
+        self.documentos = 0
+        self.latencia_total = 0.0
+        self.bytes_escritos = 0
+        self._lock = threading.Lock()
+
+    # ===== ETAPAS =====
+
+    def iniciar_etapa(self, etapa: str, total: Optional[int] = None, procesados: int = 0):
+        """procesados: avance previo (al reanudar no cuenta para la tasa)"""
+        with self._lock:
+            self.etapas[etapa] = {
+                'inicio': time.monotonic(), 'fin': None, 'total': total,
+                'procesados': procesados, 'procesados_inicio': procesados,
+                'segundos': 0.0, 'extra': {},
+            }
+
+    def avance(self, etapa: str, procesados: int, total: Optional[int] = None):
+        with self._lock:
+            datos = self.etapas.get(etapa)
+            if datos is None:
+                return
+            datos['procesados'] = procesados
+            if total is not None:
+                datos['total'] = total
+
+    def sumar_tiempo(self, etapa: str, segundos: float, procesados: int = 0):
+        """Etapas intercaladas con otras (checkpoint): se acumula tiempo en lugar de medir de punta a punta"""
+        with self._lock:
+            datos = self.etapas.setdefault(etapa, {
+                'inicio': None, 'fin': None, 'total': None, 'procesados': 0,
+                'procesados_inicio': 0, 'segundos': 0.0, 'extra': {},
+            })
+            datos['segundos'] += segundos
+            datos['procesados'] += procesados
+
+    def terminar_etapa(self, etapa: str, procesados: Optional[int] = None, **extra):
+        with self._lock:
+            datos = self.etapas.get(etapa)
+            if datos is None:
+                return
+            if procesados is not None:
+                datos['procesados'] = procesados
+            if datos['inicio'] is not None:
+                datos['fin'] = time.monotonic()
+                datos['segundos'] = datos['fin'] - datos['inicio']
+            datos['extra'].update(extra)
+
+    def duracion(self, etapa: str) -> float:
+        datos = self.etapas.get(etapa)
+        if not datos:
+            return 0.0
+        if datos['inicio'] is None or datos['fin'] is not None:
+            return datos['segundos']
+        return time.monotonic() - datos['inicio']
+
+    def tasa(self, etapa: str) -> float:
+        """Elementos por segundo en esta corrida"""
+        datos = self.etapas.get(etapa)
+        duracion = self.duracion(etapa)
+        if not datos or duracion <= 0:
+            return 0.0
+        return (datos['procesados'] - datos['procesados_inicio']) / duracion
+
+    def eta(self, etapa: str) -> Optional[float]:
+        """Segundos restantes estimados (None sin total o sin avance)"""
+        datos = self.etapas.get(etapa)
+        tasa = self.tasa(etapa)
+        if not datos or not datos['total'] or tasa <= 0:
+            return None
+        return max(0.0, (datos['total'] - datos['procesados']) / tasa)
+
+    def texto_avance(self, etapa: str) -> str:
+        """'1,200/10,000 filas · 850 filas/s · ETA 0:10' para etiquetas de la interfaz"""
+        datos = self.etapas.get(etapa)
+        if not datos:
+            return ""
+        unidad = UNIDADES_ETAPA.get(etapa, '')
+        avance = f"{datos['procesados']:,}" + (f"/{datos['total']:,}" if datos['total'] else "")
+        return f"{avance} {unidad} · {self.tasa(etapa):,.1f} {unidad}/s · ETA {formatear_eta(self.eta(etapa))}"
+
+    # ===== DOCUMENTOS Y COLAS =====
+
+    def registrar_documento(self, segundos: float, bytes_escritos: int = 0):
+        with self._lock:
+            self.documentos += 1
+            self.latencia_total += segundos
+            self.bytes_escritos += bytes_escritos
+            if len(self.latencias) < MAX_MUESTRAS_LATENCIA:
+                self.latencias.append(segundos)
+            else:
+                posicion = random.randrange(self.documentos)
+                if posicion < MAX_MUESTRAS_LATENCIA:
+                    self.latencias[posicion] = segundos
+
+    def profundidad_cola(self, cola: str, valor: int):
+        with self._lock:
+            self.colas[cola] = valor
+
+    def latencia_percentiles(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            ordenadas = sorted(self.latencias)
+        return {'p50': percentil(ordenadas, 0.50), 'p95': percentil(ordenadas, 0.95)}
+
+    # ===== REPORTE =====
+
+    def reporte(self) -> Dict:
+        etapas = {}
+        for etapa in sorted(self.etapas, key=lambda e: ETAPAS_PIPELINE.index(e) if e in ETAPAS_PIPELINE else 99):
+            datos = self.etapas[etapa]
+            etapas[etapa] = {
+                'procesados': datos['procesados'],
+                'total': datos['total'],
+                'duracion_segundos': round(self.duracion(etapa), 3),
+                'por_segundo': round(self.tasa(etapa), 2),
+                **datos['extra'],
+            }
+        percentiles = self.latencia_percentiles()
+        duracion_render = self.duracion('render')
+        return {
+            'pipeline': self.nombre,
+            'sesion_id': self.sesion_id,
+            'inicio': datetime.fromtimestamp(self.inicio).isoformat(timespec='seconds'),
+            'duracion_segundos': round(time.time() - self.inicio, 3),
+            'etapas': etapas,
+            'documentos': {
+                'total': self.documentos,
+                'por_segundo': round(self.documentos / duracion_render, 2) if duracion_render > 0 else None,
+                'latencia_p50_segundos': percentiles['p50'],
+                'latencia_p95_segundos': percentiles['p95'],
+                'latencia_promedio_segundos': self.latencia_total / self.documentos if self.documentos else None,
+                'bytes_escritos': self.bytes_escritos,
+            },
+            'colas': dict(self.colas),
+        }
+
+    def texto_prometheus(self, reporte: Optional[Dict] = None) -> str:
+        reporte = reporte or self.reporte()
+        etiqueta = f'pipeline="{self.nombre}"'
+        lineas = []
+
+        def metrica(nombre: str, tipo: str, ayuda: str, muestras: List):
+            lineas.append(f"# HELP {PREFIJO_PROMETHEUS}_{nombre} {ayuda}")
+            lineas.append(f"# TYPE {PREFIJO_PROMETHEUS}_{nombre} {tipo}")
+            for etiquetas, valor in muestras:
+                if valor is not None:
+                    lineas.append(f"{PREFIJO_PROMETHEUS}_{nombre}{{{etiquetas}}} {valor}")
+
+        etapas = reporte['etapas'].items()
+        metrica('etapa_duracion_segundos', 'gauge', "Duración de la etapa en la última corrida",
+                [(f'{etiqueta},etapa="{e}"', d['duracion_segundos']) for e, d in etapas])
+        metrica('etapa_procesados', 'gauge', "Elementos procesados por la etapa",
+                [(f'{etiqueta},etapa="{e}"', d['procesados']) for e, d in etapas])
+        metrica('etapa_por_segundo', 'gauge', "Elementos por segundo de la etapa",
+                [(f'{etiqueta},etapa="{e}"', d['por_segundo']) for e, d in etapas])
+
+        documentos = reporte['documentos']
+        metrica('documento_latencia_segundos', 'summary', "Latencia de generación por documento", [
+            (f'{etiqueta},quantile="0.5"', documentos['latencia_p50_segundos']),
+            (f'{etiqueta},quantile="0.95"', documentos['latencia_p95_segundos']),
+        ])
+        lineas.append(f"{PREFIJO_PROMETHEUS}_documento_latencia_segundos_sum{{{etiqueta}}} {round(self.latencia_total, 6)}")
+        lineas.append(f"{PREFIJO_PROMETHEUS}_documento_latencia_segundos_count{{{etiqueta}}} {documentos['total']}")
+        metrica('bytes_escritos', 'gauge', "Bytes de PDF escritos en la última corrida",
+                [(etiqueta, documentos['bytes_escritos'])])
+        metrica('cola_profundidad', 'gauge', "Profundidad de cola al final de la corrida",
+                [(f'{etiqueta},cola="{c}"', v) for c, v in reporte['colas'].items()])
+        metrica('ultima_corrida_timestamp_segundos', 'gauge', "Fin de la última corrida (epoch)",
+                [(etiqueta, round(time.time(), 3))])
+        return "\n".join(lineas) + "\n"
+
+    def escribir_reporte(self, directorio: Optional[str] = None) -> Dict[str, str]:
+        """Escribe JSON y .prom (atómico); regresa las rutas"""
+        if not directorio:
+            from config.settings import settings
+            directorio = settings.METRICS_DIR
+        os.makedirs(directorio, exist_ok=True)
+        reporte = self.reporte()
+        marca = datetime.fromtimestamp(self.inicio).strftime('%Y%m%d_%H%M%S')
+        rutas = {
+            'json': os.path.join(directorio, f"pipeline_{self.nombre}_{marca}.json"),
+            # Un .prom por pipeline: el colector textfile lee siempre la última corrida
+            'prometheus': os.path.join(directorio, f"pipeline_{self.nombre}.prom"),
+        }
+        contenidos = {
+            'json': json.dumps(reporte, ensure_ascii=False, indent=2, default=str),
+            'prometheus': self.texto_prometheus(reporte),
+        }
+        for clave, ruta in rutas.items():
+            temporal = f"{ruta}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                f.write(contenidos[clave])
+            os.replace(temporal, ruta)
+        return rutas
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey, Numeric, Date
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey, Numeric, Date, Computed
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from config.database import Base
-import bcrypt
 import uuid
 
 class Usuario(Base):
@@ -24,15 +24,13 @@ class Usuario(Base):
 
     def set_password(self, password):
         """Encripta y establece la contraseña"""
-        salt = bcrypt.gensalt(rounds=12)
-        self.contraseña_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        from utils.security import generar_hash_password
+        self.contraseña_hash = generar_hash_password(password)
     
     def check_password(self, password):
         """Verifica si la contraseña coincide con el hash"""
-        try:
-            return bcrypt.checkpw(password.encode('utf-8'), self.contraseña_hash.encode('utf-8'))
-        except Exception:
-            return False
+        from utils.security import verificar_password
+        return verificar_password(password, self.contraseña_hash)
     
     def __repr__(self):
         return f"<Usuario(id={self.id}, usuario='{self.usuario}', rol='{self.rol}')>"
@@ -62,6 +60,7 @@ class IdentificadorPadrones(Base):
     nombre_tabla = Column(String(100), unique=True, nullable=False)
     activo = Column(Boolean, default=True)
     descripcion = Column(Text)
+    config_json = Column(JSON)  # Ej: {"particion": {"tipo": "hash", "columna": "cuenta", "particiones": 8, "tablas": {...}}}
 
 class Plantilla(Base):
     __tablename__ = "plantillas"
@@ -104,7 +103,7 @@ class EmisionTemp(Base):
     proyecto_id = Column(Integer, ForeignKey("proyectos.id"))
     plantilla_id = Column(Integer, ForeignKey("plantillas.id"))
     usuario_id = Column(Integer, ForeignKey("usuarios.id"))
-    datos_json = Column(JSON)
+    datos_json = Column(JSONB)
     cuenta = Column(String(50))
     codigo_afiliado = Column(String(50))
     estado = Column(String(20))
@@ -121,7 +120,10 @@ class EmisionFinal(Base):
     proyecto_id = Column(Integer, ForeignKey("proyectos.id"))
     plantilla_id = Column(Integer, ForeignKey("plantillas.id"))
     usuario_id = Column(Integer, ForeignKey("usuarios.id"))
-    datos_completos = Column(JSON)
+    datos_completos = Column(JSONB)
+    # Claves más consultadas, extraídas por PostgreSQL del documento
+    cuenta = Column(Text, Computed("datos_completos ->> 'cuenta'", persisted=True))
+    codigo_afiliado = Column(Text, Computed("datos_completos ->> 'codigo_afiliado'", persisted=True))
     archivo_generado = Column(String(255))
     fecha_generacion = Column(DateTime(timezone=True))
     estado_generacion = Column(String(20))
@@ -138,12 +140,91 @@ class EmisionesAcumuladas(Base):
     cuenta = Column(String(50))
     codigo_afiliado = Column(String(50))
     nombre_afiliado = Column(String(200))
-    datos_completos = Column(JSON)
+    datos_completos = Column(JSONB)
     nombre_archivo = Column(String(255))
     ruta_archivo = Column(String(500))
     fecha_emision = Column(DateTime(timezone=True))
     fecha_registro = Column(DateTime(timezone=True), server_default=func.now())
 
+class EjecucionEmision(Base):
+    """Ejecución de emisión masiva con checkpoint para pausar/reanudar"""
+    __tablename__ = "ejecuciones_emision"
+    __table_args__ = {'extend_existing': True}
+    
+    id = Column(Integer, primary_key=True, index=True)
+    proyecto_id = Column(Integer, ForeignKey("proyectos.id"))
+    plantilla_id = Column(Integer, ForeignKey("plantillas.id"))
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"))
+    sesion_id = Column(String(100), index=True)
+    ruta_salida = Column(String(500))
+    estado = Column(String(20), default='pendiente')  # 'pendiente', 'en_proceso', 'pausada', 'cancelada', 'completada', 'error'
+    tamano_lote = Column(Integer, default=100)
+    total_registros = Column(Integer, default=0)
+    procesados = Column(Integer, default=0)
+    exitosos = Column(Integer, default=0)
+    fallidos = Column(Integer, default=0)
+    ultimo_id_procesado = Column(Integer, default=0)  # Checkpoint: último EmisionTemp.id confirmado
+    errores_json = Column(JSON)
+    fecha_inicio = Column(DateTime(timezone=True), server_default=func.now())
+    fecha_actualizacion = Column(DateTime(timezone=True))
+    fecha_fin = Column(DateTime(timezone=True))
+
+class TrabajoCola(Base):
+    """Trabajo pendiente para los workers (ingesta, match, emisión, archivo)"""
+    __tablename__ = "cola_trabajos"
+    __table_args__ = {'extend_existing': True}
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(30), nullable=False)  # 'ingesta', 'match', 'emision', 'archivo', 'carga_padron'
+    estado = Column(String(20), default='pendiente', index=True)  # 'pendiente', 'en_proceso', 'completado', 'error', 'cancelado', 'pausado'
+    prioridad = Column(Integer, default=0)
+    parametros = Column(JSON)
+    resultado = Column(JSON)
+    progreso = Column(Integer, default=0)
+    mensaje = Column(Text)
+    control = Column(String(20))  # Solicitud desde la UI: 'pausar', 'cancelar'
+    intentos = Column(Integer, default=0)
+    max_intentos = Column(Integer, default=3)
+    worker_id = Column(String(100))
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"))
+    proyecto_id = Column(Integer, ForeignKey("proyectos.id"))
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+    fecha_inicio = Column(DateTime(timezone=True))
+    fecha_heartbeat = Column(DateTime(timezone=True))
+    fecha_fin = Column(DateTime(timezone=True))
+
+class CandidatoMatch(Base):
+    """Candidato del padrón para un registro sin match (búsqueda por similitud, pendiente de revisión)"""
+    __tablename__ = "candidatos_match"
+    __table_args__ = {'extend_existing': True}
+    
+    id = Column(Integer, primary_key=True, index=True)
+    emision_temp_id = Column(Integer, ForeignKey("emisiones_temp.id", ondelete="CASCADE"), index=True)
+    proyecto_id = Column(Integer, ForeignKey("proyectos.id"))
+    sesion_id = Column(String(100), index=True)
+    padron_id = Column(Integer)  # id de la fila en la tabla de padrón
+    columna = Column(String(100))  # Columna por la que se encontró
+    valor_buscado = Column(Text)
+    valor_padron = Column(Text)
+    similitud = Column(Numeric(5, 4))
+    rango = Column(Integer)  # 1 = mejor candidato del registro
+    estado = Column(String(20), default='pendiente')  # 'pendiente', 'aceptado', 'rechazado'
+    usuario_revision_id = Column(Integer, ForeignKey("usuarios.id"))
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+    fecha_revision = Column(DateTime(timezone=True))
+
+class CacheMatchPadron(Base):
+    """Resultado de match ya resuelto por clave normalizada (padron_id NULL = sin match)"""
+    __tablename__ = "cache_match_padron"
+    __table_args__ = {'extend_existing': True}
+    
+    uuid_padron = Column(String(100), primary_key=True)
+    firma_reglas = Column(String(20), primary_key=True, default='')  # Reglas de normalización aplicadas
+    clave = Column(Text, primary_key=True)  # cuenta y código afiliado normalizados
+    version_datos = Column(Integer, nullable=False)  # Versión del padrón con la que se resolvió
+    padron_id = Column(Integer)
+    fecha_actualizacion = Column(DateTime(timezone=True), server_default=func.now())
+
 class ConfiguracionSistema(Base):
     __tablename__ = "configuracion_sistema"
     __table_args__ = {'extend_existing': True}
@@ -0,0 +1,94 @@
+# core/normalizacion_claves.py - Normalización de cuenta / codigo_afiliado para el match
+"""Reglas de normalización de claves por proyecto.
+
+Se configuran en Proyecto.config_json['normalizacion_claves'] (lista de reglas) y
+se aplican siempre en el mismo orden. Cada regla existe en dos versiones
+equivalentes: vectorizada con pandas (ingesta y CSV) y como expresión SQL
+inmutable, para crear índices funcionales en el padrón y que el match siga
+usando índices en lugar de recorrer la tabla.
+"""
+import hashlib
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Orden de aplicación
+REGLAS_NORMALIZACION = ('trim', 'sin_separadores', 'sin_ceros_izquierda', 'mayusculas')
+
+DESCRIPCION_REGLAS = {
+    'trim': "Quitar espacios al inicio y al final",
+    'sin_separadores': "Quitar separadores (espacio, guion, punto, diagonal, guion bajo)",
+    'sin_ceros_izquierda': "Quitar ceros a la izquierda",
+    'mayusculas': "Convertir a mayúsculas",
+}
+
+CARACTERES_TRIM = ' \t\r\n'
+PATRON_SEPARADORES = '[ ./_-]'
+PATRON_CEROS_IZQUIERDA = '^0+(?=.)'  # Conserva un "0" si la clave es solo ceros
+
+
+def obtener_reglas(config_json: Optional[Dict]) -> List[str]:
+    """Reglas válidas del proyecto en orden de aplicación"""
+    configuradas = set((config_json or {}).get('normalizacion_claves') or [])
+    return [regla for regla in REGLAS_NORMALIZACION if regla in configuradas]
+
+
+def normalizar_serie(serie: 'pd.Series', reglas: List[str]) -> 'pd.Series':
+    """Aplica las reglas a una columna de texto (los nulos se conservan)"""
+    if not reglas:
+        return serie
+    resultado = serie.astype('string')
+    for regla in reglas:
+        if regla == 'trim':
+            resultado = resultado.str.strip(CARACTERES_TRIM)
+        elif regla == 'sin_separadores':
+            resultado = resultado.str.replace(PATRON_SEPARADORES, '', regex=True)
+        elif regla == 'sin_ceros_izquierda':
+            resultado = resultado.str.replace(PATRON_CEROS_IZQUIERDA, '', regex=True)
+        elif regla == 'mayusculas':
+            resultado = resultado.str.upper()
+    return resultado.astype(object).where(resultado.notna(), None)
+
+
+def normalizar_valor(valor: Optional[str], reglas: List[str]) -> Optional[str]:
+    """Versión escalar de normalizar_serie"""
+    import re
+
+    if valor is None:
+        return None
+    valor = str(valor)
+    for regla in reglas:
+        if regla == 'trim':
+            valor = valor.strip(CARACTERES_TRIM)
+        elif regla == 'sin_separadores':
+            valor = re.sub(PATRON_SEPARADORES, '', valor)
+        elif regla == 'sin_ceros_izquierda':
+            valor = re.sub(PATRON_CEROS_IZQUIERDA, '', valor)
+        elif regla == 'mayusculas':
+            valor = valor.upper()
+    return valor
+
+
+def expresion_sql(columna: str, reglas: List[str]) -> str:
+    """Expresión SQL equivalente (solo funciones inmutables, apta para índices)"""
+    expresion = f"{columna}::text"
+    if not reglas:
+        return columna
+    for regla in reglas:
+        if regla == 'trim':
+            expresion = f"btrim({expresion}, E' \\t\\r\\n')"
+        elif regla == 'sin_separadores':
+            expresion = f"regexp_replace({expresion}, '{PATRON_SEPARADORES}', '', 'g')"
+        elif regla == 'sin_ceros_izquierda':
+            expresion = f"regexp_replace({expresion}, '{PATRON_CEROS_IZQUIERDA}', '')"
+        elif regla == 'mayusculas':
+            expresion = f"upper({expresion})"
+    return expresion
+
+
+def firma_reglas(reglas: List[str]) -> str:
+    """Identificador corto del conjunto de reglas (nombres de índice, caché)"""
+    if not reglas:
+        return ''
+    return hashlib.md5(",".join(reglas).encode('utf-8')).hexdigest()[:6]
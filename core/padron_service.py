@@ -1,12 +1,137 @@
 # core/padron_service.py - VERSIÓN COMPLETA CON TABLAS DINÁMICAS
 from sqlalchemy.orm import Session
-from sqlalchemy import text, inspect, MetaData, Table, Column, Integer, String, Date, Numeric, Boolean, Text
-from typing import List, Dict, Optional, Tuple
+from sqlalchemy import text, bindparam, inspect, MetaData, Table, Column, Integer, String, Date, Numeric, Boolean, Text
+from typing import Callable, List, Dict, Optional, Tuple, TYPE_CHECKING
 from core.models import IdentificadorPadrones, Proyecto
+from collections import OrderedDict
+import threading
+import time
 import uuid
-import pandas as pd
 import re
 
+if TYPE_CHECKING:
+    import pandas as pd  # pandas se importa dentro de cada método (arranque más rápido)
+
+TIPOS_PARTICION = ('hash', 'lista')
+
+# Columnas que crea el sistema en cada tabla de padrón (no son datos del documento)
+COLUMNAS_INTERNAS_PADRON = ('id', 'fecha_creacion', 'fecha_actualizacion', 'hash_fila')
+
+
+def tipo_amigable(tipo_db: str) -> str:
+    """Traduce el data_type de PostgreSQL a la categoría que muestra la interfaz"""
+    if 'char' in tipo_db or 'text' in tipo_db:
+        return 'texto'
+    if 'int' in tipo_db or 'numeric' in tipo_db or 'decimal' in tipo_db:
+        return 'numero'
+    if 'date' in tipo_db or 'time' in tipo_db:
+        return 'fecha'
+    if 'bool' in tipo_db:
+        return 'booleano'
+    return 'texto'
+
+
+def sql_unicidad_id_particionada(conexion, nombre_tabla: str, columna_particion: str) -> str:
+    """ALTER TABLE que hace cumplir ids únicos en un padrón particionado.
+    La PK tendría que incluir la llave de partición y la volvería NOT NULL (las filas sin
+    valor van a la partición por defecto): UNIQUE (id, llave), con NULLS NOT DISTINCT
+    desde PostgreSQL 15 para que una llave NULL tampoco repita id."""
+    version = int(conexion.execute(text("SHOW server_version_num")).scalar())
+    nulos = " NULLS NOT DISTINCT" if version >= 150000 else ""
+    return (f"ALTER TABLE {nombre_tabla} ADD CONSTRAINT uq_{nombre_tabla[:50]}_id "
+            f"UNIQUE{nulos} (id, {columna_particion})")
+
+
+class CacheEsquemasPadron:
+    """Caché en proceso de la estructura de las tablas de padrón.
+    
+    Se llena con una sola consulta al catálogo para todos los padrones registrados
+    y se descarta al vencer el TTL o al invalidarla (creación de tabla, ALTER).
+    Un uuid o tabla que no está registrado recarga a lo más una vez cada
+    intervalo_recarga segundos (caché negativa: tablas de staging, emisiones_*).
+    """
+    
+    def __init__(self, ttl_segundos: float = 300, intervalo_recarga: float = 10):
+        self.ttl_segundos = ttl_segundos
+        self.intervalo_recarga = intervalo_recarga
+        self._por_uuid = {}  # uuid_padron -> {'nombre_tabla', 'columnas'}
+        self._por_tabla = {}  # nombre_tabla -> uuid_padron
+        self._cargado_en = None
+        self._lock = threading.Lock()
+    
+    def _vigente(self) -> bool:
+        return self._cargado_en is not None and time.monotonic() - self._cargado_en < self.ttl_segundos
+    
+    def _asegurar_clave(self, db: Session, clave: str, indice: Dict):
+        """Recarga si venció o si la clave falta y la última carga ya no es reciente"""
+        if not self._vigente():
+            self._cargar(db)
+        elif clave not in indice and time.monotonic() - self._cargado_en >= self.intervalo_recarga:
+            # Un padrón desconocido pudo crearse en otro proceso
+            self._cargar(db)
+    
+    def _cargar(self, db: Session):
+        resultado = db.execute(text("""
+            SELECT ip.uuid_padron, ip.nombre_tabla,
+                   c.column_name, c.data_type, c.is_nullable, c.column_default,
+                   c.character_maximum_length, c.numeric_precision, c.numeric_scale
+            FROM identificador_padrones ip
+            LEFT JOIN information_schema.columns c
+                   ON c.table_schema = 'public' AND c.table_name = ip.nombre_tabla
+            ORDER BY ip.uuid_padron, c.ordinal_position
+        """))
+        
+        por_uuid = {}
+        for row in resultado:
+            esquema = por_uuid.setdefault(row.uuid_padron, {'nombre_tabla': row.nombre_tabla, 'columnas': []})
+            if row.column_name is None:
+                continue  # Tabla registrada pero inexistente
+            esquema['columnas'].append({
+                "nombre": row.column_name,
+                "tipo_db": row.data_type,
+                "tipo": tipo_amigable(row.data_type),
+                "nullable": row.is_nullable == 'YES',
+                "valor_default": row.column_default,
+                "longitud": row.character_maximum_length,
+                "precision": row.numeric_precision,
+                "escala": row.numeric_scale
+            })
+        
+        self._por_uuid = por_uuid
+        self._por_tabla = {e['nombre_tabla']: u for u, e in por_uuid.items()}
+        self._cargado_en = time.monotonic()
+    
+    def obtener(self, db: Session, uuid_padron: str) -> Optional[Dict]:
+        """Esquema {'nombre_tabla', 'columnas'} de un padrón (None si no está registrado)"""
+        with self._lock:
+            self._asegurar_clave(db, uuid_padron, self._por_uuid)
+            return self._por_uuid.get(uuid_padron)
+    
+    def obtener_por_tabla(self, db: Session, nombre_tabla: str) -> Optional[Dict]:
+        with self._lock:
+            self._asegurar_clave(db, nombre_tabla, self._por_tabla)
+            uuid_padron = self._por_tabla.get(nombre_tabla)
+            return self._por_uuid.get(uuid_padron) if uuid_padron else None
+    
+    def invalidar(self):
+        """Descarta todo; la siguiente lectura recarga desde el catálogo"""
+        with self._lock:
+            self._cargado_en = None
+
+
+def _crear_cache_esquemas() -> CacheEsquemasPadron:
+    from config.settings import settings
+    return CacheEsquemasPadron(settings.PADRON_SCHEMA_TTL_SECONDS, settings.PADRON_SCHEMA_RELOAD_SECONDS)
+
+
+ESQUEMAS_PADRON = _crear_cache_esquemas()
+
+
+def invalidar_cache_esquemas():
+    """Llamar después de crear tablas de padrón o alterar sus columnas"""
+    ESQUEMAS_PADRON.invalidar()
+
+
 class PadronService:
     def __init__(self, db: Session):
         self.db = db
@@ -44,59 +169,13 @@ class PadronService:
             return None
     
     def obtener_columnas_padron(self, uuid_padron: str) -> List[Dict]:
-        """Obtiene las columnas REALES de una tabla de padrón específica"""
+        """Obtiene las columnas REALES de una tabla de padrón específica (desde la caché de esquemas)"""
         try:
-            identificador = self.db.query(IdentificadorPadrones).filter(
-                IdentificadorPadrones.uuid_padron == uuid_padron
-            ).first()
-            
-            if not identificador:
-                print(f"DEBUG: No se encontró padrón con UUID: {uuid_padron}")
+            esquema = ESQUEMAS_PADRON.obtener(self.db, uuid_padron)
+            if not esquema:
+                print(f"⚠️ No se encontró padrón con UUID: {uuid_padron}")
                 return []
-            
-            nombre_tabla_real = identificador.nombre_tabla
-            print(f"DEBUG: Buscando columnas de tabla REAL: {nombre_tabla_real}")
-            
-            query = text("""
-                SELECT 
-                    column_name as nombre,
-                    data_type as tipo,
-                    is_nullable as nullable,
-                    column_default as valor_default
-                FROM information_schema.columns 
-                WHERE table_schema = 'public'
-                AND table_name = :table_name
-                ORDER BY ordinal_position
-            """)
-            
-            resultado = self.db.execute(query, {"table_name": nombre_tabla_real})
-            columnas = []
-            
-            for row in resultado:
-                nombre = row.nombre
-                tipo_db = row.tipo
-                
-                if 'char' in tipo_db or 'text' in tipo_db:
-                    tipo_amigable = 'texto'
-                elif 'int' in tipo_db or 'numeric' in tipo_db or 'decimal' in tipo_db:
-                    tipo_amigable = 'numero'
-                elif 'date' in tipo_db or 'time' in tipo_db:
-                    tipo_amigable = 'fecha'
-                elif 'bool' in tipo_db:
-                    tipo_amigable = 'booleano'
-                else:
-                    tipo_amigable = 'texto'
-                
-                columnas.append({
-                    "nombre": nombre,
-                    "tipo_db": tipo_db,
-                    "tipo": tipo_amigable,
-                    "nullable": row.nullable == 'YES',
-                    "valor_default": row.valor_default
-                })
-            
-            print(f"DEBUG: Se encontraron {len(columnas)} columnas REALES")
-            return columnas
+            return [dict(columna) for columna in esquema['columnas']]
             
         except Exception as e:
             print(f"ERROR obteniendo columnas REALES: {e}")
@@ -193,7 +272,7 @@ class PadronService:
                 return []
             
             nombre_tabla_real = identificador.nombre_tabla
-            query = text(f"SELECT * FROM {nombre_tabla_real} LIMIT {limit}")
+            query = text(f"SELECT * FROM {nombre_tabla_real} ORDER BY id LIMIT {int(limit)}")
             resultado = self.db.execute(query)
             
             registros = []
@@ -206,81 +285,312 @@ class PadronService:
             print(f"Error obteniendo registros: {e}")
             return []
     
+    # ========== NAVEGACIÓN PAGINADA (KEYSET) ==========
+    
+    def _nombre_tabla_padron(self, uuid_padron: str) -> Optional[str]:
+        identificador = self.obtener_padron_por_uuid(uuid_padron)
+        return identificador.nombre_tabla if identificador else None
+    
+    @staticmethod
+    def version_padron(identificador: IdentificadorPadrones) -> int:
+        """Versión de los datos del padrón (cambia con cada carga o actualización)"""
+        return int((identificador.config_json or {}).get('version_datos', 0))
+    
+    def _incrementar_version_padron(self, identificador: IdentificadorPadrones):
+        """Marca los datos como modificados (se confirma con la transacción en curso)"""
+        from core.cache_match import invalidar_cache_match
+        
+        config = dict(identificador.config_json or {})
+        config['version_datos'] = self.version_padron(identificador) + 1
+        identificador.config_json = config
+        # Los resultados de match de la versión anterior ya no sirven
+        invalidar_cache_match(self.db, identificador.uuid_padron)
+    
+    def obtener_tipos_columnas(self, nombre_tabla: str) -> Dict[str, str]:
+        """{columna: data_type} de la tabla, en orden de definición"""
+        esquema = ESQUEMAS_PADRON.obtener_por_tabla(self.db, nombre_tabla)
+        if esquema:
+            return {c['nombre']: c['tipo_db'] for c in esquema['columnas']}
+        return self.columnas_catalogo(nombre_tabla)
+    
+    def columnas_catalogo(self, nombre_tabla: str) -> Dict[str, str]:
+        """{columna: data_type} directo del catálogo (tablas que no son padrón: sin caché)"""
+        resultado = self.db.execute(text("""
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = :tabla
+            ORDER BY ordinal_position
+        """), {"tabla": nombre_tabla})
+        return {row.column_name: row.data_type for row in resultado}
+    
+    def _columnas_indexadas(self, nombre_tabla: str) -> List[str]:
+        """Columnas que encabezan algún índice (aptas para ordenar por keyset)"""
+        resultado = self.db.execute(text("""
+            SELECT a.attname
+            FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+            WHERE i.indrelid = CAST(:tabla AS regclass)
+        """), {"tabla": nombre_tabla})
+        return [row.attname for row in resultado]
+    
+    def _armar_filtros_paginacion(self, nombre_tabla: str, columnas: Optional[List[str]],
+                                  busqueda: Optional[str], orden: str) -> Tuple[str, List[str], Dict, str]:
+        """Valida columnas/orden contra el catálogo y arma SELECT, WHERE y ORDER BY.
+        
+        Los nombres de columna solo se interpolan si existen en la tabla.
+        """
+        columnas_tabla = self.obtener_tipos_columnas(nombre_tabla)
+        if not columnas_tabla:
+            raise ValueError(f"La tabla {nombre_tabla} no existe o no tiene columnas")
+        
+        if orden != 'id':
+            if orden not in columnas_tabla:
+                raise ValueError(f"Columna de orden no válida: {orden}")
+            if orden not in self._columnas_indexadas(nombre_tabla):
+                print(f"⚠️ La columna {orden} no está indexada, se ordena por id")
+                orden = 'id'
+        
+        if columnas:
+            invalidas = [c for c in columnas if c not in columnas_tabla]
+            if invalidas:
+                raise ValueError(f"Columnas no válidas: {', '.join(invalidas)}")
+            proyeccion = list(dict.fromkeys(['id', orden] + list(columnas)))
+        else:
+            proyeccion = list(columnas_tabla.keys())
+        
+        condiciones = []
+        parametros = {}
+        if orden != 'id':
+            # La comparación por renglón (col, id) > (...) no admite NULL
+            condiciones.append(f"{orden} IS NOT NULL")
+        
+        if busqueda:
+            columnas_texto = [c for c in proyeccion
+                              if 'char' in columnas_tabla[c] or 'text' in columnas_tabla[c]]
+            if columnas_texto:
+                condiciones.append("(" + " OR ".join(f"{c} ILIKE :patron" for c in columnas_texto) + ")")
+                parametros['patron'] = f"%{busqueda.strip()}%"
+        
+        return ", ".join(proyeccion), condiciones, parametros, orden
+    
+    def obtener_pagina_registros(self, uuid_padron: str, despues_de: Optional[Tuple] = None,
+                                 limite: int = 100, columnas: Optional[List[str]] = None,
+                                 busqueda: Optional[str] = None,
+                                 orden: str = 'id') -> Tuple[List[Dict], Optional[Tuple]]:
+        """
+        Página de registros por keyset: WHERE (orden, id) > cursor ORDER BY orden, id.
+        El costo no depende de la posición (no usa OFFSET).
+        Returns: (registros, cursor_siguiente) — cursor None si ya no hay más
+        """
+        nombre_tabla = self._nombre_tabla_padron(uuid_padron)
+        if not nombre_tabla:
+            return [], None
+        
+        proyeccion, condiciones, parametros, orden = self._armar_filtros_paginacion(
+            nombre_tabla, columnas, busqueda, orden
+        )
+        
+        if despues_de is not None:
+            if orden == 'id':
+                condiciones.append("id > :cursor_id")
+            else:
+                condiciones.append(f"({orden}, id) > (:cursor_valor, :cursor_id)")
+                parametros['cursor_valor'] = despues_de[0]
+            parametros['cursor_id'] = despues_de[-1]
+        
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        orden_sql = "id" if orden == 'id' else f"{orden}, id"
+        parametros['limite'] = limite + 1  # Uno extra para saber si hay más
+        
+        resultado = self.db.execute(text(f"""
+            SELECT {proyeccion} FROM {nombre_tabla}
+            {where}
+            ORDER BY {orden_sql}
+            LIMIT :limite
+        """), parametros)
+        registros = [dict(row._mapping) for row in resultado]
+        
+        hay_mas = len(registros) > limite
+        registros = registros[:limite]
+        if not hay_mas or not registros:
+            return registros, None
+        
+        ultimo = registros[-1]
+        return registros, (ultimo[orden], ultimo['id'])
+    
+    def obtener_cursor_en_posicion(self, uuid_padron: str, posicion: int,
+                                   busqueda: Optional[str] = None, orden: str = 'id',
+                                   total: Optional[int] = None) -> Optional[Tuple]:
+        """Cursor (valor_orden, id) del registro en la posición dada (base 0).
+        
+        Sin OFFSET: la llave se estima interpolando la fracción posicion/total en el
+        rango min/max de id o, ordenando por otra columna, en los límites del
+        histograma de pg_stats, y se toma el primer registro desde ahí (un recorrido
+        de índice con LIMIT 1). Con llaves no uniformes la posición real difiere.
+        Con búsqueda activa esos rangos no reflejan el filtro, así que se avanza
+        por keyset en bloques y el cursor es exacto.
+        """
+        nombre_tabla = self._nombre_tabla_padron(uuid_padron)
+        if not nombre_tabla or posicion < 0:
+            return None
+        
+        _, condiciones, parametros, orden = self._armar_filtros_paginacion(
+            nombre_tabla, None, busqueda, orden
+        )
+        if total is None:
+            total, _ = self.contar_registros(uuid_padron, busqueda)
+        if total <= 0:
+            return None
+        if busqueda:
+            return self._cursor_por_bloques(nombre_tabla, condiciones, parametros, orden, posicion)
+        fraccion = min(1.0, posicion / max(total - 1, 1))
+        
+        estimado = None
+        if orden == 'id':
+            limites = self.db.execute(text(
+                f"SELECT min(id) AS minimo, max(id) AS maximo FROM {nombre_tabla}"
+            )).first()
+            if limites.minimo is None:
+                return None
+            estimado = limites.minimo + int((limites.maximo - limites.minimo) * fraccion)
+        else:
+            # Sin estadísticas (tabla sin ANALYZE) se empieza desde el inicio
+            histograma = self.db.execute(text("""
+                SELECT histogram_bounds::text::text[] FROM pg_stats
+                WHERE schemaname = 'public' AND tablename = :tabla AND attname = :columna
+            """), {"tabla": nombre_tabla, "columna": orden}).scalar()
+            if histograma:
+                estimado = histograma[int(round(fraccion * (len(histograma) - 1)))]
+        
+        orden_sql = "id" if orden == 'id' else f"{orden}, id"
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        if estimado is not None:
+            where = f"{where} AND {orden} >= :estimado" if where else f"WHERE {orden} >= :estimado"
+            parametros['estimado'] = estimado
+        
+        fila = self.db.execute(text(f"""
+            SELECT {orden} AS valor, id FROM {nombre_tabla}
+            {where}
+            ORDER BY {orden_sql}
+            LIMIT 1
+        """), parametros).first()
+        
+        if fila is None and estimado is not None:
+            # La estimación quedó después del último registro: usar el último
+            parametros.pop('estimado')
+            where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+            orden_desc = "id DESC" if orden == 'id' else f"{orden} DESC, id DESC"
+            fila = self.db.execute(text(f"""
+                SELECT {orden} AS valor, id FROM {nombre_tabla}
+                {where}
+                ORDER BY {orden_desc}
+                LIMIT 1
+            """), parametros).first()
+        return (fila.valor, fila.id) if fila else None
+    
+    def _cursor_por_bloques(self, nombre_tabla: str, condiciones: List[str], parametros: Dict,
+                            orden: str, posicion: int, tamano_bloque: int = 10000) -> Optional[Tuple]:
+        """Cursor exacto avanzando por keyset en bloques (solo se lee la última llave de cada uno)"""
+        orden_sql = "id" if orden == 'id' else f"{orden}, id"
+        
+        cursor = None
+        restantes = posicion + 1
+        while restantes > 0:
+            bloque = min(tamano_bloque, restantes)
+            condiciones_bloque = list(condiciones)
+            parametros_bloque = dict(parametros, limite=bloque)
+            if cursor is not None:
+                if orden == 'id':
+                    condiciones_bloque.append("id > :cursor_id")
+                else:
+                    condiciones_bloque.append(f"({orden}, id) > (:cursor_valor, :cursor_id)")
+                    parametros_bloque['cursor_valor'] = cursor[0]
+                parametros_bloque['cursor_id'] = cursor[1]
+            where = f"WHERE {' AND '.join(condiciones_bloque)}" if condiciones_bloque else ""
+            
+            fila = self.db.execute(text(f"""
+                SELECT valor, id, count(*) OVER () AS leidos FROM (
+                    SELECT {orden} AS valor, id FROM {nombre_tabla}
+                    {where}
+                    ORDER BY {orden_sql}
+                    LIMIT :limite
+                ) bloque
+                ORDER BY valor DESC, id DESC
+                LIMIT 1
+            """), parametros_bloque).first()
+            
+            if fila is None:
+                break
+            cursor = (fila.valor, fila.id)
+            if fila.leidos < bloque:
+                # Posición más allá del final: queda el último registro
+                break
+            restantes -= bloque
+        return cursor
+    
+    def contar_registros(self, uuid_padron: str, busqueda: Optional[str] = None,
+                         exacto: bool = False, umbral_estimado: int = 200000) -> Tuple[int, bool]:
+        """
+        Total de registros del padrón.
+        Sin búsqueda y en tablas grandes usa la estimación del planificador (reltuples).
+        Returns: (total, es_estimado)
+        """
+        nombre_tabla = self._nombre_tabla_padron(uuid_padron)
+        if not nombre_tabla:
+            return 0, False
+        
+        if not busqueda and not exacto:
+            estimado = self.db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:tabla AS regclass)"),
+                {"tabla": nombre_tabla}
+            ).scalar() or 0
+            if estimado >= umbral_estimado:
+                return int(estimado), True
+        
+        _, condiciones, parametros, _ = self._armar_filtros_paginacion(nombre_tabla, None, busqueda, 'id')
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        total = self.db.execute(text(f"SELECT COUNT(*) FROM {nombre_tabla} {where}"), parametros).scalar()
+        return int(total or 0), False
+    
     # ========== NUEVOS MÉTODOS PARA PADRÓN DINÁMICO ==========
     
     def analizar_estructura_csv(self, csv_path: str) -> Tuple[bool, List[Dict], List[str]]:
         """
         Analiza CSV y devuelve estructura de columnas detectadas
+        (muestra de inicio, bloques al azar y final; ver core/inferencia_tipos.py)
         Returns: (éxito, columnas, errores)
         """
         try:
-            # Detectar encoding
-            import chardet
-            with open(csv_path, 'rb') as f:
-                raw_data = f.read()
-                result = chardet.detect(raw_data)
-                encoding = result.get('encoding', 'utf-8')
-            
-            # Leer CSV
-            df = pd.read_csv(csv_path, encoding=encoding, nrows=100)  # Solo primeras 100 filas para análisis
+            from core.inferencia_tipos import inferir_tipos_csv
             
-            if df.empty:
+            inferencia = inferir_tipos_csv(csv_path)
+            if not inferencia:
                 return False, [], ["El CSV está vacío"]
             
             columnas = []
-            for col_name in df.columns:
-                # Detectar tipo de dato
-                tipo_detectado = self._detectar_tipo_columna(df[col_name])
-                
-                # Crear definición de columna
-                columna_def = {
-                    'nombre_original': col_name,
-                    'nombre_limpio': self._limpiar_nombre_columna(col_name),
-                    'tipo_sugerido': tipo_detectado,
-                    'tipo_sql': self._tipo_a_sql(tipo_detectado),
-                    'nullable': df[col_name].isnull().any(),
-                    'ejemplos': df[col_name].dropna().head(3).tolist()
-                }
-                
-                columnas.append(columna_def)
+            for info in inferencia:
+                columnas.append({
+                    'nombre_original': info['nombre_original'],
+                    'nombre_limpio': self._limpiar_nombre_columna(info['nombre_original']),
+                    'tipo_sugerido': info['tipo'],
+                    'tipo_sql': info['tipo_sql'],
+                    'nullable': info['nullable'],
+                    'ejemplos': info['ejemplos'],
+                    'confianza': info['confianza'],
+                    'longitud_max': info['longitud_max'],
+                    'formato_fecha': info['formato_fecha'],
+                    'tipo_alternativo': info['tipo_alternativo'],
+                    'atipicos': info['atipicos']
+                })
             
             return True, columnas, []
             
         except Exception as e:
             return False, [], [f"Error analizando CSV: {str(e)}"]
     
-    def _detectar_tipo_columna(self, serie: pd.Series) -> str:
+    def _detectar_tipo_columna(self, serie: 'pd.Series') -> str:
         """Detecta el tipo de dato de una columna"""
-        # Eliminar nulos para análisis
-        serie_limpia = serie.dropna()
-        
-        if len(serie_limpia) == 0:
-            return 'texto'
-        
-        # Intentar convertir a numérico
-        try:
-            pd.to_numeric(serie_limpia)
-            # Verificar si son enteros
-            if all(serie_limpia.apply(lambda x: str(x).replace('.', '', 1).replace('-', '', 1).isdigit())):
-                return 'entero'
-            return 'decimal'
-        except:
-            pass
-        
-        # Intentar convertir a fecha
-        try:
-            pd.to_datetime(serie_limpia)
-            return 'fecha'
-        except:
-            pass
-        
-        # Verificar booleanos
-        valores_unicos = serie_limpia.unique()
-        if len(valores_unicos) <= 2 and all(str(v).lower() in ['true', 'false', '1', '0', 'si', 'no', 'yes', 'no'] for v in valores_unicos):
-            return 'booleano'
-        
-        # Por defecto, texto
-        return 'texto'
+        from core.inferencia_tipos import inferir_tipo_serie
+        return inferir_tipo_serie(serie)['tipo']
     
     def _limpiar_nombre_columna(self, nombre: str) -> str:
         """Limpia nombre de columna para SQL"""
@@ -314,15 +624,22 @@ class PadronService:
         mapeo = {
             'texto': f'VARCHAR({longitud})',
             'entero': 'INTEGER',
+            'entero_grande': 'BIGINT',
             'decimal': 'NUMERIC(15, 2)',
             'fecha': 'DATE',
+            'fecha_hora': 'TIMESTAMP',
             'booleano': 'BOOLEAN'
         }
         return mapeo.get(tipo_detectado, 'TEXT')
     
-    def crear_tabla_padron_dinamica(self, nombre_proyecto: str, columnas: List[Dict]) -> Tuple[bool, str, str, List[str]]:
+    def crear_tabla_padron_dinamica(self, nombre_proyecto: str, columnas: List[Dict],
+                                    particion: Optional[Dict] = None) -> Tuple[bool, str, str, List[str]]:
         """
         Crea tabla de padrón dinámica
+        particion (opcional):
+            {'tipo': 'hash', 'columna': 'cuenta', 'particiones': 8}
+            {'tipo': 'lista', 'columna': 'region',
+             'grupos': [{'nombre': 'norte', 'valores': ['N1', 'N2']}, ...]}  (+ partición 'otros' por defecto)
         Returns: (éxito, uuid_padron, nombre_tabla, errores)
         """
         try:
@@ -339,8 +656,8 @@ class PadronService:
             # Construir SQL CREATE TABLE
             sql_columnas = []
             
-            # ID autoincremental
-            sql_columnas.append("id SERIAL PRIMARY KEY")
+            # ID autoincremental (en tablas particionadas la unicidad va en UNIQUE (id, llave))
+            sql_columnas.append("id SERIAL NOT NULL" if particion else "id SERIAL PRIMARY KEY")
             
             # Columnas del usuario
             for col in columnas:
@@ -354,16 +671,38 @@ class PadronService:
             sql_columnas.append("fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
             sql_columnas.append("fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
             
+            sentencias_particion = []
+            config = {}
+            clausula_particion = ""
+            if particion:
+                clausula_particion, sentencias_particion, config_particion = self._sql_particionado(
+                    nombre_tabla, particion, [c['nombre_limpio'] for c in columnas]
+                )
+                config['particion'] = config_particion
+            
             # Crear tabla
             create_sql = f"""
                 CREATE TABLE {nombre_tabla} (
                     {', '.join(sql_columnas)}
-                )
+                ){clausula_particion}
             """
             
             print(f"📝 SQL generado:\n{create_sql}")
             
             self.db.execute(text(create_sql))
+            for sentencia in sentencias_particion:
+                self.db.execute(text(sentencia))
+            
+            # Índices de búsqueda (en tablas particionadas se crean en cada partición)
+            nombres_columnas = [c['nombre_limpio'] for c in columnas]
+            if particion:
+                # También sirve las búsquedas por id (match, caché, candidatos)
+                self.db.execute(text(sql_unicidad_id_particionada(self.db, nombre_tabla, particion['columna'])))
+            for columna_clave in ('cuenta', 'codigo_afiliado'):
+                if columna_clave in nombres_columnas:
+                    self.db.execute(text(
+                        f"CREATE INDEX idx_{nombre_tabla[:40]}_{columna_clave} ON {nombre_tabla} ({columna_clave})"
+                    ))
             self.db.commit()
             
             # Registrar en identificador_padrones
@@ -371,11 +710,13 @@ class PadronService:
                 uuid_padron=uuid_padron,
                 nombre_tabla=nombre_tabla,
                 activo=True,
-                descripcion=f"Padrón del proyecto: {nombre_proyecto}"
+                descripcion=f"Padrón del proyecto: {nombre_proyecto}",
+                config_json=config or None
             )
             
             self.db.add(identificador)
             self.db.commit()
+            invalidar_cache_esquemas()
             
             print(f"✅ Tabla {nombre_tabla} creada con UUID {uuid_padron}")
             
@@ -388,6 +729,200 @@ class PadronService:
             traceback.print_exc()
             return False, "", "", [f"Error creando tabla: {str(e)}"]
     
+    # ========== PARTICIONADO ==========
+    
+    @staticmethod
+    def _nombre_particion(nombre_tabla: str, sufijo: str) -> str:
+        """Nombre de partición dentro del límite de 63 caracteres de PostgreSQL"""
+        return f"{nombre_tabla[:62 - len(sufijo)]}_{sufijo}"
+    
+    @staticmethod
+    def _literal_sql(valor) -> str:
+        """Literal de texto para DDL (FOR VALUES IN no admite parámetros)"""
+        return "'" + str(valor).replace("'", "''") + "'"
+    
+    def _sql_particionado(self, nombre_tabla: str, particion: Dict,
+                          columnas: List[str]) -> Tuple[str, List[str], Dict]:
+        """Cláusula PARTITION BY, sentencias de particiones y configuración a guardar"""
+        tipo = particion.get('tipo')
+        columna = particion.get('columna')
+        if tipo not in TIPOS_PARTICION:
+            raise ValueError(f"Tipo de partición no válido: {tipo}")
+        if columna not in columnas:
+            raise ValueError(f"La columna de partición '{columna}' no existe en el padrón")
+        
+        sentencias = []
+        tablas = {}
+        
+        if tipo == 'hash':
+            total = int(particion.get('particiones', 8))
+            if not 2 <= total <= 256:
+                raise ValueError("El número de particiones hash debe estar entre 2 y 256")
+            for residuo in range(total):
+                tabla = self._nombre_particion(nombre_tabla, f"p{residuo}")
+                tablas[str(residuo)] = tabla
+                sentencias.append(
+                    f"CREATE TABLE {tabla} PARTITION OF {nombre_tabla} "
+                    f"FOR VALUES WITH (MODULUS {total}, REMAINDER {residuo})"
+                )
+            config = {'tipo': 'hash', 'columna': columna, 'particiones': total, 'tablas': tablas}
+            return f" PARTITION BY HASH ({columna})", sentencias, config
+        
+        grupos = []
+        for grupo in particion.get('grupos', []):
+            nombre = self._limpiar_nombre_columna(grupo['nombre'])
+            valores = [str(v) for v in grupo.get('valores', []) if str(v).strip()]
+            if not valores or nombre in tablas:
+                raise ValueError(f"Grupo de partición inválido o repetido: {grupo['nombre']}")
+            tabla = self._nombre_particion(nombre_tabla, nombre)
+            tablas[nombre] = tabla
+            grupos.append({'nombre': nombre, 'valores': valores})
+            sentencias.append(
+                f"CREATE TABLE {tabla} PARTITION OF {nombre_tabla} "
+                f"FOR VALUES IN ({', '.join(self._literal_sql(v) for v in valores)})"
+            )
+        
+        # Valores no listados (y NULL) caen en la partición por defecto
+        tabla_otros = self._nombre_particion(nombre_tabla, 'otros')
+        tablas['otros'] = tabla_otros
+        sentencias.append(f"CREATE TABLE {tabla_otros} PARTITION OF {nombre_tabla} DEFAULT")
+        
+        config = {'tipo': 'lista', 'columna': columna, 'grupos': grupos, 'tablas': tablas}
+        return f" PARTITION BY LIST ({columna})", sentencias, config
+    
+    def listar_particiones(self, uuid_padron: str) -> List[Dict]:
+        """Particiones del padrón con su rango y filas estimadas"""
+        identificador = self.obtener_padron_por_uuid(uuid_padron)
+        if not identificador:
+            return []
+        
+        resultado = self.db.execute(text("""
+            SELECT c.relname AS tabla,
+                   pg_get_expr(c.relpartbound, c.oid) AS limite,
+                   GREATEST(c.reltuples, 0)::bigint AS filas_estimadas
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:tabla AS regclass)
+            ORDER BY c.relname
+        """), {"tabla": identificador.nombre_tabla})
+        return [dict(row._mapping) for row in resultado]
+    
+    def _condicion_particion(self, config: Dict, nombre_tabla: str, particion: str) -> Tuple[str, Dict]:
+        """Condición SQL que cumplen las filas que pertenecen a la partición"""
+        columna = config['columna']
+        if config['tipo'] == 'hash':
+            return (
+                f"satisfies_hash_partition(CAST(:tabla_padre AS regclass), :modulo, :residuo, {columna})",
+                {"tabla_padre": nombre_tabla, "modulo": config['particiones'], "residuo": int(particion)}
+            )
+        
+        if particion == 'otros':
+            todos = [v for g in config['grupos'] for v in g['valores']]
+            if not todos:
+                return "TRUE", {}
+            return f"({columna} IS NULL OR {columna}::text NOT IN :valores)", {"valores": tuple(todos)}
+        
+        grupo = next(g for g in config['grupos'] if g['nombre'] == particion)
+        return f"{columna}::text IN :valores", {"valores": tuple(grupo['valores'])}
+    
+    def recargar_particion(self, uuid_padron: str, particion: str, csv_path: str,
+                           columnas_mapeo: Dict[str, str]) -> Tuple[bool, int, List[str]]:
+        """
+        Reemplaza el contenido de UNA partición con las filas del CSV que le corresponden.
+        El CSV se copia a una tabla temporal (COPY) y en la misma transacción se vacía
+        la partición y se inserta; las demás particiones no se tocan.
+        particion: residuo (hash) o nombre de grupo / 'otros' (lista)
+        Returns: (éxito, registros_insertados, errores)
+        """
+        try:
+            identificador = self.obtener_padron_por_uuid(uuid_padron)
+            if not identificador:
+                return False, 0, ["Padrón no encontrado"]
+            
+            config = (identificador.config_json or {}).get('particion')
+            if not config:
+                return False, 0, ["El padrón no está particionado"]
+            
+            particion = str(particion)
+            tabla_particion = config['tablas'].get(particion)
+            if not tabla_particion:
+                return False, 0, [f"Partición no encontrada: {particion}"]
+            
+            nombre_tabla = identificador.nombre_tabla
+            condicion, parametros = self._condicion_particion(config, nombre_tabla, particion)
+            staging = f"stg_{uuid.uuid4().hex[:12]}"
+            self.db.execute(text(
+                f"CREATE TEMP TABLE {staging} (LIKE {nombre_tabla} INCLUDING DEFAULTS) ON COMMIT DROP"
+            ))
+            
+            cargados, errores = self._copiar_csv(csv_path, staging, columnas_mapeo)
+            if errores:
+                self.db.rollback()
+                return False, 0, errores
+            
+            consulta_insert = text(f"INSERT INTO {tabla_particion} SELECT * FROM {staging} WHERE {condicion}")
+            consulta_fuera = text(f"SELECT COUNT(*) FROM {staging} WHERE NOT ({condicion})")
+            if 'valores' in parametros:
+                consulta_insert = consulta_insert.bindparams(bindparam('valores', expanding=True))
+                consulta_fuera = consulta_fuera.bindparams(bindparam('valores', expanding=True))
+            
+            self.db.execute(text(f"TRUNCATE {tabla_particion}"))
+            insertados = self.db.execute(consulta_insert, parametros).rowcount
+            fuera = self.db.execute(consulta_fuera, parametros).scalar() or 0
+            self._incrementar_version_padron(identificador)
+            self.db.commit()
+            
+            avisos = []
+            if fuera:
+                avisos.append(f"{fuera} de {cargados} filas del CSV no pertenecen a la partición {particion} y se omitieron")
+            print(f"✅ Partición {tabla_particion} recargada: {insertados} registros")
+            return True, insertados, avisos
+            
+        except Exception as e:
+            self.db.rollback()
+            return False, 0, [f"Error recargando partición: {str(e)}"]
+    
+    def _copiar_csv(self, csv_path: str, nombre_tabla: str, columnas_mapeo: Dict[str, str],
+                    tamano_lote: int = 50000, confirmar_por_lote: bool = False) -> Tuple[int, List[str]]:
+        """
+        Copia el CSV a una tabla con COPY FROM STDIN, por lotes.
+        Con confirmar_por_lote un lote fallido no invalida los anteriores.
+        Returns: (registros_copiados, errores)
+        """
+        import io
+        import pandas as pd
+        from core.inferencia_tipos import detectar_encoding
+        
+        encoding = detectar_encoding(csv_path)
+        copiados = 0
+        errores = []
+        
+        lector = pd.read_csv(csv_path, encoding=encoding, dtype=str, chunksize=tamano_lote)
+        for num_lote, lote in enumerate(lector, start=1):
+            columnas_csv = [c for c in columnas_mapeo if c in lote.columns]
+            columnas_destino = [columnas_mapeo[c] for c in columnas_csv]
+            
+            buffer = io.StringIO()
+            lote[columnas_csv].to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            
+            try:
+                cursor = self.db.connection().connection.cursor()
+                cursor.copy_expert(
+                    f"COPY {nombre_tabla} ({', '.join(columnas_destino)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+                copiados += len(lote)
+                if confirmar_por_lote:
+                    self.db.commit()
+            except Exception as e:
+                errores.append(f"Error en lote {num_lote}: {str(e)}")
+                if not confirmar_por_lote:
+                    break
+                self.db.rollback()
+        
+        return copiados, errores
+    
     def _generar_nombre_tabla(self, nombre_proyecto: str) -> str:
         """Genera nombre de tabla único y válido"""
         # Limpiar nombre
@@ -403,19 +938,25 @@ class PadronService:
         if len(nombre_base) > 60:
             nombre_base = nombre_base[:60]
         
-        # Si ya existe, agregar sufijo numérico
-        nombre_final = nombre_base
-        contador = 1
+        # Una sola consulta trae el nombre base y todas sus variantes con sufijo
+        patron = nombre_base.replace('\\', '\\\\').replace('_', '\\_').replace('%', '\\%') + '\\_%'
+        existentes = {
+            row.table_name for row in self.db.execute(text("""
+                SELECT table_name FROM information_schema.tables
+                WHERE table_schema = 'public'
+                AND (table_name = :base OR table_name LIKE :patron)
+            """), {"base": nombre_base, "patron": patron})
+        }
         
-        while self._tabla_existe(nombre_final):
+        if nombre_base not in existentes:
+            return nombre_base
+        
+        for contador in range(1, 101):
             nombre_final = f"{nombre_base}_{contador}"
-            contador += 1
-            
-            if contador > 100:  # Evitar loop infinito
-                nombre_final = f"{prefijo}{uuid.uuid4().hex[:8]}"
-                break
+            if nombre_final not in existentes:
+                return nombre_final
         
-        return nombre_final
+        return f"{prefijo}{uuid.uuid4().hex[:8]}"  # Evitar loop infinito
     
     def _tabla_existe(self, nombre_tabla: str) -> bool:
         """Verifica si una tabla existe"""
@@ -449,53 +990,13 @@ class PadronService:
             
             nombre_tabla = identificador.nombre_tabla
             
-            # Detectar encoding
-            import chardet
-            with open(csv_path, 'rb') as f:
-                raw_data = f.read()
-                result = chardet.detect(raw_data)
-                encoding = result.get('encoding', 'utf-8')
-            
-            # Leer CSV
-            df = pd.read_csv(csv_path, encoding=encoding)
-            df = df.where(pd.notnull(df), None)  # NaN a None
-            
-            # Preparar datos para inserción
-            columnas_insert = list(columnas_mapeo.values())
-            
-            registros_insertados = 0
-            errores = []
-            
-            # Insertar por lotes (100 registros por vez)
-            batch_size = 100
-            
-            for i in range(0, len(df), batch_size):
-                batch = df.iloc[i:i+batch_size]
-                
-                try:
-                    # Construir SQL INSERT
-                    placeholders = ', '.join([f':{col}' for col in columnas_insert])
-                    sql = f"""
-                        INSERT INTO {nombre_tabla} ({', '.join(columnas_insert)})
-                        VALUES ({placeholders})
-                    """
-                    
-                    # Preparar datos
-                    for _, row in batch.iterrows():
-                        datos = {}
-                        for csv_col, tabla_col in columnas_mapeo.items():
-                            if csv_col in row.index:
-                                datos[tabla_col] = row[csv_col]
-                        
-                        self.db.execute(text(sql), datos)
-                        registros_insertados += 1
-                    
-                    self.db.commit()
-                    
-                except Exception as e:
-                    self.db.rollback()
-                    errores.append(f"Error en lote {i//batch_size + 1}: {str(e)}")
-            
+            # COPY por lotes; en tablas particionadas PostgreSQL enruta cada fila
+            registros_insertados, errores = self._copiar_csv(
+                csv_path, nombre_tabla, columnas_mapeo, confirmar_por_lote=True
+            )
+            if registros_insertados:
+                self._incrementar_version_padron(identificador)
+                self.db.commit()
             return True, registros_insertados, errores
             
         except Exception as e:
@@ -505,83 +1006,690 @@ class PadronService:
     def actualizar_padron_desde_csv(self, uuid_padron: str, csv_path: str, columnas_mapeo: Dict[str, str], 
                                     columna_clave: str = 'cuenta') -> Tuple[bool, int, int, List[str]]:
         """
-        Actualiza padrón desde CSV (UPDATE si existe, INSERT si no)
+        Actualiza padrón desde CSV (UPDATE si cambió, INSERT si no existe)
+        Usa la actualización delta: las filas sin cambios no se reescriben.
         Returns: (éxito, actualizados, nuevos, errores)
         """
+        exito, resumen, errores = self.actualizar_padron_delta(
+            uuid_padron, csv_path, columnas_mapeo, columna_clave
+        )
+        return exito, resumen['actualizados'], resumen['nuevos'], errores
+    
+    # ========== ÍNDICES DE CLAVES NORMALIZADAS ==========
+    
+    @staticmethod
+    def _nombre_indice_normalizado(nombre_tabla: str, columna_clave: str, firma: str) -> str:
+        return f"idx_{nombre_tabla[:34]}_{columna_clave[:8]}_n{firma}"
+    
+    def crear_indices_normalizados(self, uuid_padron: str, reglas: List[str]) -> Tuple[bool, List[str]]:
+        """
+        Índices funcionales sobre cuenta / codigo_afiliado con las reglas de
+        normalización del proyecto, para que el match normalizado use índice.
+        Se crean al guardar las reglas o crear el padrón, con CONCURRENTLY para no
+        bloquear escrituras; el match solo revisa que existan (indices_normalizados_faltantes).
+        Returns: (éxito, errores)
+        """
+        from core.normalizacion_claves import expresion_sql, firma_reglas
+        
+        if not reglas:
+            return True, []
+        
         try:
-            identificador = self.obtener_padron_por_uuid(uuid_padron)
-            if not identificador:
-                return False, 0, 0, ["Padrón no encontrado"]
+            nombre_tabla = self._nombre_tabla_padron(uuid_padron)
+            if not nombre_tabla:
+                return False, ["Padrón no encontrado"]
+            
+            columnas_tabla = self.obtener_tipos_columnas(nombre_tabla)
+            firma = firma_reglas(reglas)
+            existentes = self._indices_tabla(nombre_tabla)
+            particiones = self._particiones_tabla(nombre_tabla)
+            self.db.commit()  # CONCURRENTLY no puede correr con una transacción abierta en la sesión
+            
+            with self.db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+                for columna_clave in ('cuenta', 'codigo_afiliado'):
+                    if columna_clave not in columnas_tabla:
+                        continue
+                    nombre_indice = self._nombre_indice_normalizado(nombre_tabla, columna_clave, firma)
+                    if existentes.get(nombre_indice):
+                        continue
+                    if nombre_indice in existentes and particiones is None:
+                        conexion.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre_indice}"))
+                    print(f"📝 Creando índice normalizado {nombre_indice}...")
+                    self._crear_indice_concurrente(
+                        conexion, nombre_indice, nombre_tabla,
+                        f"(({expresion_sql(columna_clave, reglas)}))", particiones
+                    )
+            return True, []
             
-            nombre_tabla = identificador.nombre_tabla
+        except Exception as e:
+            self.db.rollback()
+            return False, [f"Error creando índices normalizados: {str(e)}"]
+    
+    def indices_normalizados_faltantes(self, nombre_tabla: str, reglas: List[str]) -> List[str]:
+        """Índices de las reglas que no existen o quedaron inválidos (solo lectura del catálogo)"""
+        from core.normalizacion_claves import firma_reglas
+        
+        if not reglas:
+            return []
+        columnas_tabla = self.obtener_tipos_columnas(nombre_tabla)
+        existentes = self._indices_tabla(nombre_tabla)
+        firma = firma_reglas(reglas)
+        nombres = [
+            self._nombre_indice_normalizado(nombre_tabla, columna_clave, firma)
+            for columna_clave in ('cuenta', 'codigo_afiliado') if columna_clave in columnas_tabla
+        ]
+        return [nombre for nombre in nombres if not existentes.get(nombre)]
+    
+    def _indices_tabla(self, nombre_tabla: str) -> Dict[str, bool]:
+        """{nombre_indice: válido} de la tabla"""
+        return {
+            fila.nombre: fila.valido for fila in self.db.execute(text("""
+                SELECT c.relname AS nombre, i.indisvalid AS valido
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE i.indrelid = CAST(:tabla AS regclass)
+            """), {"tabla": nombre_tabla})
+        }
+    
+    def columnas_similitud(self, nombre_tabla: str) -> List[str]:
+        """Columnas para la búsqueda por similitud: claves y columnas de nombre"""
+        columnas_tabla = self.obtener_tipos_columnas(nombre_tabla)
+        return [
+            c for c, tipo in columnas_tabla.items()
+            if c in ('cuenta', 'codigo_afiliado')
+            or ('nombre' in c and tipo_amigable(tipo) == 'texto')
+        ]
+    
+    def crear_indices_trigrama(self, uuid_padron: str) -> Tuple[bool, List[str], List[str]]:
+        """
+        Índices GiST con pg_trgm para la búsqueda por similitud (segunda pasada del match).
+        GiST resuelve ORDER BY col <-> valor LIMIT k (vecinos más cercanos) sin ordenar
+        todo lo que pasa el umbral. Se crean con CONCURRENTLY para no bloquear escrituras
+        en el padrón (en tablas particionadas, partición por partición); un índice
+        inválido de un intento anterior se reconstruye.
+        Returns: (éxito, columnas_indexadas, errores)
+        """
+        try:
+            nombre_tabla = self._nombre_tabla_padron(uuid_padron)
+            if not nombre_tabla:
+                return False, [], ["Padrón no encontrado"]
+            
+            columnas = self.columnas_similitud(nombre_tabla)
+            existentes = self._indices_tabla(nombre_tabla)
+            particiones = self._particiones_tabla(nombre_tabla)
+            self.db.commit()  # CONCURRENTLY no puede correr con una transacción abierta en la sesión
+            
+            with self.db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+                for columna in columnas:
+                    nombre_indice = f"idx_{nombre_tabla[:32]}_{columna[:16]}_trgm_gist"
+                    if existentes.get(nombre_indice):
+                        continue
+                    # En la tabla particionada el índice padre queda inválido hasta adjuntar
+                    # todas las particiones: se completa en lugar de borrarse
+                    if nombre_indice in existentes and particiones is None:
+                        conexion.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre_indice}"))
+                    print(f"📝 Creando índice de similitud {nombre_indice}...")
+                    self._crear_indice_concurrente(
+                        conexion, nombre_indice, nombre_tabla,
+                        f"USING gist (({columna}::text) gist_trgm_ops)", particiones
+                    )
+                    # El GIN anterior solo servía al filtro %: deja de costar en cada escritura
+                    self._eliminar_indice(
+                        conexion, f"idx_{nombre_tabla[:36]}_{columna[:16]}_trgm", particiones is not None
+                    )
+            return True, columnas, []
             
-            # Detectar encoding y leer CSV
-            import chardet
-            with open(csv_path, 'rb') as f:
-                result = chardet.detect(f.read())
-                encoding = result.get('encoding', 'utf-8')
+        except Exception as e:
+            self.db.rollback()
+            return False, [], [f"Error creando índices de similitud (¿extensión pg_trgm instalada?): {str(e)}"]
+    
+    def _particiones_tabla(self, nombre_tabla: str) -> Optional[List[str]]:
+        """Particiones de la tabla (None si no está particionada)"""
+        relkind = self.db.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = CAST(:tabla AS regclass)"), {"tabla": nombre_tabla}
+        ).scalar()
+        if relkind != 'p':
+            return None
+        resultado = self.db.execute(text("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:tabla AS regclass)
+            ORDER BY c.relname
+        """), {"tabla": nombre_tabla})
+        return [row.relname for row in resultado]
+    
+    def _crear_indice_concurrente(self, conexion, nombre_indice: str, nombre_tabla: str,
+                                  definicion: str, particiones: Optional[List[str]]):
+        """
+        CREATE INDEX CONCURRENTLY sobre una conexión AUTOCOMMIT. PostgreSQL no lo admite
+        en tablas particionadas: ahí el padre se crea con ON ONLY (solo catálogo), cada
+        partición se indexa con CONCURRENTLY y se adjunta; al adjuntar la última el
+        índice padre queda válido. Repetirlo completa lo que un intento anterior dejó.
+        """
+        if particiones is None:
+            conexion.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre_indice} ON {nombre_tabla} {definicion}"
+            ))
+            return
+        
+        conexion.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre_indice} ON ONLY {nombre_tabla} {definicion}"))
+        for numero, particion in enumerate(particiones):
+            indice_particion = self._nombre_particion(nombre_indice, f"p{numero}")
+            valido = conexion.execute(text("""
+                SELECT i.indisvalid FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = :indice
+            """), {"indice": indice_particion}).scalar()
+            if valido is False:
+                conexion.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {indice_particion}"))
+            conexion.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {indice_particion} ON {particion} {definicion}"
+            ))
+            # Adjuntar un índice ya adjunto a este mismo padre no hace nada
+            conexion.execute(text(f"ALTER INDEX {nombre_indice} ATTACH PARTITION {indice_particion}"))
+    
+    @staticmethod
+    def _eliminar_indice(conexion, nombre_indice: str, particionada: bool):
+        """DROP INDEX sin bloquear escrituras; los índices particionados no admiten CONCURRENTLY"""
+        concurrente = "" if particionada else "CONCURRENTLY "
+        conexion.execute(text(f"DROP INDEX {concurrente}IF EXISTS {nombre_indice}"))
+    
+    # ========== EVOLUCIÓN DE ESQUEMA ==========
+    
+    def mapeo_desde_csv(self, csv_path: str) -> Dict[str, str]:
+        """{columna_csv: columna_tabla} usando la misma limpieza de nombres que al crear el padrón"""
+        import pandas as pd
+        from core.inferencia_tipos import detectar_encoding
+        
+        encabezados = pd.read_csv(csv_path, encoding=detectar_encoding(csv_path), nrows=0).columns
+        return {str(c): self._limpiar_nombre_columna(str(c)) for c in encabezados}
+    
+    def planificar_evolucion_esquema(self, uuid_padron: str,
+                                     csv_path: str) -> Tuple[bool, List[Dict], List[Dict], List[str]]:
+        """
+        Compara el CSV con la tabla del padrón y propone cambios aditivos:
+        columnas nuevas, VARCHAR más amplios y cambios de tipo seguros
+        (integer→bigint/numeric, date→timestamp, numeric más grande).
+        Las columnas con tipo incompatible no se proponen: con alguna, el plan no
+        se debe aplicar (la carga fallaría o truncaría esas columnas).
+        Returns: (éxito, cambios, incompatibles, avisos)
+            cambio: {'accion', 'columna', 'tipo_actual', 'tipo_nuevo', 'sql', 'solo_catalogo'}
+            incompatible: {'columna', 'tipo_actual', 'tipo_csv', 'mensaje'}
+        """
+        try:
+            from core.inferencia_tipos import inferir_tipos_csv
+            
+            esquema = ESQUEMAS_PADRON.obtener(self.db, uuid_padron)
+            if not esquema:
+                return False, [], [], ["Padrón no encontrado"]
+            
+            nombre_tabla = esquema['nombre_tabla']
+            actuales = {c['nombre']: c for c in esquema['columnas']}
+            cambios = []
+            incompatibles = []
+            avisos = []
+            vistas = set()
+            
+            for info in inferir_tipos_csv(csv_path):
+                columna = self._limpiar_nombre_columna(info['nombre_original'])
+                vistas.add(columna)
+                actual = actuales.get(columna)
+                
+                if actual is None:
+                    # Columna nueva: sin DEFAULT, solo se modifica el catálogo
+                    cambios.append({
+                        'accion': 'agregar_columna', 'columna': columna,
+                        'tipo_actual': None, 'tipo_nuevo': info['tipo_sql'],
+                        'sql': f"ALTER TABLE {nombre_tabla} ADD COLUMN IF NOT EXISTS {columna} {info['tipo_sql']} NULL",
+                        'solo_catalogo': True
+                    })
+                    continue
+                
+                if columna in COLUMNAS_INTERNAS_PADRON:
+                    continue
+                
+                cambio = self._cambio_tipo_seguro(actual, info)
+                if cambio is None:
+                    continue
+                if cambio == 'incompatible':
+                    incompatibles.append({
+                        'columna': columna, 'tipo_actual': actual['tipo_db'], 'tipo_csv': info['tipo'],
+                        'mensaje': f"⚠️ {columna}: la tabla es {actual['tipo_db']} y el CSV trae {info['tipo']} "
+                                   f"(requiere revisión manual)"
+                    })
+                    continue
+                
+                tipo_nuevo, solo_catalogo = cambio
+                cambios.append({
+                    'accion': 'ampliar_varchar' if tipo_nuevo.startswith(('VARCHAR', 'TEXT')) else 'cambiar_tipo',
+                    'columna': columna,
+                    'tipo_actual': self._tipo_db_legible(actual),
+                    'tipo_nuevo': tipo_nuevo,
+                    'sql': f"ALTER TABLE {nombre_tabla} ALTER COLUMN {columna} TYPE {tipo_nuevo}",
+                    'solo_catalogo': solo_catalogo
+                })
             
-            df = pd.read_csv(csv_path, encoding=encoding)
-            df = df.where(pd.notnull(df), None)
+            ausentes = [c for c in actuales if c not in vistas and c not in COLUMNAS_INTERNAS_PADRON]
+            if ausentes:
+                avisos.append(f"ℹ️ Columnas del padrón que no vienen en el CSV (se conservan): {', '.join(ausentes)}")
             
-            actualizados = 0
-            nuevos = 0
-            errores = []
+            return True, cambios, incompatibles, avisos
             
-            # Verificar que columna_clave existe
-            if columna_clave not in columnas_mapeo.values():
-                return False, 0, 0, [f"Columna clave '{columna_clave}' no encontrada en mapeo"]
+        except Exception as e:
+            return False, [], [], [f"Error comparando esquema: {str(e)}"]
+    
+    @staticmethod
+    def _tipo_db_legible(columna: Dict) -> str:
+        if columna['tipo_db'] == 'character varying' and columna.get('longitud'):
+            return f"VARCHAR({columna['longitud']})"
+        if columna['tipo_db'] == 'numeric' and columna.get('precision'):
+            return f"NUMERIC({columna['precision']}, {columna.get('escala') or 0})"
+        return columna['tipo_db'].upper()
+    
+    @staticmethod
+    def _cambio_tipo_seguro(actual: Dict, info: Dict):
+        """(tipo_nuevo, solo_catalogo), None si no hace falta, o 'incompatible'"""
+        tipo_db = actual['tipo_db']
+        tipo = info['tipo']
+        
+        if tipo_db == 'text':
+            return None
+        
+        if tipo_db == 'character varying':
+            longitud = actual.get('longitud')
+            if longitud is None or info['longitud_max'] <= longitud:
+                return None
+            nuevo = info['tipo_sql'] if info['tipo_sql'].startswith(('VARCHAR', 'TEXT')) else 'TEXT'
+            if nuevo.startswith('VARCHAR') and int(nuevo[8:-1]) <= longitud:
+                nuevo = 'TEXT'
+            return nuevo, True  # Ampliar varchar o pasar a text no reescribe la tabla
+        
+        if tipo_db == 'integer':
+            if tipo == 'entero':
+                return None
+            if tipo == 'entero_grande':
+                return 'BIGINT', False
+            if tipo == 'decimal':
+                return info['tipo_sql'], False
+            return 'incompatible'
+        
+        if tipo_db == 'bigint':
+            if tipo in ('entero', 'entero_grande'):
+                return None
+            if tipo == 'decimal':
+                return info['tipo_sql'], False
+            return 'incompatible'
+        
+        if tipo_db == 'numeric':
+            if tipo not in ('entero', 'entero_grande', 'decimal'):
+                return 'incompatible'
+            precision = actual.get('precision') or 0
+            escala = actual.get('escala') or 0
+            digitos = info.get('digitos_enteros', info['longitud_max'])
+            decimales = info.get('decimales', 0)
+            if not precision or (digitos <= precision - escala and decimales <= escala):
+                return None
+            nueva_escala = max(escala, decimales)
+            nueva_precision = max(precision, digitos + nueva_escala + 2)
+            # Aumentar precisión sin cambiar escala no reescribe la tabla
+            return f"NUMERIC({nueva_precision}, {nueva_escala})", nueva_escala == escala
+        
+        if tipo_db == 'date':
+            if tipo == 'fecha':
+                return None
+            if tipo == 'fecha_hora':
+                return 'TIMESTAMP', False
+            return 'incompatible'
+        
+        if tipo_db.startswith('timestamp'):
+            return None if tipo in ('fecha', 'fecha_hora') else 'incompatible'
+        
+        if tipo_db == 'boolean':
+            return None if tipo == 'booleano' else 'incompatible'
+        
+        return None
+    
+    def aplicar_evolucion_esquema(self, uuid_padron: str, cambios: List[Dict],
+                                  lock_timeout: str = '5s') -> Tuple[bool, int, List[str]]:
+        """
+        Aplica los cambios planificados en una transacción.
+        lock_timeout evita quedar en cola detrás de consultas largas bloqueando a todos.
+        Returns: (éxito, cambios_aplicados, errores)
+        """
+        if not cambios:
+            return True, 0, []
+        
+        try:
+            identificador = self.obtener_padron_por_uuid(uuid_padron)
+            if not identificador:
+                return False, 0, ["Padrón no encontrado"]
             
-            # Obtener nombre CSV de la columna clave
-            csv_clave = None
-            for csv_col, tabla_col in columnas_mapeo.items():
-                if tabla_col == columna_clave:
-                    csv_clave = csv_col
-                    break
+            self.db.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+            for cambio in cambios:
+                print(f"📝 {cambio['sql']}")
+                self.db.execute(text(cambio['sql']))
             
-            if not csv_clave or csv_clave not in df.columns:
-                return False, 0, 0, [f"Columna clave '{csv_clave}' no encontrada en CSV"]
+            # Columnas nuevas y cambios de tipo que reescriben la tabla (p. ej. integer -> numeric
+            # cambia el texto de cada valor) cambian el contenido del hash de filas
+            if any(c['accion'] == 'agregar_columna' or not c['solo_catalogo'] for c in cambios) \
+                    and identificador.config_json:
+                config = dict(identificador.config_json)
+                config.pop('hash_fila', None)
+                identificador.config_json = config
+            self._incrementar_version_padron(identificador)
             
-            # Procesar cada registro
-            for _, row in df.iterrows():
-                try:
-                    valor_clave = row[csv_clave]
-                    
-                    # Verificar si existe
-                    check_sql = f"SELECT id FROM {nombre_tabla} WHERE {columna_clave} = :clave"
-                    existe = self.db.execute(text(check_sql), {"clave": valor_clave}).first()
-                    
-                    # Preparar datos
-                    datos = {}
-                    for csv_col, tabla_col in columnas_mapeo.items():
-                        if csv_col in row.index:
-                            datos[tabla_col] = row[csv_col]
-                    
-                    if existe:
-                        # UPDATE
-                        set_clauses = ', '.join([f"{col} = :{col}" for col in datos.keys()])
-                        update_sql = f"""
-                            UPDATE {nombre_tabla}
-                            SET {set_clauses}, fecha_actualizacion = CURRENT_TIMESTAMP
-                            WHERE {columna_clave} = :clave
-                        """
-                        datos['clave'] = valor_clave
-                        self.db.execute(text(update_sql), datos)
-                        actualizados += 1
-                    else:
-                        # INSERT
-                        columnas = ', '.join(datos.keys())
-                        placeholders = ', '.join([f':{col}' for col in datos.keys()])
-                        insert_sql = f"INSERT INTO {nombre_tabla} ({columnas}) VALUES ({placeholders})"
-                        self.db.execute(text(insert_sql), datos)
-                        nuevos += 1
-                    
-                except Exception as e:
-                    errores.append(f"Error en registro con clave {valor_clave}: {str(e)}")
+            self.db.commit()
+            invalidar_cache_esquemas()
+            return True, len(cambios), []
             
+        except Exception as e:
+            self.db.rollback()
+            return False, 0, [f"Error aplicando cambios de esquema: {str(e)}"]
+    
+    # ========== ACTUALIZACIÓN DELTA ==========
+    
+    @staticmethod
+    def _expresion_hash(columnas: List[str], alias: str) -> str:
+        """md5 del contenido de la fila; NULL se distingue de cadena vacía"""
+        partes = ", ".join(f"coalesce({alias}.{c}::text, '\\N')" for c in columnas)
+        return f"md5(concat_ws(chr(31), {partes}))"
+    
+    def _preparar_hash_filas(self, identificador: IdentificadorPadrones, columnas: List[str]):
+        """Asegura la columna hash_fila y la recalcula si cambió el conjunto de columnas"""
+        nombre_tabla = identificador.nombre_tabla
+        config = dict(identificador.config_json or {})
+        
+        if 'hash_fila' not in self.obtener_tipos_columnas(nombre_tabla):
+            # Sin DEFAULT: solo toca el catálogo
+            self.db.execute(text(f"ALTER TABLE {nombre_tabla} ADD COLUMN IF NOT EXISTS hash_fila CHAR(32)"))
+            invalidar_cache_esquemas()
+        
+        if config.get('hash_fila') != columnas:
+            print(f"📝 Calculando hash de filas de {nombre_tabla} (solo la primera vez)...")
+            expresion = self._expresion_hash(columnas, 't')
+            self.db.execute(text(f"""
+                UPDATE {nombre_tabla} AS t SET hash_fila = {expresion}
+                WHERE t.hash_fila IS DISTINCT FROM {expresion}
+            """))
+            config['hash_fila'] = columnas
+            identificador.config_json = config
+        else:
+            # Filas cargadas por COPY u otros medios todavía sin hash
+            self.db.execute(text(f"""
+                UPDATE {nombre_tabla} AS t SET hash_fila = {self._expresion_hash(columnas, 't')}
+                WHERE t.hash_fila IS NULL
+            """))
+        
+        self.db.commit()
+    
+    def actualizar_padron_delta(self, uuid_padron: str, csv_path: str, columnas_mapeo: Dict[str, str],
+                                columna_clave: str = 'cuenta', eliminar_faltantes: bool = False,
+                                confirmar: Optional[Callable[[Dict], bool]] = None) -> Tuple[bool, Dict, List[str]]:
+        """
+        Actualiza el padrón aplicando solo las diferencias reales.
+        Cada fila guarda un md5 de su contenido (hash_fila); el CSV se copia a una tabla
+        temporal, se compara por llave y hash, y solo se insertan, actualizan (o eliminan)
+        las filas que cambiaron. Antes de aplicar se llama confirmar(resumen) (diálogo en
+        la interfaz, control del trabajo en el worker); si regresa False no se aplica nada.
+        Returns: (éxito, resumen, errores)
+            resumen: {'nuevos', 'actualizados', 'sin_cambios', 'eliminados', 'duplicados',
+                      'sin_clave', 'aplicado'}
+        """
+        resumen = {'nuevos': 0, 'actualizados': 0, 'sin_cambios': 0, 'eliminados': 0,
+                   'duplicados': 0, 'sin_clave': 0, 'aplicado': False}
+        try:
+            identificador = self.obtener_padron_por_uuid(uuid_padron)
+            if not identificador:
+                return False, resumen, ["Padrón no encontrado"]
+            
+            if columna_clave not in columnas_mapeo.values():
+                return False, resumen, [f"Columna clave '{columna_clave}' no encontrada en mapeo"]
+            
+            nombre_tabla = identificador.nombre_tabla
+            columnas_tabla = self.obtener_tipos_columnas(nombre_tabla)
+            faltantes = [c for c in columnas_mapeo.values() if c not in columnas_tabla]
+            if faltantes:
+                return False, resumen, [f"Columnas inexistentes en el padrón: {', '.join(faltantes)}"]
+            
+            columnas = sorted(set(columnas_mapeo.values()) - set(COLUMNAS_INTERNAS_PADRON))
+            self.db.execute(text(
+                f"CREATE INDEX IF NOT EXISTS idx_{nombre_tabla[:40]}_{columna_clave[:18]} "
+                f"ON {nombre_tabla} ({columna_clave})"
+            ))
+            self._preparar_hash_filas(identificador, columnas)
+            
+            # 1. CSV -> tabla temporal con el mismo tipo de columnas
+            # _orden numera las filas en el orden del archivo (COPY no la incluye)
+            staging = f"stg_{uuid.uuid4().hex[:12]}"
+            self.db.execute(text(
+                f"CREATE TEMP TABLE {staging} (LIKE {nombre_tabla} INCLUDING DEFAULTS, "
+                f"_orden BIGINT GENERATED ALWAYS AS IDENTITY) ON COMMIT DROP"
+            ))
+            cargados, errores = self._copiar_csv(csv_path, staging, columnas_mapeo)
+            if errores:
+                self.db.rollback()
+                return False, resumen, errores
+            
+            # Sin llave la fila nunca coincide con el padrón (se insertaría en cada carga): se descarta
+            resumen['sin_clave'] = self.db.execute(text(f"""
+                DELETE FROM {staging} WHERE {columna_clave} IS NULL OR btrim({columna_clave}::text) = ''
+            """)).rowcount
+            
+            # Llaves repetidas en el CSV: gana la última fila del archivo (con índice desde antes)
+            self.db.execute(text(f"CREATE INDEX ON {staging} ({columna_clave}, _orden)"))
+            resumen['duplicados'] = self.db.execute(text(f"""
+                DELETE FROM {staging} a
+                WHERE EXISTS (
+                    SELECT 1 FROM {staging} b
+                    WHERE b.{columna_clave} = a.{columna_clave} AND b._orden > a._orden
+                )
+            """)).rowcount
+            
+            self.db.execute(text(f"UPDATE {staging} AS s SET hash_fila = {self._expresion_hash(columnas, 's')}"))
+            self.db.execute(text(f"ANALYZE {staging}"))
+            
+            # 2. Resumen de diferencias
+            conteo = self.db.execute(text(f"""
+                SELECT
+                    COUNT(*) FILTER (WHERE t.id IS NULL) AS nuevos,
+                    COUNT(*) FILTER (WHERE t.id IS NOT NULL AND t.hash_fila IS DISTINCT FROM s.hash_fila) AS actualizados,
+                    COUNT(*) FILTER (WHERE t.hash_fila = s.hash_fila) AS sin_cambios
+                FROM {staging} s
+                LEFT JOIN {nombre_tabla} t ON t.{columna_clave} = s.{columna_clave}
+            """)).first()
+            resumen.update(nuevos=conteo.nuevos, actualizados=conteo.actualizados, sin_cambios=conteo.sin_cambios)
+            
+            if eliminar_faltantes:
+                resumen['eliminados'] = self.db.execute(text(f"""
+                    SELECT COUNT(*) FROM {nombre_tabla} t
+                    WHERE NOT EXISTS (SELECT 1 FROM {staging} s WHERE s.{columna_clave} = t.{columna_clave})
+                """)).scalar()
+            
+            print(f"📊 Delta {nombre_tabla}: {resumen}")
+            if confirmar is not None and not confirmar(dict(resumen)):
+                self.db.rollback()
+                return True, resumen, []
+            
+            # 3. Aplicar solo los cambios reales
+            asignaciones = ", ".join(f"{c} = s.{c}" for c in columnas if c != columna_clave)
+            if resumen['actualizados']:
+                self.db.execute(text(f"""
+                    UPDATE {nombre_tabla} AS t
+                    SET {asignaciones + ', ' if asignaciones else ''}hash_fila = s.hash_fila,
+                        fecha_actualizacion = CURRENT_TIMESTAMP
+                    FROM {staging} s
+                    WHERE t.{columna_clave} = s.{columna_clave}
+                    AND t.hash_fila IS DISTINCT FROM s.hash_fila
+                """))
+            
+            if resumen['nuevos']:
+                lista_columnas = ", ".join(columnas)
+                self.db.execute(text(f"""
+                    INSERT INTO {nombre_tabla} ({lista_columnas}, hash_fila)
+                    SELECT {", ".join(f"s.{c}" for c in columnas)}, s.hash_fila
+                    FROM {staging} s
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM {nombre_tabla} t WHERE t.{columna_clave} = s.{columna_clave}
+                    )
+                """))
+            
+            if eliminar_faltantes and resumen['eliminados']:
+                self.db.execute(text(f"""
+                    DELETE FROM {nombre_tabla} t
+                    WHERE NOT EXISTS (SELECT 1 FROM {staging} s WHERE s.{columna_clave} = t.{columna_clave})
+                """))
+            
+            self._incrementar_version_padron(identificador)
             self.db.commit()
-            return True, actualizados, nuevos, errores
+            resumen['aplicado'] = True
+            print(f"✅ Padrón {nombre_tabla} actualizado por delta ({cargados} filas leídas)")
+            return True, resumen, []
             
         except Exception as e:
             self.db.rollback()
-            return False, 0, 0, [f"Error actualizando padrón: {str(e)}"]
\ No newline at end of file
+            return False, resumen, [f"Error en actualización delta: {str(e)}"]
+
+
+class RegistrosPadronPaginados:
+    """Vista perezosa de un padrón que se comporta como lista (len, índice).
+    
+    Las páginas se traen bajo demanda por keyset, se guardan en una caché acotada
+    y la siguiente página se precarga en segundo plano. Saltar a cualquier
+    posición solo cuesta localizar la llave en el índice, pero la llave es una
+    estimación: las páginas alcanzadas por un salto (y las que siguen a partir de
+    ella) quedan marcadas como aproximadas (posicion_aproximada).
+    """
+    
+    def __init__(self, uuid_padron: str, tamano_pagina: int = 100, columnas: Optional[List[str]] = None,
+                 busqueda: Optional[str] = None, orden: str = 'id', max_paginas: int = 20,
+                 session_factory=None):
+        if session_factory is None:
+            from config.database import SessionLocal
+            session_factory = SessionLocal
+        
+        self.uuid_padron = uuid_padron
+        self.tamano_pagina = tamano_pagina
+        self.columnas = columnas
+        self.busqueda = busqueda or None
+        self.orden = orden
+        self.max_paginas = max_paginas
+        self.session_factory = session_factory
+        
+        self._paginas = OrderedDict()  # num_pagina -> registros
+        self._cursores = {}  # num_pagina -> cursor del último registro de esa página
+        self._paginas_aproximadas = set()  # Páginas cuya posición viene de un salto estimado
+        self._lock = threading.Lock()
+        self._precargando = set()
+        
+        db = self.session_factory()
+        try:
+            self.total, self.total_estimado = PadronService(db).contar_registros(uuid_padron, self.busqueda)
+        finally:
+            db.close()
+    
+    def __len__(self) -> int:
+        return self.total
+    
+    def __bool__(self) -> bool:
+        return self.total > 0
+    
+    def __getitem__(self, indice: int) -> Dict:
+        if not isinstance(indice, int):
+            raise TypeError("Solo se admite acceso por posición")
+        if indice < 0:
+            indice += self.total
+        if not 0 <= indice < self.total:
+            raise IndexError(indice)
+        
+        num_pagina, desplazamiento = divmod(indice, self.tamano_pagina)
+        registros = self._obtener_pagina(num_pagina)
+        
+        if desplazamiento >= len(registros) and registros and self.posicion_aproximada(indice):
+            # Salto estimado cerca del final: el registro más cercano disponible
+            return registros[-1]
+        if desplazamiento >= len(registros):
+            # El total era estimado y la tabla es más corta: ajustarlo
+            self.total = num_pagina * self.tamano_pagina + len(registros)
+            self.total_estimado = False
+            raise IndexError(indice)
+        
+        # Precargar la siguiente página al acercarse al final de la actual
+        if desplazamiento >= self.tamano_pagina // 2:
+            self._precargar(num_pagina + 1)
+        return registros[desplazamiento]
+    
+    def posicion_aproximada(self, indice: int) -> bool:
+        """True si el registro en esa posición se alcanzó con un salto estimado"""
+        with self._lock:
+            return indice // self.tamano_pagina in self._paginas_aproximadas
+    
+    def _obtener_pagina(self, num_pagina: int) -> List[Dict]:
+        with self._lock:
+            if num_pagina in self._paginas:
+                self._paginas.move_to_end(num_pagina)
+                return self._paginas[num_pagina]
+        
+        db = self.session_factory()
+        try:
+            return self._cargar_pagina(db, num_pagina)
+        finally:
+            db.close()
+    
+    def _cargar_pagina(self, db: Session, num_pagina: int) -> List[Dict]:
+        service = PadronService(db)
+        
+        aproximada = False
+        if num_pagina == 0:
+            cursor = None
+        else:
+            with self._lock:
+                cursor = self._cursores.get(num_pagina - 1)
+                aproximada = (num_pagina - 1) in self._paginas_aproximadas
+            if cursor is None:
+                # Salto: estimar el último registro de la página anterior
+                cursor = service.obtener_cursor_en_posicion(
+                    self.uuid_padron, num_pagina * self.tamano_pagina - 1, self.busqueda, self.orden,
+                    total=self.total
+                )
+                if cursor is None:
+                    return []
+                # Con búsqueda el cursor se calcula por bloques y es exacto
+                aproximada = not self.busqueda
+        
+        registros, siguiente = service.obtener_pagina_registros(
+            self.uuid_padron, cursor, self.tamano_pagina, self.columnas, self.busqueda, self.orden
+        )
+        
+        with self._lock:
+            self._paginas[num_pagina] = registros
+            self._paginas.move_to_end(num_pagina)
+            if aproximada:
+                self._paginas_aproximadas.add(num_pagina)
+            else:
+                self._paginas_aproximadas.discard(num_pagina)
+            if siguiente is not None:
+                self._cursores[num_pagina] = siguiente
+            while len(self._paginas) > self.max_paginas:
+                self._paginas.popitem(last=False)
+        return registros
+    
+    def _precargar(self, num_pagina: int):
+        if num_pagina * self.tamano_pagina >= self.total:
+            return
+        with self._lock:
+            if num_pagina in self._paginas or num_pagina in self._precargando:
+                return
+            self._precargando.add(num_pagina)
+        
+        def trabajo():
+            db = self.session_factory()
+            try:
+                self._cargar_pagina(db, num_pagina)
+            except Exception as e:
+                print(f"⚠️ Error precargando página {num_pagina} del padrón: {e}")
+            finally:
+                db.close()
+                with self._lock:
+                    self._precargando.discard(num_pagina)
+        
+        threading.Thread(target=trabajo, daemon=True).start()
@@ -8,6 +8,7 @@ from reportlab.platypus import Paragraph
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+import io
 import os
 from typing import Dict, List, Optional
 import traceback
@@ -82,16 +83,7 @@ class PDFGenerator:
         try:
             print(f"🎨 Generando PDF con {len(campos)} campos...")
             
-            # Crear canvas
-            c = canvas.Canvas(output_path, pagesize=self.page_size)
-            width, height = self.page_size
-            
-            # Procesar cada campo
-            for campo in campos:
-                self._dibujar_campo_en_pdf(c, campo, datos, width, height)
-            
-            # Guardar
-            c.save()
+            self._dibujar_documento(output_path, campos, datos)
             print(f"✅ PDF generado: {output_path}")
             return True
             
@@ -100,6 +92,27 @@ class PDFGenerator:
             traceback.print_exc()
             return False
     
+    def generar_pdf_en_memoria(self, campos: List[Dict], datos: Dict) -> Optional[bytes]:
+        """Genera el mismo PDF que generar_pdf_con_datos pero sin tocar disco"""
+        try:
+            buffer = io.BytesIO()
+            self._dibujar_documento(buffer, campos, datos)
+            return buffer.getvalue()
+        except Exception as e:
+            print(f"❌ Error generando PDF en memoria: {e}")
+            return None
+    
+    def _dibujar_documento(self, destino, campos: List[Dict], datos: Dict):
+        """Dibuja todos los campos en un canvas (destino: ruta o archivo binario)"""
+        c = canvas.Canvas(destino, pagesize=self.page_size)
+        width, height = self.page_size
+        
+        # Procesar cada campo
+        for campo in campos:
+            self._dibujar_campo_en_pdf(c, campo, datos, width, height)
+        
+        c.save()
+    
     def _dibujar_campo_en_pdf(self, canvas_obj, campo: Dict, datos: Dict, 
                              page_width, page_height):
         """Dibuja un campo individual en el PDF con alineación REAL"""
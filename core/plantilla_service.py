@@ -0,0 +1,84 @@
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List
+from core.models import CampoPlantilla, Plantilla
+
+
+class PlantillaService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def obtener_campos_config(self, plantilla_id: int) -> List[Dict]:
+        """Obtiene los campos activos de una plantilla en el formato que usa PDFGenerator"""
+        campos_db = self.db.query(CampoPlantilla).filter(
+            CampoPlantilla.plantilla_id == plantilla_id,
+            CampoPlantilla.activo == True
+        ).order_by(CampoPlantilla.orden).all()
+
+        return [self.campo_a_config(campo_db) for campo_db in campos_db]
+
+    @staticmethod
+    def campo_a_config(campo_db: CampoPlantilla) -> Dict:
+        """Convierte un CampoPlantilla en diccionario de configuración (mismo formato que el editor)"""
+        return {
+            'id': campo_db.id,
+            'nombre': campo_db.nombre,
+            'tipo': campo_db.tipo,
+            'x': float(campo_db.x),
+            'y': float(campo_db.y),
+            'ancho': float(campo_db.ancho),
+            'alto': float(campo_db.alto),
+            'alineacion': campo_db.alineacion,
+            'fuente': campo_db.fuente,
+            'tamano_fuente': campo_db.tamano_fuente,
+            'color': campo_db.color,
+            'negrita': campo_db.negrita,
+            'cursiva': campo_db.cursiva,
+            'texto_fijo': campo_db.texto_fijo,
+            'columna_padron': campo_db.columna_padron,
+            'componentes': campo_db.componentes_json or [],
+            'tabla_config': campo_db.tabla_config_json or {}
+        }
+
+    def obtener_columnas_referenciadas(self, plantilla_id: int) -> List[str]:
+        """Columnas del padrón que usa la plantilla (campos, compuestos y celdas de tablas)"""
+        return self.columnas_de_campos(self.obtener_campos_config(plantilla_id))
+
+    def obtener_columnas_referenciadas_proyecto(self, proyecto_id: int) -> List[str]:
+        """Unión de las columnas que usan las plantillas activas del proyecto"""
+        plantillas = self.db.query(Plantilla.id).filter(
+            Plantilla.proyecto_id == proyecto_id,
+            Plantilla.activa == True
+        ).all()
+
+        columnas = []
+        for (plantilla_id,) in plantillas:
+            columnas.extend(self.obtener_columnas_referenciadas(plantilla_id))
+        return list(dict.fromkeys(columnas))
+
+    @staticmethod
+    def columnas_de_campos(campos: Iterable[Dict]) -> List[str]:
+        """Extrae las columnas referenciadas de configs de campo (formato del editor)"""
+        columnas = []
+
+        for campo in campos:
+            tipo = campo.get('tipo')
+            if tipo == 'campo' and campo.get('columna_padron'):
+                columnas.append(campo['columna_padron'])
+
+            for componente in campo.get('componentes') or []:
+                if componente.get('tipo') == 'campo':
+                    columna = componente.get('columna') or componente.get('valor')
+                    if columna:
+                        columnas.append(columna)
+
+            # Las celdas pueden venir en la raíz (editor) o dentro de tabla_config (BD)
+            tabla_config = campo.get('tabla_config') or {}
+            celdas = campo.get('celdas') or tabla_config.get('celdas') or []
+            for fila in celdas:
+                for celda in fila or []:
+                    if isinstance(celda, dict) and celda.get('tipo') == 'campo':
+                        columna = celda.get('columna') or celda.get('valor')
+                        if columna:
+                            columnas.append(columna)
+
+        return list(dict.fromkeys(c.strip() for c in columnas if c and c.strip()))
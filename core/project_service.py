@@ -38,7 +38,8 @@ class ProjectService:
             return []
     
     def crear_proyecto(self, nombre: str, descripcion: str, tabla_padron: str, 
-                   usuario: Usuario, logo: str = None, uuid_padron: str = None) -> Proyecto:
+                   usuario: Usuario, logo: str = None, uuid_padron: str = None,
+                   config_json: dict = None) -> Proyecto:
         """Crea un nuevo proyecto con logo"""
         if usuario.rol not in ["superadmin", "admin"]:
             raise PermissionError("No tiene permisos para crear proyectos")
@@ -49,7 +50,7 @@ class ProjectService:
                 descripcion=descripcion,
                 tabla_padron=tabla_padron,  # ← ESTO ES EL UUID DEL PADRÓN
                 logo=logo,  # ← Nombre de campo es 'logo', no 'logo_path'
-                config_json={}
+                config_json=config_json or {}
             )
             
             self.db.add(proyecto)
@@ -79,6 +80,10 @@ class ProjectService:
                 if key in campos_validos and hasattr(proyecto, key):
                     setattr(proyecto, key, value)
             
+            # config_json se combina: solo se reemplazan las claves recibidas
+            if datos_actualizacion.get('config_json'):
+                proyecto.config_json = {**(proyecto.config_json or {}), **datos_actualizacion['config_json']}
+            
             self.db.commit()
             self.db.refresh(proyecto)
             
@@ -2,8 +2,8 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from config.database import Base, engine
-from core.models import ConfiguracionSistema, EmisionesAcumuladas, EmisionFinal
+from config.database import Base, get_engine
+from core.models import ConfiguracionSistema, EmisionesAcumuladas, EmisionFinal, EjecucionEmision, TrabajoCola
 
 def create_missing_tables():
     """Crea las tablas faltantes en la base de datos"""
@@ -11,9 +11,11 @@ def create_missing_tables():
     
     try:
         # Crear solo las tablas faltantes
-        ConfiguracionSistema.__table__.create(bind=engine, checkfirst=True)
-        EmisionesAcumuladas.__table__.create(bind=engine, checkfirst=True)
-        EmisionFinal.__table__.create(bind=engine, checkfirst=True)
+        ConfiguracionSistema.__table__.create(bind=get_engine(), checkfirst=True)
+        EmisionesAcumuladas.__table__.create(bind=get_engine(), checkfirst=True)
+        EmisionFinal.__table__.create(bind=get_engine(), checkfirst=True)
+        EjecucionEmision.__table__.create(bind=get_engine(), checkfirst=True)
+        TrabajoCola.__table__.create(bind=get_engine(), checkfirst=True)
         
         print("Tablas faltantes creadas exitosamente")
         
@@ -3,7 +3,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from sqlalchemy import create_engine
-from config.database import Base, engine
+from config.database import Base, get_engine
 from core.models import Usuario, Proyecto, Plantilla
 from config.settings import settings
 
@@ -12,12 +12,12 @@ def init_database():
     
     # Crear todas las tablas
     print("Creando tablas en la base de datos...")
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
     print("Tablas creadas exitosamente")
     
     # Crear usuario superadmin por defecto
     from sqlalchemy.orm import sessionmaker
-    Session = sessionmaker(bind=engine)
+    Session = sessionmaker(bind=get_engine())
     db = Session()
     
     try:
@@ -0,0 +1,179 @@
+"""Control de versión del esquema de base de datos.
+
+Al arrancar solo se lee 'schema_version' de configuracion_sistema (una consulta).
+create_all y las migraciones pendientes se ejecutan únicamente cuando la versión
+guardada es menor que SCHEMA_VERSION.
+
+Para cambiar el esquema: agregar una entrada al final de MIGRACIONES con el
+siguiente número. Cada paso es una sentencia SQL o una función que recibe la
+conexión; deben ser idempotentes (IF NOT EXISTS) porque una base nueva también
+pasa por create_all.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from typing import Optional
+from sqlalchemy import text
+
+CLAVE_VERSION = 'schema_version'
+
+
+def _extension_pg_trgm(conn):
+    """pg_trgm requiere permisos de creación; sin ella solo se desactiva la búsqueda por similitud"""
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        print(f"   ⚠️ No se pudo crear la extensión pg_trgm (búsqueda por similitud no disponible): {e}")
+
+
+def _columna_a_jsonb(tabla: str, columna: str):
+    """Paso que convierte una columna JSON a JSONB (no hace nada si ya lo es)"""
+    def paso(conn):
+        tipo = conn.execute(text("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = :tabla AND column_name = :columna
+        """), {"tabla": tabla, "columna": columna}).scalar()
+        if tipo == 'json':
+            conn.execute(text(f"ALTER TABLE {tabla} ALTER COLUMN {columna} TYPE JSONB USING {columna}::jsonb"))
+    return paso
+
+
+def _unicidad_id_padrones_particionados(conn):
+    """Padrones particionados creados solo con un índice no único sobre id"""
+    from core.padron_service import sql_unicidad_id_particionada
+
+    padrones = conn.execute(text(
+        "SELECT nombre_tabla, config_json FROM identificador_padrones WHERE config_json IS NOT NULL"
+    )).fetchall()
+    for nombre_tabla, config in padrones:
+        particion = (config or {}).get('particion')
+        if not particion:
+            continue
+        tiene_unicidad = conn.execute(text("""
+            SELECT EXISTS (SELECT 1 FROM pg_constraint
+                           WHERE conrelid = to_regclass(:tabla) AND contype IN ('p', 'u'))
+        """), {"tabla": nombre_tabla}).scalar()
+        if tiene_unicidad or conn.execute(text("SELECT to_regclass(:tabla)"), {"tabla": nombre_tabla}).scalar() is None:
+            continue
+        conn.execute(text(sql_unicidad_id_particionada(conn, nombre_tabla, particion['columna'])))
+        conn.execute(text(f"DROP INDEX IF EXISTS idx_{nombre_tabla[:50]}_id"))
+
+
+# (versión, descripción, pasos)
+MIGRACIONES = [
+    (1, "Esquema base: ejecuciones_emision y cola_trabajos", []),
+    (2, "Configuración de particionado en identificador_padrones", [
+        "ALTER TABLE identificador_padrones ADD COLUMN IF NOT EXISTS config_json JSON",
+    ]),
+    (3, "Candidatos de match por similitud (pg_trgm)", [
+        _extension_pg_trgm,
+    ]),
+    (4, "Caché de resultados de match entre sesiones", []),
+    (5, "Documentos de emisión en JSONB con índices GIN y claves generadas", [
+        _columna_a_jsonb('emisiones_temp', 'datos_json'),
+        _columna_a_jsonb('emisiones_final', 'datos_completos'),
+        _columna_a_jsonb('emisiones_acumuladas', 'datos_completos'),
+        "ALTER TABLE emisiones_final ADD COLUMN IF NOT EXISTS cuenta TEXT "
+        "GENERATED ALWAYS AS (datos_completos ->> 'cuenta') STORED",
+        "ALTER TABLE emisiones_final ADD COLUMN IF NOT EXISTS codigo_afiliado TEXT "
+        "GENERATED ALWAYS AS (datos_completos ->> 'codigo_afiliado') STORED",
+        # emisiones_temp no lleva GIN: es de paso, de escritura masiva y ya tiene cuenta/codigo como columnas
+        "CREATE INDEX IF NOT EXISTS idx_emisiones_final_datos_gin "
+        "ON emisiones_final USING gin (datos_completos jsonb_path_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_emisiones_acumuladas_datos_gin "
+        "ON emisiones_acumuladas USING gin (datos_completos jsonb_path_ops)",
+    ]),
+    (6, "Historial de emisiones: índices compuestos y vista unificada", [
+        "CREATE INDEX IF NOT EXISTS idx_emisiones_final_proyecto_cuenta ON emisiones_final (proyecto_id, cuenta)",
+        "CREATE INDEX IF NOT EXISTS idx_emisiones_final_proyecto_codigo ON emisiones_final (proyecto_id, codigo_afiliado)",
+        "CREATE INDEX IF NOT EXISTS idx_emisiones_final_proyecto_fecha ON emisiones_final (proyecto_id, fecha_generacion)",
+        "CREATE INDEX IF NOT EXISTS idx_emisiones_acum_proyecto_cuenta ON emisiones_acumuladas (proyecto_id, cuenta)",
+        "CREATE INDEX IF NOT EXISTS idx_emisiones_acum_proyecto_codigo ON emisiones_acumuladas (proyecto_id, codigo_afiliado)",
+        "CREATE INDEX IF NOT EXISTS idx_emisiones_acum_proyecto_fecha ON emisiones_acumuladas (proyecto_id, fecha_emision)",
+        # UNION ALL simple: PostgreSQL empuja los filtros a cada tabla y usa sus índices
+        """
+        CREATE OR REPLACE VIEW v_historial_emisiones AS
+        SELECT 'final'::text AS origen, id, proyecto_id, plantilla_id, usuario_id,
+               cuenta::text AS cuenta, codigo_afiliado::text AS codigo_afiliado,
+               datos_completos ->> 'nombre_afiliado' AS nombre_afiliado,
+               archivo_generado::text AS archivo, fecha_generacion AS fecha_emision
+        FROM emisiones_final
+        UNION ALL
+        SELECT 'acumulada'::text, id, proyecto_id, plantilla_id, usuario_id,
+               cuenta::text, codigo_afiliado::text, nombre_afiliado::text,
+               nombre_archivo::text, fecha_emision
+        FROM emisiones_acumuladas
+        """,
+    ]),
+    (7, "Ids únicos en padrones particionados", [
+        _unicidad_id_padrones_particionados,
+    ]),
+]
+
+SCHEMA_VERSION = MIGRACIONES[-1][0]
+
+
+def obtener_version_actual(conn) -> Optional[int]:
+    """Versión registrada en la base (None si no existe la tabla o la clave)"""
+    try:
+        valor = conn.execute(
+            text("SELECT valor FROM configuracion_sistema WHERE clave = :clave"),
+            {"clave": CLAVE_VERSION}
+        ).scalar()
+        return int(valor) if valor is not None else None
+    except Exception:
+        return None
+
+
+def verificar_esquema(engine=None) -> bool:
+    """Comprueba la versión del esquema y migra solo si hace falta.
+
+    Regresa True si se aplicaron cambios.
+    """
+    if engine is None:
+        from config.database import get_engine
+        engine = get_engine()
+
+    with engine.connect() as conn:
+        version_actual = obtener_version_actual(conn)
+
+    if version_actual is not None and version_actual >= SCHEMA_VERSION:
+        return False
+
+    aplicar_migraciones(engine, version_actual or 0)
+    return True
+
+
+def aplicar_migraciones(engine, desde_version: int = 0):
+    """Crea tablas faltantes y ejecuta las migraciones posteriores a desde_version"""
+    from config.database import Base
+    import core.models  # noqa: F401  (registra los modelos en Base.metadata)
+
+    print(f"📝 Actualizando esquema de la versión {desde_version} a {SCHEMA_VERSION}...")
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        for version, descripcion, pasos in MIGRACIONES:
+            if version <= desde_version:
+                continue
+            print(f"   → v{version}: {descripcion}")
+            for paso in pasos:
+                if callable(paso):
+                    paso(conn)
+                else:
+                    conn.execute(text(paso))
+
+        conn.execute(text("""
+            INSERT INTO configuracion_sistema (clave, valor, tipo, descripcion, editable)
+            VALUES (:clave, :valor, 'int', 'Versión del esquema de base de datos', false)
+            ON CONFLICT (clave) DO UPDATE SET valor = EXCLUDED.valor
+        """), {"clave": CLAVE_VERSION, "valor": str(SCHEMA_VERSION)})
+
+    print(f"✅ Esquema en versión {SCHEMA_VERSION}")
+
+
+if __name__ == "__main__":
+    from config.database import get_engine
+    aplicar_migraciones(get_engine(), 0)
@@ -2,7 +2,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from config.database import Base, engine
+from config.database import Base, get_engine
 from core.models import Usuario
 
 def reset_complete_database():
@@ -17,10 +17,10 @@ def reset_complete_database():
     
     try:
         print("Eliminando todas las tablas...")
-        Base.metadata.drop_all(bind=engine)
+        Base.metadata.drop_all(bind=get_engine())
         
         print("Creando todas las tablas nuevas...")
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=get_engine())
         
         print("Creando usuario superadmin...")
         crear_usuario_superadmin()
@@ -2,7 +2,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from config.database import Base, engine
+from config.database import Base, get_engine
 from core.models import Usuario, Proyecto, Plantilla, Bitacora
 
 def reset_database():
@@ -15,10 +15,10 @@ def reset_database():
         return
     
     print("Eliminando tablas existentes...")
-    Base.metadata.drop_all(bind=engine)
+    Base.metadata.drop_all(bind=get_engine())
     
     print("Creando nuevas tablas...")
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
     
     print("Base de datos reiniciada exitosamente")
     print("Ejecuta 'python database/init_db.py' para crear datos de prueba")
@@ -1,13 +1,11 @@
 import sys
 from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import QTimer
 from ui.login_window import LoginWindow
-from ui.main_window import MainWindow
-from config.database import engine, Base
 
-def create_tables():
-    """Crea las tablas en la base de datos"""
-    Base.metadata.create_all(bind=engine)
+def verificar_esquema():
+    """Verifica la versión del esquema (crea/migra tablas solo si cambió)"""
+    from database.migraciones import verificar_esquema as verificar
+    verificar()
 
 class AppController:
     def __init__(self):
@@ -19,6 +17,9 @@ class AppController:
         self.login_window.login_successful.connect(self.on_login_success)
     
     def on_login_success(self, usuario):
+        # MainWindow se importa hasta aquí para que la ventana de login aparezca antes
+        from ui.main_window import MainWindow
+        
         self.login_window.hide()
         self.main_window = MainWindow(usuario)
         self.main_window.show()
@@ -31,9 +32,17 @@ class AppController:
         return self.app.exec()
 
 if __name__ == "__main__":
-    # Crear tablas si no existen
-    create_tables()
+    if "--perfil-arranque" in sys.argv:
+        from utils.perfil_arranque import reporte_importaciones
+        sys.exit(reporte_importaciones('main'))
+    
+    # Verificar esquema (una consulta si ya está al día)
+    verificar_esquema()
+    
+    # Opciones de pool guardadas en el panel de configuración (se leen solo al arrancar)
+    from config.database import configurar_engine
+    configurar_engine()
     
     # Iniciar aplicación
     controller = AppController()
-    sys.exit(controller.run())
\ No newline at end of file
+    sys.exit(controller.run())
@@ -0,0 +1,55 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from config.database import SessionLocal
+from core.cola_trabajos_service import ColaTrabajosService, ESTADOS_FINALES
+
+
+class MonitorTrabajo(QObject):
+    """Consulta periódicamente un trabajo de la cola y emite su avance"""
+    progreso = pyqtSignal(int, str)  # porcentaje, mensaje
+    terminado = pyqtSignal(str, dict)  # estado final, resultado
+
+    def __init__(self, trabajo_id: int, intervalo_ms: int = 1000, parent=None):
+        super().__init__(parent)
+        self.trabajo_id = trabajo_id
+        self._ultimo_mensaje = None
+        self.timer = QTimer(self)
+        self.timer.setInterval(intervalo_ms)
+        self.timer.timeout.connect(self.consultar)
+
+    def iniciar(self):
+        self.timer.start()
+        self.consultar()
+
+    def detener(self):
+        self.timer.stop()
+
+    def solicitar_control(self, control: str) -> bool:
+        """Pide al worker pausar o cancelar el trabajo"""
+        db = SessionLocal()
+        try:
+            return ColaTrabajosService(db).solicitar_control(self.trabajo_id, control)
+        finally:
+            db.close()
+
+    def consultar(self):
+        """Lee el estado actual del trabajo (consulta corta por id)"""
+        db = SessionLocal()
+        try:
+            trabajo = ColaTrabajosService(db).obtener_trabajo(self.trabajo_id)
+            if not trabajo:
+                self.detener()
+                self.terminado.emit('error', {'errores': [f"Trabajo {self.trabajo_id} no encontrado"]})
+                return
+
+            mensaje = trabajo.mensaje or trabajo.estado
+            if mensaje != self._ultimo_mensaje:
+                self._ultimo_mensaje = mensaje
+                self.progreso.emit(trabajo.progreso or 0, mensaje)
+
+            if trabajo.estado in ESTADOS_FINALES:
+                self.detener()
+                self.terminado.emit(trabajo.estado, dict(trabajo.resultado or {}))
+        except Exception as e:
+            print(f"⚠️ Error consultando trabajo {self.trabajo_id}: {e}")
+        finally:
+            db.close()
@@ -1,10 +1,37 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QLineEdit, QPushButton, QMessageBox, QFrame)
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal, QThread
 from PyQt6.QtGui import QFont, QPixmap
 from config.database import SessionLocal
 from core.auth import AuthService
 
+class AutenticacionThread(QThread):
+    """Verificación de credenciales fuera del hilo de la interfaz (bcrypt es lento a propósito)"""
+    terminado = pyqtSignal(object, str)  # usuario o None, mensaje
+    
+    def __init__(self, usuario: str, password: str):
+        super().__init__()
+        self.usuario = usuario
+        self.password = password
+    
+    def run(self):
+        db = SessionLocal()
+        try:
+            user, mensaje = AuthService(db).autenticar_usuario(
+                self.usuario, self.password,
+                ip_address=None,  # Dejar que AuthService maneje la IP
+                user_agent="PyQt App"
+            )
+            if user:
+                # Cargar atributos y desligar de la sesión: se usa después de cerrarla
+                db.refresh(user)
+                db.expunge(user)
+            self.terminado.emit(user, mensaje)
+        except Exception as e:
+            self.terminado.emit(None, f"Error de conexión: {str(e)}")
+        finally:
+            db.close()
+
 class LoginWindow(QWidget):
     login_successful = pyqtSignal(object)
     
@@ -12,6 +39,7 @@ class LoginWindow(QWidget):
         super().__init__()
         self.setWindowTitle("Sistema de Correspondencia - Login")
         self.setFixedSize(400, 500)
+        self.thread_login = None
         self.setup_ui()
     
     def setup_ui(self):
@@ -71,29 +99,23 @@ class LoginWindow(QWidget):
             QMessageBox.warning(self, "Error", "Por favor complete todos los campos")
             return
         
+        if self.thread_login and self.thread_login.isRunning():
+            return
+        
         self.btn_login.setEnabled(False)
         self.btn_login.setText("Verificando...")
         
-        try:
-            db = SessionLocal()
-            auth_service = AuthService(db)
-            
-            user, mensaje = auth_service.autenticar_usuario(
-                usuario, password,
-                ip_address=None,  # Dejar que AuthService maneje la IP
-                user_agent="PyQt App"
-            )
-            
-            if user:
-                self.login_successful.emit(user)
-            else:
-                QMessageBox.critical(self, "Error de autenticación", mensaje)
-                self.txt_password.clear()
-                self.txt_password.setFocus()
-                
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error de conexión: {str(e)}")
-        finally:
-            db.close()
-            self.btn_login.setEnabled(True)
-            self.btn_login.setText("Iniciar Sesión")
\ No newline at end of file
+        self.thread_login = AutenticacionThread(usuario, password)
+        self.thread_login.terminado.connect(self.on_login_terminado)
+        self.thread_login.start()
+    
+    def on_login_terminado(self, user, mensaje: str):
+        self.btn_login.setEnabled(True)
+        self.btn_login.setText("Iniciar Sesión")
+        
+        if user:
+            self.login_successful.emit(user)
+        else:
+            QMessageBox.critical(self, "Error de autenticación", mensaje)
+            self.txt_password.clear()
+            self.txt_password.setFocus()
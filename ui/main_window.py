@@ -3,15 +3,11 @@ from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont, QAction
 from core.models import Usuario
-from utils.logger import auditoria
+from utils.logger import auditoria, vaciar_auditoria
 
-# Importar módulos nuevos
+# Los módulos pesados (estadísticas con matplotlib, editor con PyMuPDF/ReportLab,
+# formularios con pandas) se importan al abrirse por primera vez, no al arrancar
 from ui.modules.proyectos.dashboard_proyectos import DashboardProyectos
-from ui.modules.plantillas.dashboard_plantillas import DashboardPlantillasMejorado
-from ui.modules.estadisticas.dashboard_estadisticas import DashboardEstadisticas
-from ui.modules.configuracion.panel_configuracion import PanelConfiguracion
-from ui.modules.plantillas.dashboard_plantillas import DashboardPlantillasMejorado
-from ui.modules.proyectos.formulario_proyecto import FormularioProyecto
 
 class MainWindow(QMainWindow):
     def __init__(self, usuario: Usuario):
@@ -50,6 +46,10 @@ class MainWindow(QMainWindow):
         action_seleccionar.triggered.connect(self.mostrar_dashboard_proyectos)
         menu_proyectos.addAction(action_seleccionar)
 
+        action_historial = QAction("Historial de Emisiones", self)
+        action_historial.triggered.connect(self.mostrar_historial)
+        menu_proyectos.addAction(action_historial)
+
         if self.usuario.rol == "superadmin":
             menu_config = menubar.addMenu("&Configuración")
             
@@ -129,6 +129,7 @@ class MainWindow(QMainWindow):
         print(f"DEBUG: Navegando al proyecto {proyecto_id}")
         
         # Usar el nuevo dashboard
+        from ui.modules.plantillas.dashboard_plantillas import DashboardPlantillasMejorado
         dashboard_plantillas = DashboardPlantillasMejorado(self.usuario, proyecto_id, self.stacked_widget)
         dashboard_plantillas.plantilla_seleccionada.connect(self.on_plantilla_seleccionada)
         dashboard_plantillas.volver_a_proyectos.connect(self.mostrar_dashboard_proyectos) 
@@ -153,12 +154,21 @@ class MainWindow(QMainWindow):
 
     def mostrar_estadisticas(self):
         """Muestra el dashboard de estadísticas"""
+        from ui.modules.estadisticas.dashboard_estadisticas import DashboardEstadisticas
         estadisticas = DashboardEstadisticas(self.usuario, self.proyecto_actual)
         self.stacked_widget.addWidget(estadisticas)
         self.stacked_widget.setCurrentWidget(estadisticas)
 
+    def mostrar_historial(self):
+        """Muestra la búsqueda en el historial de emisiones"""
+        from ui.modules.estadisticas.historial_emisiones import HistorialEmisiones
+        historial = HistorialEmisiones(self.usuario, getattr(self, 'proyecto_actual', None))
+        self.stacked_widget.addWidget(historial)
+        self.stacked_widget.setCurrentWidget(historial)
+
     def mostrar_configuracion(self):
         """Muestra el panel de configuración del sistema"""
+        from ui.modules.configuracion.panel_configuracion import PanelConfiguracion
         configuracion = PanelConfiguracion(self.usuario)
         self.stacked_widget.addWidget(configuracion)
         self.stacked_widget.setCurrentWidget(configuracion)
@@ -182,5 +192,6 @@ class MainWindow(QMainWindow):
                 )
             finally:
                 db.close()
+            vaciar_auditoria()
             
             self.close()
@@ -142,10 +142,31 @@ class PanelConfiguracion(QWidget):
         self.spin_timeout.setSuffix(" segundos")
         advanced_layout.addRow("Timeout:", self.spin_timeout)
         
+        self.spin_statement_timeout = QSpinBox()
+        self.spin_statement_timeout.setRange(0, 3600)
+        self.spin_statement_timeout.setValue(0)
+        self.spin_statement_timeout.setSuffix(" segundos")
+        self.spin_statement_timeout.setSpecialValueText("Sin límite")
+        advanced_layout.addRow("Timeout por consulta:", self.spin_statement_timeout)
+        
+        self.spin_pool_recycle = QSpinBox()
+        self.spin_pool_recycle.setRange(60, 86400)
+        self.spin_pool_recycle.setValue(1800)
+        self.spin_pool_recycle.setSuffix(" segundos")
+        advanced_layout.addRow("Reciclar conexiones cada:", self.spin_pool_recycle)
+        
         self.check_pooling = QCheckBox("Usar pool de conexiones")
         self.check_pooling.setChecked(True)
         advanced_layout.addRow("", self.check_pooling)
         
+        self.check_pre_ping = QCheckBox("Verificar conexión antes de usarla (pre-ping)")
+        self.check_pre_ping.setChecked(True)
+        advanced_layout.addRow("", self.check_pre_ping)
+        
+        lbl_reinicio = QLabel("Las opciones del pool se aplican al reiniciar la aplicación y los workers")
+        lbl_reinicio.setStyleSheet("color: #6c757d; font-size: 11px;")
+        advanced_layout.addRow("", lbl_reinicio)
+        
         advanced_group.setLayout(advanced_layout)
         layout.addRow(advanced_group)
         
@@ -343,6 +364,18 @@ class PanelConfiguracion(QWidget):
         self.txt_db_nombre.setText(self.configuraciones.get('db_name', 'correspondencia_db'))
         self.txt_db_usuario.setText(self.configuraciones.get('db_user', 'postgres'))
         
+        # Pool de conexiones (mismos valores que usa config/database.py al arrancar)
+        from config.database import opciones_engine
+        opciones = opciones_engine(self.configuraciones)
+        es_pool = 'pool_size' in opciones
+        self.check_pooling.setChecked(es_pool)
+        self.check_pre_ping.setChecked(opciones['pool_pre_ping'])
+        if es_pool:
+            self.spin_max_connections.setValue(opciones['pool_size'] + opciones['max_overflow'])
+            self.spin_timeout.setValue(opciones['pool_timeout'])
+            self.spin_pool_recycle.setValue(opciones['pool_recycle'])
+        self.spin_statement_timeout.setValue(int(self.configuraciones.get('db_statement_timeout', 0) or 0) // 1000)
+        
         # Rutas
         self.txt_ruta_pdfs.setText(self.configuraciones.get('ruta_pdfs', 'C:/temp/documentos/'))
         self.txt_ruta_logs.setText(self.configuraciones.get('ruta_logs', 'C:/temp/logs/'))
@@ -358,6 +391,12 @@ class PanelConfiguracion(QWidget):
                 'db_port': self.txt_db_puerto.text(),
                 'db_name': self.txt_db_nombre.text(),
                 'db_user': self.txt_db_usuario.text(),
+                'db_max_conexiones': str(self.spin_max_connections.value()),
+                'db_pool_timeout': str(self.spin_timeout.value()),
+                'db_pool_activo': str(self.check_pooling.isChecked()).lower(),
+                'db_pool_recycle': str(self.spin_pool_recycle.value()),
+                'db_pool_pre_ping': str(self.check_pre_ping.isChecked()).lower(),
+                'db_statement_timeout': str(self.spin_statement_timeout.value() * 1000),  # milisegundos
                 'ruta_pdfs': self.txt_ruta_pdfs.text(),
                 'ruta_logs': self.txt_ruta_logs.text(),
                 'ruta_backup': self.txt_ruta_backup.text(),
@@ -403,6 +442,12 @@ class PanelConfiguracion(QWidget):
             self.txt_db_nombre.setText("correspondencia_db")
             self.txt_db_usuario.setText("postgres")
             self.txt_db_password.setText("")
+            self.spin_max_connections.setValue(20)
+            self.spin_timeout.setValue(30)
+            self.spin_statement_timeout.setValue(0)
+            self.spin_pool_recycle.setValue(1800)
+            self.check_pooling.setChecked(True)
+            self.check_pre_ping.setChecked(True)
             
             QMessageBox.information(self, "Éxito", "Valores por defecto restaurados")
     
@@ -2,9 +2,9 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QPushButton, QFrame, QGridLayout, QGroupBox,
                              QTableWidget, QTableWidgetItem, QHeaderView,
                              QDateEdit, QComboBox, QProgressBar)
-from PyQt6.QtCore import Qt, QDate, pyqtSignal
+from PyQt6.QtCore import Qt, QDate, pyqtSignal, QThread
 from PyQt6.QtGui import QFont, QColor
-from config.database import SessionLocal
+from config.database import SessionLocal, SessionBulk
 from core.emission_service import EmissionService
 from core.models import Proyecto
 from datetime import datetime, timedelta
@@ -40,12 +40,42 @@ class EstadisticasCanvas(FigureCanvas):
         self.fig.tight_layout()
         self.draw()
 
+class ExportacionThread(QThread):
+    """Hilo para exportar datos a CSV sin bloquear la interfaz"""
+    progreso = pyqtSignal('qint64')  # bytes escritos (int se desborda pasando 2 GiB)
+    terminado = pyqtSignal(bool, dict, list)
+    
+    def __init__(self, fuente: str, ruta_salida: str, proyecto_id: int, fecha_desde, fecha_hasta):
+        super().__init__()
+        self.fuente = fuente
+        self.ruta_salida = ruta_salida
+        self.proyecto_id = proyecto_id
+        self.fecha_desde = fecha_desde
+        self.fecha_hasta = fecha_hasta
+    
+    def run(self):
+        from core.export_service import ExportService
+        
+        db = SessionBulk()  # Sin statement_timeout: el COPY de exportación puede tardar
+        try:
+            exito, resumen, errores = ExportService(db).exportar(
+                self.fuente, self.ruta_salida, proyecto_id=self.proyecto_id,
+                fecha_desde=self.fecha_desde, fecha_hasta=self.fecha_hasta,
+                callback_progreso=self.progreso.emit
+            )
+            self.terminado.emit(exito, resumen, errores)
+        except Exception as e:
+            self.terminado.emit(False, {}, [f"Error exportando: {str(e)}"])
+        finally:
+            db.close()
+
 class DashboardEstadisticas(QWidget):
     """Dashboard de estadísticas y reportes"""
     def __init__(self, usuario, proyecto_id=None):
         super().__init__()
         self.usuario = usuario
         self.proyecto_id = proyecto_id
+        self.thread_exportacion = None
         self.setup_ui()
         self.cargar_estadisticas()
     
@@ -158,6 +188,11 @@ class DashboardEstadisticas(QWidget):
         action_layout.addWidget(btn_reporte)
         action_layout.addWidget(btn_limpiar)
         action_layout.addWidget(btn_exportar)
+        self.btn_exportar = btn_exportar
+        
+        self.lbl_exportacion = QLabel("")
+        self.lbl_exportacion.hide()
+        action_layout.addWidget(self.lbl_exportacion)
         action_layout.addStretch()
         
         layout.addLayout(action_layout)
@@ -293,7 +328,64 @@ class DashboardEstadisticas(QWidget):
             db.close()
     
     def exportar_datos(self):
-        """Exporta datos a CSV"""
+        """Exporta padrón o emisiones del proyecto a CSV (o .csv.gz)"""
+        from PyQt6.QtWidgets import QMessageBox, QInputDialog, QFileDialog
+        
+        if not self.proyecto_id:
+            QMessageBox.warning(self, "Exportar", "Seleccione un proyecto")
+            return
+        if self.thread_exportacion and self.thread_exportacion.isRunning():
+            QMessageBox.information(self, "Exportar", "Ya hay una exportación en curso")
+            return
+        
+        fuentes = {
+            "Emisiones finales": 'emisiones_final',
+            "Emisiones acumuladas": 'emisiones_acumuladas',
+            "Padrón del proyecto": 'padron',
+        }
+        opcion, ok = QInputDialog.getItem(self, "Exportar", "Datos a exportar:", list(fuentes), 0, False)
+        if not ok:
+            return
+        fuente = fuentes[opcion]
+        
+        ruta, filtro = QFileDialog.getSaveFileName(
+            self, "Guardar exportación", f"{fuente}.csv",
+            "CSV (*.csv);;CSV comprimido (*.csv.gz)"
+        )
+        if not ruta:
+            return
+        if 'gz' in filtro and not ruta.endswith('.gz'):
+            ruta += '.gz'
+        
+        # El padrón se exporta completo; el historial con el rango de fechas del filtro
+        fecha_desde = fecha_hasta = None
+        if fuente != 'padron':
+            fecha_desde = self.date_desde.date().toPyDate()
+            fecha_hasta = self.date_hasta.date().toPyDate()
+        
+        self.btn_exportar.setEnabled(False)
+        self.lbl_exportacion.setText("📤 Exportando...")
+        self.lbl_exportacion.show()
+        
+        self.thread_exportacion = ExportacionThread(fuente, ruta, self.proyecto_id, fecha_desde, fecha_hasta)
+        self.thread_exportacion.progreso.connect(self.on_progreso_exportacion)
+        self.thread_exportacion.terminado.connect(self.on_exportacion_terminada)
+        self.thread_exportacion.start()
+    
+    def on_progreso_exportacion(self, bytes_escritos: int):
+        self.lbl_exportacion.setText(f"📤 Exportando... {bytes_escritos / (1024 * 1024):.1f} MB")
+    
+    def on_exportacion_terminada(self, exito: bool, resumen: dict, errores: list):
         from PyQt6.QtWidgets import QMessageBox
-        QMessageBox.information(self, "Exportar", "Exportando datos a CSV...")
-        # Aquí iría la implementación real de exportación
\ No newline at end of file
+        
+        self.btn_exportar.setEnabled(True)
+        self.lbl_exportacion.hide()
+        
+        if exito:
+            QMessageBox.information(
+                self, "Exportar",
+                f"✅ {resumen['registros']} registros exportados\n"
+                f"{resumen['ruta']} ({resumen['bytes'] / (1024 * 1024):.1f} MB)"
+            )
+        else:
+            QMessageBox.warning(self, "Exportar", "\n".join(errores[:10]))
\ No newline at end of file
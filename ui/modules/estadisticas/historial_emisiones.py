@@ -0,0 +1,165 @@
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QLineEdit, QComboBox, QDateEdit, QCheckBox, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QAbstractItemView, QMessageBox)
+from PyQt6.QtCore import QDate
+from PyQt6.QtGui import QFont, QColor
+from config.database import SessionLocal
+from core.historial_service import HistorialService
+from core.project_service import ProjectService
+
+
+class HistorialEmisiones(QWidget):
+    """Búsqueda de emisiones por cuenta / código de afiliado en todo el historial"""
+
+    TAMANO_PAGINA = 50
+
+    def __init__(self, usuario, proyecto_id=None):
+        super().__init__()
+        self.usuario = usuario
+        self.proyecto_id = proyecto_id
+        self.cursor = None
+        self.filtros = {}
+        self.setup_ui()
+        self.cargar_proyectos()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        titulo = QLabel("🗂️ Historial de Emisiones")
+        titulo.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        layout.addWidget(titulo)
+
+        # ===== FILTROS =====
+        filtros_layout = QHBoxLayout()
+        filtros_layout.addWidget(QLabel("Proyecto:"))
+        self.combo_proyecto = QComboBox()
+        filtros_layout.addWidget(self.combo_proyecto)
+
+        self.input_cuenta = QLineEdit()
+        self.input_cuenta.setPlaceholderText("Cuenta")
+        self.input_cuenta.returnPressed.connect(self.buscar)
+        filtros_layout.addWidget(self.input_cuenta)
+
+        self.input_codigo = QLineEdit()
+        self.input_codigo.setPlaceholderText("Código de afiliado")
+        self.input_codigo.returnPressed.connect(self.buscar)
+        filtros_layout.addWidget(self.input_codigo)
+
+        self.check_fechas = QCheckBox("Entre fechas:")
+        filtros_layout.addWidget(self.check_fechas)
+        self.date_desde = QDateEdit()
+        self.date_desde.setDate(QDate.currentDate().addYears(-1))
+        self.date_desde.setCalendarPopup(True)
+        filtros_layout.addWidget(self.date_desde)
+        self.date_hasta = QDateEdit()
+        self.date_hasta.setDate(QDate.currentDate())
+        self.date_hasta.setCalendarPopup(True)
+        filtros_layout.addWidget(self.date_hasta)
+
+        btn_buscar = QPushButton("🔍 Buscar")
+        btn_buscar.clicked.connect(self.buscar)
+        btn_buscar.setStyleSheet("background-color: #007bff; color: white; padding: 6px;")
+        filtros_layout.addWidget(btn_buscar)
+        layout.addLayout(filtros_layout)
+
+        # ===== RESULTADOS =====
+        self.tabla = QTableWidget()
+        self.tabla.setColumnCount(6)
+        self.tabla.setHorizontalHeaderLabels(
+            ["Fecha de emisión", "Cuenta", "Código afiliado", "Nombre", "Archivo", "Origen"]
+        )
+        self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.tabla)
+
+        pie_layout = QHBoxLayout()
+        self.lbl_resumen = QLabel("")
+        self.lbl_resumen.setStyleSheet("color: #6c757d;")
+        pie_layout.addWidget(self.lbl_resumen)
+        pie_layout.addStretch()
+        self.btn_mas = QPushButton("Cargar más")
+        self.btn_mas.clicked.connect(self.cargar_pagina)
+        self.btn_mas.setEnabled(False)
+        pie_layout.addWidget(self.btn_mas)
+        layout.addLayout(pie_layout)
+
+        self.setLayout(layout)
+
+    def cargar_proyectos(self):
+        db = SessionLocal()
+        try:
+            proyectos = ProjectService(db).obtener_proyectos_usuario(self.usuario)
+            self.combo_proyecto.clear()
+            for proyecto in proyectos:
+                self.combo_proyecto.addItem(proyecto.nombre, proyecto.id)
+        finally:
+            db.close()
+
+        if self.proyecto_id:
+            indice = self.combo_proyecto.findData(self.proyecto_id)
+            if indice >= 0:
+                self.combo_proyecto.setCurrentIndex(indice)
+
+    def buscar(self):
+        """Nueva búsqueda: reinicia la tabla y el cursor de paginación"""
+        proyecto_id = self.combo_proyecto.currentData()
+        if not proyecto_id:
+            QMessageBox.information(self, "Historial", "Seleccione un proyecto")
+            return
+
+        self.filtros = {
+            'proyecto_id': proyecto_id,
+            'cuenta': self.input_cuenta.text().strip() or None,
+            'codigo_afiliado': self.input_codigo.text().strip() or None,
+        }
+        if self.check_fechas.isChecked():
+            self.filtros['fecha_desde'] = self.date_desde.date().toPyDate()
+            self.filtros['fecha_hasta'] = self.date_hasta.date().toPyDate()
+
+        self.cursor = None
+        self.tabla.setRowCount(0)
+        self.cargar_pagina()
+
+    def cargar_pagina(self):
+        """Siguiente página a partir del cursor actual"""
+        if not self.filtros:
+            return
+
+        db = SessionLocal()
+        try:
+            registros, self.cursor = HistorialService(db).buscar(
+                usuario=self.usuario, despues_de=self.cursor, limite=self.TAMANO_PAGINA, **self.filtros
+            )
+        except PermissionError as e:
+            QMessageBox.warning(self, "Historial", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Historial", f"Error en la búsqueda: {str(e)}")
+            return
+        finally:
+            db.close()
+
+        inicio = self.tabla.rowCount()
+        self.tabla.setRowCount(inicio + len(registros))
+        for desplazamiento, registro in enumerate(registros):
+            valores = [
+                registro['fecha_emision'].strftime('%d/%m/%Y %H:%M'),
+                registro['cuenta'] or '',
+                registro['codigo_afiliado'] or '',
+                registro['nombre_afiliado'] or '',
+                registro['archivo'] or '',
+                "Acumulada" if registro['origen'] == 'acumulada' else "Final",
+            ]
+            for columna, valor in enumerate(valores):
+                item = QTableWidgetItem(valor)
+                if registro['origen'] == 'acumulada':
+                    item.setForeground(QColor("#6c757d"))
+                self.tabla.setItem(inicio + desplazamiento, columna, item)
+
+        self.btn_mas.setEnabled(self.cursor is not None)
+        total = self.tabla.rowCount()
+        if total == 0:
+            self.lbl_resumen.setText("Sin emisiones para los filtros indicados")
+        else:
+            self.lbl_resumen.setText(f"{total} emisiones" + (" (hay más)" if self.cursor else ""))
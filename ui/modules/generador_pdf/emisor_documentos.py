@@ -7,20 +7,23 @@ from PyQt6.QtGui import QFont
 from config.database import SessionLocal
 from core.models import Plantilla, EmisionTemp, Proyecto
 from core.csv_service import CSVService
+from core.emission_service import EmissionService
+from ui.components.monitor_trabajo import MonitorTrabajo
 import os
+import threading
+import time
 from datetime import datetime
-import json
-
-from core.pdf_service import PDFService
-from core.models import Plantilla
 
 class GeneracionPDFThread(QThread):
-    """Hilo para generación de PDFs en segundo plano"""
+    """Hilo para generación de PDFs en segundo plano (pausable y reanudable)"""
     progreso = pyqtSignal(int, str, str)  # porcentaje, mensaje, cuenta_actual
     terminado = pyqtSignal(bool, int, int, list)  # éxito, total, exitosos, errores
+    detenido = pyqtSignal(str, int, int)  # estado ('pausada'|'cancelada'), procesados, total
+    rendimiento = pyqtSignal(str)  # docs/s, ETA y latencia p95
     
     def __init__(self, proyecto_id: int, plantilla_id: int, sesion_id: str, 
-                 usuario_id: int, ruta_salida: str, previsualizar: bool = False):
+                 usuario_id: int, ruta_salida: str, previsualizar: bool = False,
+                 tamano_lote: int = 100):
         super().__init__()
         self.proyecto_id = proyecto_id
         self.plantilla_id = plantilla_id
@@ -28,121 +31,122 @@ class GeneracionPDFThread(QThread):
         self.usuario_id = usuario_id
         self.ruta_salida = ruta_salida
         self.previsualizar = previsualizar
+        self.tamano_lote = tamano_lote
+        self.ejecucion_id = None
+        self._pausa_solicitada = threading.Event()
+        self._cancelacion_solicitada = threading.Event()
+        self._ultimo_porcentaje = -1
+        self._ultimo_rendimiento = 0.0
+        self.metricas = None
+    
+    def pausar(self):
+        """Solicita pausa: el hilo guarda checkpoint y termina al acabar el registro actual"""
+        self._pausa_solicitada.set()
+    
+    def cancelar(self):
+        """Solicita cancelación de la ejecución"""
+        self._cancelacion_solicitada.set()
+    
+    def verificar_control(self):
+        """Devuelve la señal de control pendiente para el servicio de emisión"""
+        if self._cancelacion_solicitada.is_set():
+            return 'cancelada'
+        if self._pausa_solicitada.is_set():
+            return 'pausada'
+        return None
     
     def run(self):
+        from core.metricas_pipeline import MetricasPipeline
+        
+        db = SessionLocal()
+        self.metricas = MetricasPipeline('emision', self.sesion_id)
         try:
-            db = SessionLocal()
-            pdf_service = PDFService()
-            
-            # Obtener registros a procesar
-            registros = db.query(EmisionTemp).filter(
-                EmisionTemp.proyecto_id == self.proyecto_id,
-                EmisionTemp.sesion_id == self.sesion_id,
-                EmisionTemp.estado == 'match_ok'
-            ).all()
-            
-            total_registros = len(registros)
-            if total_registros == 0:
-                self.terminado.emit(False, 0, 0, ["No hay registros válidos para procesar"])
-                return
-            
-            # Obtener plantilla y configuración
-            plantilla = db.query(Plantilla).filter(Plantilla.id == self.plantilla_id).first()
-            if not plantilla or not plantilla.campos_json:
-                self.terminado.emit(False, 0, 0, ["Plantilla no encontrada o sin campos configurados"])
+            if self.previsualizar:
+                self.generar_previsualizacion(db)
                 return
             
-            plantilla_config = {
-                'page_size': 'A4',
-                'margin': 20,
-                'campos': plantilla.campos_json,
-                'mostrar_info_sistema': True
-            }
+            emission_service = EmissionService(db)
+            ejecucion = emission_service.crear_o_reanudar_ejecucion(
+                self.proyecto_id, self.plantilla_id, self.sesion_id,
+                self.usuario_id, self.ruta_salida, self.tamano_lote
+            )
+            self.ejecucion_id = ejecucion.id
             
-            # Validar configuración
-            es_valida, erroes_validacion = pdf_service.validar_configuracion_plantilla(plantilla_config)
-            if not es_valida:
-                self.terminado.emit(False, 0, 0, erroes_validacion)
-                return
+            if ejecucion.procesados:
+                self.progreso.emit(0, f"Reanudando desde el registro {ejecucion.procesados + 1}...", "")
             
-            exitosos = 0
-            erroes = []
+            estado, total, exitosos, errores = emission_service.ejecutar_emision(
+                ejecucion.id,
+                callback_progreso=self.actualizar_progreso_callback,
+                verificar_control=self.verificar_control,
+                metricas=self.metricas
+            )
             
-            # Preparar datos para procesamiento por lotes
-            datos_registros = []
-            for registro in registros:
-                datos = {
-                    'cuenta': registro.cuenta,
-                    'codigo_afiliado': registro.codigo_afiliado,
-                    'datos_json': registro.datos_json
-                }
-                # Agregar datos del JSON si existe
-                if registro.datos_json:
-                    if isinstance(registro.datos_json, str):
-                        try:
-                            datos_json = json.loads(registro.datos_json)
-                            datos.update(datos_json)
-                        except:
-                            pass
-                    else:
-                        datos.update(registro.datos_json)
-                
-                datos_registros.append(datos)
+            try:
+                self.metricas.escribir_reporte()
+            except OSError as e:
+                print(f"⚠️ No se pudo escribir el reporte de métricas: {e}")
             
-            # Procesar por lotes
-            if self.previsualizar:
-                # Solo previsualizar el primer registro
-                primer_registro = datos_registros[0] if datos_registros else {}
-                cuenta_actual = primer_registro.get('cuenta', 'preview')
-                
-                self.progreso.emit(50, "Generando previsualización...", cuenta_actual)
-                
-                nombre_archivo = f"preview_{cuenta_actual}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                exito, resultado = pdf_service.generar_pdf(
-                    primer_registro, plantilla_config, self.ruta_salida, nombre_archivo
-                )
-                
-                if exito:
-                    self.terminado.emit(True, 1, 1, [])
-                else:
-                    self.terminado.emit(False, 1, 0, [resultado])
-                    
+            if estado in ('pausada', 'cancelada'):
+                db.refresh(ejecucion)
+                self.detenido.emit(estado, ejecucion.procesados or 0, total)
             else:
-                # Generación masiva
-                resultados = pdf_service.generar_lote_pdfs(
-                    datos_registros, 
-                    plantilla_config, 
-                    self.ruta_salida,
-                    callback_progreso=self.actualizar_progreso_callback
-                )
-                
-                self.terminado.emit(
-                    resultados['exitosos'] > 0,
-                    resultados['total'],
-                    resultados['exitosos'],
-                    resultados['errores']
-                )
+                self.terminado.emit(estado == 'completada', total, exitosos, errores)
                 
         except Exception as e:
             self.terminado.emit(False, 0, 0, [f"Error general: {str(e)}"])
         finally:
             db.close()
     
-    def generar_pdf_simulado(self, registro, plantilla, indice):
-        """Simula la generación de PDF (reemplazar con ReportLab)"""
-        # En producción, aquí iría la generación real con ReportLab
-        nombre_archivo = f"documento_{registro.cuenta or indice}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        ruta_completa = os.path.join(self.ruta_salida, nombre_archivo)
+    def actualizar_progreso_callback(self, procesados: int, total: int, cuenta: str, exito: bool):
+        """Traduce el avance del servicio a la señal de progreso (solo cuando cambia el porcentaje)"""
+        porcentaje = int(procesados * 100 / total) if total else 0
+        if porcentaje != self._ultimo_porcentaje or procesados == total:
+            self._ultimo_porcentaje = porcentaje
+            self.progreso.emit(porcentaje, f"Generando documento {procesados}/{total}", cuenta)
+        
+        # Rendimiento y ETA como máximo dos veces por segundo
+        ahora = time.monotonic()
+        if ahora - self._ultimo_rendimiento >= 0.5 or procesados == total:
+            self._ultimo_rendimiento = ahora
+            p95 = self.metricas.latencia_percentiles()['p95']
+            self.rendimiento.emit(
+                self.metricas.texto_avance('render') + (f" · p95 {p95 * 1000:.0f} ms/doc" if p95 is not None else "")
+            )
+    
+    def generar_previsualizacion(self, db):
+        """Genera solo el documento del primer registro válido"""
+        from core.pdf_generator import PDFGenerator
+        from core.plantilla_service import PlantillaService
+        
+        registro = db.query(EmisionTemp).filter(
+            EmisionTemp.proyecto_id == self.proyecto_id,
+            EmisionTemp.sesion_id == self.sesion_id,
+            EmisionTemp.estado == 'match_ok'
+        ).order_by(EmisionTemp.id).first()
+        
+        if not registro:
+            self.terminado.emit(False, 0, 0, ["No hay registros válidos para procesar"])
+            return
         
-        # Simular tiempo de generación
-        import time
-        time.sleep(0.1)
+        plantilla = db.query(Plantilla).filter(Plantilla.id == self.plantilla_id).first()
+        campos = PlantillaService(db).obtener_campos_config(self.plantilla_id)
+        if not plantilla or not campos:
+            self.terminado.emit(False, 0, 0, ["Plantilla no encontrada o sin campos configurados"])
+            return
         
-        # Crear archivo vacío (simulación)
-        with open(ruta_completa, 'w') as f:
-            f.write(f"SIMULACIÓN PDF - {registro.cuenta}")
+        cuenta_actual = registro.cuenta or 'preview'
+        self.progreso.emit(50, "Generando previsualización...", cuenta_actual)
+        
+        datos = EmissionService(db)._armar_datos_registro(registro)
+        os.makedirs(self.ruta_salida, exist_ok=True)
+        nombre_archivo = f"preview_{cuenta_actual}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         
-        return nombre_archivo
+        generador = PDFGenerator(plantilla.ruta_archivo)
+        if generador.generar_pdf_con_datos(campos, datos, os.path.join(self.ruta_salida, nombre_archivo)):
+            self.terminado.emit(True, 1, 1, [])
+        else:
+            self.terminado.emit(False, 1, 0, [f"Error generando previsualización de {cuenta_actual}"])
 
 class EmisorDocumentos(QWidget):
     """Interfaz para generación masiva de documentos PDF"""
@@ -155,6 +159,7 @@ class EmisorDocumentos(QWidget):
         self.plantilla_id = plantilla_id
         self.sesion_id = sesion_id
         self.thread_generacion = None
+        self.monitor_trabajo = None
         self.setup_ui()
         self.cargar_datos()
     
@@ -215,7 +220,11 @@ class EmisorDocumentos(QWidget):
         self.spin_lote.setValue(100)
         self.spin_lote.setSuffix(" registros por lote")
         
+        self.check_cola = QCheckBox("Generar en servidor (cola de trabajos)")
+        self.check_cola.setToolTip("La generación continúa aunque se cierre la aplicación")
+        
         config_layout.addRow("", self.check_previsualizar)
+        config_layout.addRow("", self.check_cola)
         config_layout.addRow("Tamaño de lote:", self.spin_lote)
         
         config_group.setLayout(config_layout)
@@ -229,6 +238,8 @@ class EmisorDocumentos(QWidget):
         self.lbl_estado = QLabel("Preparando generación...")
         self.lbl_cuenta_actual = QLabel("")
         self.lbl_cuenta_actual.setStyleSheet("color: #17a2b8; font-weight: bold;")
+        self.lbl_rendimiento = QLabel("")
+        self.lbl_rendimiento.setStyleSheet("color: #6c757d;")
         
         self.progress_bar = QProgressBar()
         self.progress_bar.setMinimum(0)
@@ -241,6 +252,7 @@ class EmisorDocumentos(QWidget):
         
         progreso_layout.addWidget(self.lbl_estado)
         progreso_layout.addWidget(self.lbl_cuenta_actual)
+        progreso_layout.addWidget(self.lbl_rendimiento)
         progreso_layout.addWidget(self.progress_bar)
         progreso_layout.addWidget(QLabel("Log de generación:"))
         progreso_layout.addWidget(self.texto_log)
@@ -286,6 +298,40 @@ class EmisorDocumentos(QWidget):
             }
         """)
         
+        self.btn_pausar = QPushButton("⏸️ Pausar")
+        self.btn_pausar.clicked.connect(self.pausar_generacion)
+        self.btn_pausar.setEnabled(False)
+        self.btn_pausar.setStyleSheet("""
+            QPushButton {
+                background-color: #ffc107;
+                color: #212529;
+                border: none;
+                padding: 12px 24px;
+                border-radius: 6px;
+            }
+            QPushButton:disabled {
+                background-color: #e9ecef;
+                color: #6c757d;
+            }
+        """)
+        
+        self.btn_cancelar = QPushButton("⏹️ Cancelar")
+        self.btn_cancelar.clicked.connect(self.cancelar_generacion)
+        self.btn_cancelar.setEnabled(False)
+        self.btn_cancelar.setStyleSheet("""
+            QPushButton {
+                background-color: #dc3545;
+                color: white;
+                border: none;
+                padding: 12px 24px;
+                border-radius: 6px;
+            }
+            QPushButton:disabled {
+                background-color: #e9ecef;
+                color: #6c757d;
+            }
+        """)
+        
         self.btn_limpiar = QPushButton("🗑️ Limpiar")
         self.btn_limpiar.clicked.connect(self.limpiar)
         self.btn_limpiar.setStyleSheet("""
@@ -303,6 +349,8 @@ class EmisorDocumentos(QWidget):
         
         button_layout.addWidget(self.btn_generar)
         button_layout.addWidget(self.btn_previsualizar)
+        button_layout.addWidget(self.btn_pausar)
+        button_layout.addWidget(self.btn_cancelar)
         button_layout.addStretch()
         button_layout.addWidget(self.btn_limpiar)
         
@@ -352,6 +400,21 @@ class EmisorDocumentos(QWidget):
                     self.btn_generar.setEnabled(True)
                 else:
                     self.btn_generar.setEnabled(False)
+                
+                # ¿Quedó una ejecución pausada o interrumpida?
+                ejecucion = EmissionService(db).obtener_ejecucion_reanudable(self.sesion_id)
+                if ejecucion and ejecucion.procesados:
+                    index = self.combo_plantillas.findData(ejecucion.plantilla_id)
+                    if index >= 0:
+                        self.combo_plantillas.setCurrentIndex(index)
+                    if ejecucion.ruta_salida:
+                        self.ruta_salida = ejecucion.ruta_salida
+                        self.lbl_ruta_salida.setText(self.ruta_salida)
+                    self.btn_generar.setText("▶️ Reanudar Generación")
+                    self.agregar_log(
+                        f"⏸️ Ejecución interrumpida: {ejecucion.procesados}/{ejecucion.total_registros} "
+                        f"documentos. Se reanudará desde el último checkpoint."
+                    )
             else:
                 self.lbl_registros.setText("No hay sesión activa")
                 self.lbl_sesion.setText("N/A")
@@ -401,18 +464,124 @@ class EmisorDocumentos(QWidget):
         self.btn_generar.setEnabled(False)
         self.btn_previsualizar.setEnabled(False)
         
-        # Limpiar log anterior
-        self.texto_log.clear()
         self.agregar_log("🚀 Iniciando generación de documentos...")
         
+        if self.check_cola.isChecked() and not previsualizar:
+            self.encolar_generacion(plantilla_id)
+            return
+        
         # Crear y ejecutar hilo de generación
         self.thread_generacion = GeneracionPDFThread(
             self.proyecto_id, plantilla_id, self.sesion_id, 
-            self.usuario.id, self.ruta_salida, previsualizar
+            self.usuario.id, self.ruta_salida, previsualizar,
+            tamano_lote=self.spin_lote.value()
         )
         self.thread_generacion.progreso.connect(self.actualizar_progreso)
         self.thread_generacion.terminado.connect(self.generacion_terminada)
+        self.thread_generacion.detenido.connect(self.generacion_detenida)
+        self.thread_generacion.rendimiento.connect(self.lbl_rendimiento.setText)
         self.thread_generacion.start()
+        
+        if not previsualizar:
+            self.btn_pausar.setEnabled(True)
+            self.btn_cancelar.setEnabled(True)
+    
+    def encolar_generacion(self, plantilla_id: int):
+        """Envía la emisión a la cola de trabajos y sigue su avance"""
+        from core.cola_trabajos_service import ColaTrabajosService
+        db = SessionLocal()
+        try:
+            trabajo = ColaTrabajosService(db).encolar(
+                'emision',
+                {
+                    'proyecto_id': self.proyecto_id,
+                    'plantilla_id': plantilla_id,
+                    'sesion_id': self.sesion_id,
+                    'usuario_id': self.usuario.id,
+                    'ruta_salida': self.ruta_salida,
+                    'tamano_lote': self.spin_lote.value()
+                },
+                usuario_id=self.usuario.id,
+                proyecto_id=self.proyecto_id
+            )
+            trabajo_id = trabajo.id
+        except Exception as e:
+            self.generacion_terminada(False, 0, 0, [f"No se pudo encolar el trabajo: {str(e)}"])
+            return
+        finally:
+            db.close()
+        
+        self.agregar_log(f"📬 Trabajo {trabajo_id} enviado a la cola")
+        self.monitor_trabajo = MonitorTrabajo(trabajo_id, parent=self)
+        self.monitor_trabajo.progreso.connect(
+            lambda porcentaje, mensaje: self.actualizar_progreso(porcentaje, mensaje, "")
+        )
+        self.monitor_trabajo.terminado.connect(self.trabajo_terminado)
+        self.monitor_trabajo.iniciar()
+        self.btn_pausar.setEnabled(True)
+        self.btn_cancelar.setEnabled(True)
+    
+    def trabajo_terminado(self, estado: str, resultado: dict):
+        """Cuando el worker termina, pausa o cancela la emisión"""
+        self.monitor_trabajo = None
+        if estado in ('pausado', 'cancelado'):
+            self.generacion_detenida(
+                'pausada' if estado == 'pausado' else 'cancelada',
+                resultado.get('exitosos', 0), resultado.get('total', 0)
+            )
+        else:
+            self.generacion_terminada(
+                estado == 'completado', resultado.get('total', 0),
+                resultado.get('exitosos', 0), resultado.get('errores', [])
+            )
+    
+    def pausar_generacion(self):
+        """Pausa la generación guardando el avance"""
+        if self.monitor_trabajo:
+            self.monitor_trabajo.solicitar_control('pausar')
+            self.btn_pausar.setEnabled(False)
+            self.btn_cancelar.setEnabled(False)
+            self.agregar_log("⏸️ Pausa solicitada al worker")
+        elif self.thread_generacion and self.thread_generacion.isRunning():
+            self.thread_generacion.pausar()
+            self.btn_pausar.setEnabled(False)
+            self.btn_cancelar.setEnabled(False)
+            self.agregar_log("⏸️ Pausando... se guardará el avance al terminar el documento actual")
+    
+    def cancelar_generacion(self):
+        """Cancela la generación en curso"""
+        en_hilo = self.thread_generacion and self.thread_generacion.isRunning()
+        if not (en_hilo or self.monitor_trabajo):
+            return
+        
+        respuesta = QMessageBox.question(
+            self, "Cancelar generación",
+            "¿Cancelar la generación? Los documentos ya generados se conservan, "
+            "pero la ejecución no podrá reanudarse.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if respuesta == QMessageBox.StandardButton.Yes:
+            if self.monitor_trabajo:
+                self.monitor_trabajo.solicitar_control('cancelar')
+            else:
+                self.thread_generacion.cancelar()
+            self.btn_pausar.setEnabled(False)
+            self.btn_cancelar.setEnabled(False)
+            self.agregar_log("⏹️ Cancelando generación...")
+    
+    def generacion_detenida(self, estado: str, procesados: int, total: int):
+        """Cuando la generación se pausa o se cancela"""
+        self.btn_pausar.setEnabled(False)
+        self.btn_cancelar.setEnabled(False)
+        self.btn_previsualizar.setEnabled(True)
+        
+        if estado == 'pausada':
+            self.agregar_log(f"⏸️ Generación pausada en {procesados}/{total} documentos")
+            self.btn_generar.setText("▶️ Reanudar Generación")
+        else:
+            self.agregar_log(f"⏹️ Generación cancelada en {procesados}/{total} documentos")
+            self.btn_generar.setText("🔄 Generar Documentos")
+        self.btn_generar.setEnabled(True)
     
     def previsualizar_documento(self):
         """Generar solo previsualización del primer documento"""
@@ -456,8 +625,12 @@ class EmisorDocumentos(QWidget):
                 f"❌ Hubo errores en la generación:\n\n{errores_str}"
             )
         
+        if not self.check_previsualizar.isChecked():
+            self.btn_generar.setText("🔄 Generar Documentos")
         self.btn_generar.setEnabled(True)
         self.btn_previsualizar.setEnabled(True)
+        self.btn_pausar.setEnabled(False)
+        self.btn_cancelar.setEnabled(False)
     
     def agregar_log(self, mensaje: str):
         """Agregar mensaje al log"""
@@ -473,4 +646,5 @@ class EmisorDocumentos(QWidget):
         self.grupo_progreso.setVisible(False)
         self.progress_bar.setValue(0)
         self.texto_log.clear()
-        self.lbl_cuenta_actual.setText("")
\ No newline at end of file
+        self.lbl_cuenta_actual.setText("")
+        self.lbl_rendimiento.setText("")
\ No newline at end of file
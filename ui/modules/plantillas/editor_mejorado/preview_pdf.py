@@ -2,17 +2,187 @@
 from PyQt6.QtWidgets import (QFrame, QLabel, QVBoxLayout, QHBoxLayout,
                              QPushButton, QScrollArea, QWidget, QStackedWidget,
                              QGroupBox, QComboBox, QSpinBox, QMessageBox, QSizePolicy,
-                             QApplication)
-from PyQt6.QtCore import Qt, pyqtSignal, QPoint, QTimer, QSize
+                             QApplication, QLineEdit)
+from PyQt6.QtCore import Qt, pyqtSignal, QPoint, QTimer, QSize, QThread
 from PyQt6.QtGui import QPixmap, QImage, QMouseEvent, QWheelEvent, QPainter, QPen, QColor, QFont, QBrush
 import fitz  # PyMuPDF
 import traceback
-from typing import List, Dict
+import copy
+import threading
+import queue
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 from config.database import SessionLocal
-from core.padron_service import PadronService
+from core.padron_service import PadronService, RegistrosPadronPaginados
+from core.plantilla_service import PlantillaService
 from core.models import Proyecto
 import os
 
+# PyMuPDF usa un contexto global: todo acceso a fitz desde hilos distintos se serializa
+LOCK_FITZ = threading.Lock()
+
+PUNTOS_POR_MM = 72 / 25.4
+ZOOM_MIN = 0.25
+ZOOM_MAX = 4.0
+PASO_ZOOM = 1.25
+
+
+def renderizar_pagina_qimage(doc, page_num: int, zoom: float) -> QImage:
+    """Rasteriza una página a QImage (copia propia, segura para pasar entre hilos)"""
+    with LOCK_FITZ:
+        pagina = doc[page_num]
+        pix = pagina.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888).copy()
+
+
+class CachePixmaps:
+    """Caché LRU de páginas rasterizadas, acotada por memoria, con llave (página, zoom)"""
+    
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes_usados = 0
+        self._items = OrderedDict()
+    
+    @staticmethod
+    def llave(page_num: int, zoom: float) -> Tuple[int, float]:
+        return (page_num, round(zoom, 3))
+    
+    def obtener(self, page_num: int, zoom: float) -> Optional[QPixmap]:
+        llave = self.llave(page_num, zoom)
+        pixmap = self._items.get(llave)
+        if pixmap is not None:
+            self._items.move_to_end(llave)
+        return pixmap
+    
+    def contiene(self, page_num: int, zoom: float) -> bool:
+        return self.llave(page_num, zoom) in self._items
+    
+    def guardar(self, page_num: int, zoom: float, pixmap: QPixmap):
+        llave = self.llave(page_num, zoom)
+        if llave in self._items:
+            self.bytes_usados -= self._costo(self._items.pop(llave))
+        self._items[llave] = pixmap
+        self.bytes_usados += self._costo(pixmap)
+        # Expulsar lo menos usado (nunca la entrada recién guardada)
+        while self.bytes_usados > self.max_bytes and len(self._items) > 1:
+            _, expulsado = self._items.popitem(last=False)
+            self.bytes_usados -= self._costo(expulsado)
+    
+    def limpiar(self):
+        self._items.clear()
+        self.bytes_usados = 0
+    
+    @staticmethod
+    def _costo(pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * 4
+
+
+class PrefetchPaginasThread(QThread):
+    """Rasteriza en segundo plano las páginas vecinas a la visible"""
+    pagina_renderizada = pyqtSignal(int, float, QImage)  # página, zoom, imagen
+    
+    def __init__(self, pdf_path: str):
+        super().__init__()
+        self.pdf_path = pdf_path
+        self.solicitudes = queue.Queue()
+        self._detener = threading.Event()
+    
+    def solicitar(self, page_num: int, zoom: float):
+        self.solicitudes.put((page_num, zoom))
+    
+    def detener(self):
+        self._detener.set()
+        self.solicitudes.put(None)
+    
+    def run(self):
+        with LOCK_FITZ:
+            doc = fitz.open(self.pdf_path)
+        try:
+            while not self._detener.is_set():
+                solicitud = self.solicitudes.get()
+                if solicitud is None:
+                    break
+                page_num, zoom = solicitud
+                if 0 <= page_num < len(doc):
+                    imagen = renderizar_pagina_qimage(doc, page_num, zoom)
+                    if not self._detener.is_set():
+                        self.pagina_renderizada.emit(page_num, zoom, imagen)
+        except Exception as e:
+            print(f"⚠️ Error en prefetch de páginas: {e}")
+        finally:
+            with LOCK_FITZ:
+                doc.close()
+
+
+class RenderVivoThread(QThread):
+    """Genera con el motor real (PDFGenerator) el registro actual y lo rasteriza.
+    
+    Solo se atiende la solicitud más reciente: las que llegan mientras se trabaja
+    reemplazan a las pendientes y los resultados obsoletos se descartan.
+    """
+    render_listo = pyqtSignal(int, QImage, float)  # id de solicitud, imagen, segundos
+    
+    def __init__(self, pdf_path: str):
+        super().__init__()
+        self.pdf_path = pdf_path
+        self._condicion = threading.Condition()
+        self._pendiente = None
+        self._ultima_solicitud = 0
+        self._detener = False
+        self._generador = None
+    
+    def solicitar(self, solicitud_id: int, campos: List[Dict], datos: Dict, zoom: float):
+        with self._condicion:
+            self._pendiente = (solicitud_id, campos, datos, zoom)
+            self._ultima_solicitud = solicitud_id
+            self._condicion.notify()
+    
+    def detener(self):
+        with self._condicion:
+            self._detener = True
+            self._condicion.notify()
+    
+    def _obsoleta(self, solicitud_id: int) -> bool:
+        return self._detener or solicitud_id != self._ultima_solicitud
+    
+    def run(self):
+        from core.pdf_generator import PDFGenerator
+        import time
+        
+        while True:
+            with self._condicion:
+                while self._pendiente is None and not self._detener:
+                    self._condicion.wait()
+                if self._detener:
+                    return
+                solicitud_id, campos, datos, zoom = self._pendiente
+                self._pendiente = None
+            
+            try:
+                inicio = time.perf_counter()
+                if self._generador is None:
+                    self._generador = PDFGenerator(self.pdf_path)
+                
+                contenido = self._generador.generar_pdf_en_memoria(campos, datos)
+                if contenido is None or self._obsoleta(solicitud_id):
+                    continue
+                
+                # Fondo transparente: solo los campos, para superponer a la plantilla
+                with LOCK_FITZ:
+                    doc = fitz.open(stream=contenido, filetype="pdf")
+                    try:
+                        pix = doc[0].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=True)
+                        imagen = QImage(pix.samples, pix.width, pix.height, pix.stride,
+                                        QImage.Format.Format_RGBA8888).copy()
+                    finally:
+                        doc.close()
+                
+                if not self._obsoleta(solicitud_id):
+                    self.render_listo.emit(solicitud_id, imagen, time.perf_counter() - inicio)
+            except Exception as e:
+                print(f"⚠️ Error en render en vivo: {e}")
+
+
 class PreviewPDF(QFrame):
     """Preview de PDF con datos REALES del padrón"""
     
@@ -27,10 +197,31 @@ class PreviewPDF(QFrame):
         self.pdf_path = None
         self.campos = []
         self.campo_seleccionado_actual = None
-        self.imagenes_paginas = []
+        self.imagenes_paginas = []  # Metadatos por página: ancho/alto en mm
         self.pagina_actual = 0
         self.total_paginas = 0
-        self.escala = 1.0
+        self.escala = 1.0  # Píxeles por mm al zoom actual
+        
+        # Render bajo demanda
+        self.doc = None
+        self.zoom = 1.5
+        self.cache_pixmaps = CachePixmaps()
+        self.thread_prefetch = None
+        self.timer_rerender = QTimer()
+        self.timer_rerender.setSingleShot(True)
+        self.timer_rerender.setInterval(120)
+        self.timer_rerender.timeout.connect(self.renderizar_pagina_actual)
+        
+        # Render en vivo de la salida real (modo vista previa)
+        self.render_vivo_activo = False
+        self.thread_render_vivo = None
+        self.solicitud_render_vivo = 0
+        self.overlay_render_vivo = None
+        self.timer_render_vivo = QTimer()
+        self.timer_render_vivo.setSingleShot(True)
+        self.timer_render_vivo.setInterval(250)
+        self.timer_render_vivo.timeout.connect(self.lanzar_render_vivo)
+        
         self.arrastrando = False
         self.punto_inicio_arrastre = None
         self.punto_fin_arrastre = None
@@ -39,7 +230,9 @@ class PreviewPDF(QFrame):
         # Modos y datos REALES
         self.modo = 'seleccion'
         self.modo_vista = 'plantilla'  # 'plantilla' o 'preview'
-        self.registros_reales = []  # ← Datos REALES del padrón
+        self.registros_reales = []  # ← Datos REALES del padrón (lista o RegistrosPadronPaginados)
+        self.busqueda_padron = None
+        self.columnas_tabla_padron = {}
         self.registro_actual_idx = 0
         self.proyecto_id = None
         self.tipo_campo_a_agregar = None  # ← ¡NUEVO! Tipo de campo a agregar
@@ -109,6 +302,33 @@ class PreviewPDF(QFrame):
         layout_modos.addWidget(self.btn_modo_preview)
         layout_modos.addStretch()
         
+        # Navegación de páginas
+        self.btn_pagina_anterior = QPushButton("◀")
+        self.btn_pagina_anterior.setToolTip("Página anterior")
+        self.btn_pagina_anterior.clicked.connect(lambda: self.ir_a_pagina(self.pagina_actual - 1))
+        self.lbl_pagina = QLabel("")
+        self.lbl_pagina.setStyleSheet("color: #666; font-size: 11px;")
+        self.btn_pagina_siguiente = QPushButton("▶")
+        self.btn_pagina_siguiente.setToolTip("Página siguiente")
+        self.btn_pagina_siguiente.clicked.connect(lambda: self.ir_a_pagina(self.pagina_actual + 1))
+        
+        # Zoom
+        self.btn_alejar = QPushButton("－")
+        self.btn_alejar.setToolTip("Alejar (Ctrl + rueda)")
+        self.btn_alejar.clicked.connect(lambda: self.set_zoom(self.zoom / PASO_ZOOM))
+        self.lbl_zoom = QLabel("")
+        self.lbl_zoom.setStyleSheet("color: #666; font-size: 11px;")
+        self.btn_acercar = QPushButton("＋")
+        self.btn_acercar.setToolTip("Acercar (Ctrl + rueda)")
+        self.btn_acercar.clicked.connect(lambda: self.set_zoom(self.zoom * PASO_ZOOM))
+        self.btn_ajustar = QPushButton("↔ Ajustar")
+        self.btn_ajustar.setToolTip("Ajustar al ancho")
+        self.btn_ajustar.clicked.connect(self.ajustar_al_ancho)
+        
+        for widget in (self.btn_pagina_anterior, self.lbl_pagina, self.btn_pagina_siguiente,
+                       self.btn_alejar, self.lbl_zoom, self.btn_acercar, self.btn_ajustar):
+            layout_modos.addWidget(widget)
+        
         # Información de proyecto
         self.lbl_info = QLabel("Sin PDF cargado")
         self.lbl_info.setStyleSheet("color: #666; font-size: 11px;")
@@ -270,14 +490,21 @@ class PreviewPDF(QFrame):
                                   "Este proyecto no tiene una tabla de padrón configurada")
                 return
             
-            # 2. Obtener datos del padrón
+            # 2. Datos del padrón: páginas por keyset bajo demanda (no solo los primeros N),
+            #    trayendo solo las columnas que usan los campos de la plantilla
             padron_service = PadronService(db)
-            self.registros_reales = padron_service.obtener_todos_registros(
-                proyecto.tabla_padron, 
-                limit=50  # Primeros 50 registros para preview
+            identificador = padron_service.obtener_padron_por_uuid(proyecto.tabla_padron)
+            self.columnas_tabla_padron = (
+                padron_service.obtener_tipos_columnas(identificador.nombre_tabla) if identificador else {}
+            )
+            self.registros_reales = RegistrosPadronPaginados(
+                proyecto.tabla_padron,
+                tamano_pagina=100,
+                columnas=self.columnas_referenciadas_preview(),
+                busqueda=self.busqueda_padron
             )
             
-            if not self.registros_reales:
+            if not self.registros_reales and not self.busqueda_padron:
                 QMessageBox.information(self, "Sin datos", 
                                       "No hay datos en el padrón. Usando datos de ejemplo...")
                 # Crear datos de ejemplo
@@ -289,7 +516,7 @@ class PreviewPDF(QFrame):
             # 4. Actualizar UI
             self.actualizar_barra_navegacion()
             
-            print(f"✅ Cargados {len(self.registros_reales)} registros REALES del padrón")
+            print(f"✅ Padrón con {len(self.registros_reales)} registros REALES (carga por páginas)")
             
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error cargando datos: {str(e)}")
@@ -399,7 +626,7 @@ class PreviewPDF(QFrame):
             traceback.print_exc()
     
     def cargar_pdf(self, pdf_path: str):
-        """Carga un PDF"""
+        """Carga un PDF (solo lee tamaños; las páginas se rasterizan al mostrarse)"""
         if not os.path.exists(pdf_path):
             self.mostrar_error(f"Archivo no encontrado: {pdf_path}")
             return
@@ -411,25 +638,35 @@ class PreviewPDF(QFrame):
             self.limpiar_paginas()
             self.campos = []
             
-            # Abrir PDF
-            doc = fitz.open(pdf_path)
-            self.total_paginas = len(doc)
+            # Abrir PDF (se mantiene abierto para renderizar bajo demanda)
+            with LOCK_FITZ:
+                self.doc = fitz.open(pdf_path)
+                self.total_paginas = len(self.doc)
+                tamanos = [(p.rect.width, p.rect.height) for p in self.doc]
             
             if self.total_paginas == 0:
                 self.mostrar_error("El PDF no tiene páginas")
-                doc.close()
                 return
             
-            # Renderizar cada página
+            # Tamaño real de cada página en mm (no se asume A4)
+            self.imagenes_paginas = [
+                {'ancho_mm': ancho / PUNTOS_POR_MM, 'alto_mm': alto / PUNTOS_POR_MM}
+                for ancho, alto in tamanos
+            ]
+            self.zoom = self.calcular_zoom_ajuste()
+            self.escala = self.zoom * PUNTOS_POR_MM
+            
             for page_num in range(self.total_paginas):
-                pagina_widget = self.crear_pagina_widget(doc, page_num)
+                pagina_widget = self.crear_pagina_widget(page_num)
                 self.container_paginas.addWidget(pagina_widget)
             
-            doc.close()
+            # Hilo de prefetch para páginas vecinas
+            self.thread_prefetch = PrefetchPaginasThread(pdf_path)
+            self.thread_prefetch.pagina_renderizada.connect(self.on_pagina_prefetch)
+            self.thread_prefetch.start()
             
             # Mostrar primera página
-            self.pagina_actual = 0
-            self.container_paginas.setCurrentIndex(0)
+            self.ir_a_pagina(0)
             
             self.barra_estado.setText(f"✅ PDF cargado: {os.path.basename(pdf_path)} - {self.total_paginas} página(s)")
             
@@ -437,52 +674,248 @@ class PreviewPDF(QFrame):
             self.mostrar_error(f"Error cargando PDF: {str(e)}")
             traceback.print_exc()
     
-    def crear_pagina_widget(self, doc, page_num):
-        """Crea widget para una página del PDF"""
+    def crear_pagina_widget(self, page_num):
+        """Crea widget para una página del PDF (sin rasterizar todavía)"""
         pagina_widget = QWidget()
         pagina_layout = QVBoxLayout()
         pagina_layout.setContentsMargins(0, 0, 0, 0)
         pagina_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
-        # Renderizar página
-        pagina = doc[page_num]
-        zoom = 1.8  # Zoom para buena visualización
-        mat = fitz.Matrix(zoom, zoom)
-        pix = pagina.get_pixmap(matrix=mat, alpha=False)
-        
-        # Crear imagen
-        img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888)
-        pixmap = QPixmap.fromImage(img)
-        
-        # Crear label para la imagen
+        # Label con el tamaño final de la página; el pixmap se asigna al mostrarla
         lbl_imagen = QLabel()
         lbl_imagen.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        lbl_imagen.setPixmap(pixmap)
-        lbl_imagen.setFixedSize(pix.width, pix.height)
-        
-        # Guardar escala (píxeles por mm)
-        # A4 = 210x297mm, asumimos que es A4
-        self.escala = pix.width / 210  # pixeles por mm (ancho A4)
-        lbl_imagen.escala = self.escala
+        lbl_imagen.setStyleSheet("background-color: white;")
         lbl_imagen.page_num = page_num
+        self.aplicar_tamano_label(lbl_imagen)
         
         # Conectar eventos
         lbl_imagen.mousePressEvent = lambda e, p=page_num: self.on_click_pagina(e, p)
         lbl_imagen.mouseMoveEvent = self.on_mouse_move_pagina
         lbl_imagen.setMouseTracking(True)
         
-        # Guardar referencia
-        self.imagenes_paginas.append({
-            'pixmap': pixmap,
-            'width': pix.width,
-            'height': pix.height,
-            'escala': self.escala
-        })
-        
         pagina_layout.addWidget(lbl_imagen)
         pagina_widget.setLayout(pagina_layout)
         
         return pagina_widget
+    
+    # ===== RENDER BAJO DEMANDA Y ZOOM =====
+    
+    def calcular_zoom_ajuste(self) -> float:
+        """Zoom para que la página actual ocupe el ancho visible"""
+        if not self.imagenes_paginas:
+            return self.zoom
+        ancho_pt = self.imagenes_paginas[self.pagina_actual]['ancho_mm'] * PUNTOS_POR_MM
+        ancho_visible = self.scroll_area.viewport().width() - 20
+        if ancho_visible < 200:  # Widget aún sin geometría
+            return 1.5
+        return max(ZOOM_MIN, min(ZOOM_MAX, ancho_visible / ancho_pt))
+    
+    def aplicar_tamano_label(self, lbl_imagen: QLabel):
+        """Ajusta tamaño y escala (px/mm) del label de una página al zoom actual"""
+        meta = self.imagenes_paginas[lbl_imagen.page_num]
+        lbl_imagen.escala = self.escala
+        lbl_imagen.setFixedSize(int(round(meta['ancho_mm'] * self.escala)),
+                                int(round(meta['alto_mm'] * self.escala)))
+    
+    def obtener_label_pagina(self, page_num: int) -> Optional[QLabel]:
+        pagina_widget = self.container_paginas.widget(page_num)
+        if pagina_widget:
+            return pagina_widget.findChild(QLabel)
+        return None
+    
+    def obtener_pixmap_pagina(self, page_num: int, zoom: float) -> QPixmap:
+        """Pixmap de la página al zoom pedido (caché o render inmediato)"""
+        pixmap = self.cache_pixmaps.obtener(page_num, zoom)
+        if pixmap is None:
+            pixmap = QPixmap.fromImage(renderizar_pagina_qimage(self.doc, page_num, zoom))
+            self.cache_pixmaps.guardar(page_num, zoom, pixmap)
+        return pixmap
+    
+    def renderizar_pagina_actual(self):
+        """Asigna el raster nítido de la página visible y pide sus vecinas"""
+        if not self.doc or not (0 <= self.pagina_actual < self.total_paginas):
+            return
+        lbl_imagen = self.obtener_label_pagina(self.pagina_actual)
+        if lbl_imagen:
+            lbl_imagen.setPixmap(self.obtener_pixmap_pagina(self.pagina_actual, self.zoom))
+        self.programar_prefetch(self.pagina_actual)
+    
+    def programar_prefetch(self, page_num: int):
+        """Solicita al hilo de fondo las páginas vecinas que no estén en caché"""
+        if not self.thread_prefetch:
+            return
+        for vecina in (page_num + 1, page_num - 1):
+            if 0 <= vecina < self.total_paginas and not self.cache_pixmaps.contiene(vecina, self.zoom):
+                self.thread_prefetch.solicitar(vecina, self.zoom)
+    
+    def on_pagina_prefetch(self, page_num: int, zoom: float, imagen: QImage):
+        """Guarda en caché una página rasterizada en segundo plano"""
+        if round(zoom, 3) != round(self.zoom, 3):
+            return  # Zoom obsoleto
+        self.cache_pixmaps.guardar(page_num, zoom, QPixmap.fromImage(imagen))
+    
+    def ir_a_pagina(self, page_num: int):
+        """Muestra una página; libera el pixmap de la anterior (queda en caché)"""
+        if not (0 <= page_num < self.total_paginas):
+            return
+        
+        anterior = self.obtener_label_pagina(self.pagina_actual)
+        if anterior and page_num != self.pagina_actual:
+            anterior.clear()
+        
+        self.pagina_actual = page_num
+        self.container_paginas.setCurrentIndex(page_num)
+        self.renderizar_pagina_actual()
+        self.actualizar_controles_pagina()
+    
+    def set_zoom(self, zoom: float):
+        """Cambia el zoom: reescala de inmediato y re-rasteriza al terminar de ajustar"""
+        zoom = max(ZOOM_MIN, min(ZOOM_MAX, zoom))
+        if not self.doc or abs(zoom - self.zoom) < 1e-3:
+            return
+        
+        self.zoom = zoom
+        self.escala = zoom * PUNTOS_POR_MM
+        
+        for page_num in range(self.total_paginas):
+            lbl_imagen = self.obtener_label_pagina(page_num)
+            if lbl_imagen:
+                self.aplicar_tamano_label(lbl_imagen)
+        
+        # Vista provisional escalada mientras llega el raster a la nueva resolución
+        lbl_actual = self.obtener_label_pagina(self.pagina_actual)
+        if lbl_actual and lbl_actual.pixmap() and not lbl_actual.pixmap().isNull():
+            lbl_actual.setPixmap(lbl_actual.pixmap().scaled(
+                lbl_actual.size(), Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.FastTransformation
+            ))
+        
+        self.reposicionar_campos()
+        self.actualizar_controles_pagina()
+        self.timer_rerender.start()
+        self.solicitar_render_vivo()
+    
+    def ajustar_al_ancho(self):
+        self.set_zoom(self.calcular_zoom_ajuste())
+    
+    def reposicionar_campos(self):
+        """Recoloca los campos (configurados en mm) a la escala actual"""
+        for campo in self.campos:
+            try:
+                config = campo.config
+                campo.move(int(float(config.get('x', 0)) * self.escala),
+                           int(float(config.get('y', 0)) * self.escala))
+                if 'ancho' in config and 'alto' in config:
+                    campo.setFixedSize(int(float(config['ancho']) * self.escala),
+                                       int(float(config['alto']) * self.escala))
+            except Exception as e:
+                print(f"⚠️ Error reposicionando campo: {e}")
+    
+    def actualizar_controles_pagina(self):
+        """Refresca indicador de página y zoom"""
+        self.lbl_pagina.setText(f"Pág. {self.pagina_actual + 1}/{self.total_paginas}" if self.total_paginas else "")
+        self.lbl_zoom.setText(f"{self.zoom * 100:.0f}%")
+        self.btn_pagina_anterior.setEnabled(self.pagina_actual > 0)
+        self.btn_pagina_siguiente.setEnabled(self.pagina_actual < self.total_paginas - 1)
+        self.btn_alejar.setEnabled(self.zoom > ZOOM_MIN)
+        self.btn_acercar.setEnabled(self.zoom < ZOOM_MAX)
+    
+    def wheelEvent(self, event: QWheelEvent):
+        """Ctrl + rueda cambia el zoom"""
+        if event.modifiers() & Qt.KeyboardModifier.ControlModifier and self.doc:
+            factor = PASO_ZOOM if event.angleDelta().y() > 0 else 1 / PASO_ZOOM
+            self.set_zoom(self.zoom * factor)
+            event.accept()
+        else:
+            super().wheelEvent(event)
+    
+    def detener_prefetch(self):
+        if self.thread_prefetch:
+            self.thread_prefetch.detener()
+            self.thread_prefetch.wait(2000)
+            self.thread_prefetch = None
+    
+    def closeEvent(self, event):
+        self.detener_prefetch()
+        self.detener_render_vivo()
+        super().closeEvent(event)
+    
+    # ===== RENDER EN VIVO DE LA SALIDA REAL =====
+    
+    def activar_render_vivo(self, activo: bool):
+        self.render_vivo_activo = activo
+        if activo:
+            self.solicitar_render_vivo(inmediato=True)
+        else:
+            self.ocultar_render_vivo()
+    
+    def solicitar_render_vivo(self, inmediato: bool = False):
+        """Programa (con debounce) un render de la salida real del registro actual"""
+        if not self.render_vivo_activo or self.modo_vista != 'preview' or not self.pdf_path:
+            return
+        if inmediato:
+            self.timer_render_vivo.stop()
+            self.lanzar_render_vivo()
+        else:
+            self.timer_render_vivo.start()
+    
+    def lanzar_render_vivo(self):
+        """Envía el estado actual (campos + registro) al hilo de render"""
+        if not self.registros_reales or self.registro_actual_idx >= len(self.registros_reales):
+            return
+        
+        if self.thread_render_vivo is None:
+            self.thread_render_vivo = RenderVivoThread(self.pdf_path)
+            self.thread_render_vivo.render_listo.connect(self.on_render_vivo_listo)
+            self.thread_render_vivo.start()
+        
+        # Copias: el hilo no debe leer widgets ni configs que el editor sigue modificando
+        campos = [copy.deepcopy(campo.config) for campo in self.campos]
+        datos = dict(self.registros_reales[self.registro_actual_idx])
+        
+        self.solicitud_render_vivo += 1
+        self.thread_render_vivo.solicitar(self.solicitud_render_vivo, campos, datos, self.zoom)
+    
+    def on_render_vivo_listo(self, solicitud_id: int, imagen: QImage, segundos: float):
+        """Superpone el render recibido si sigue siendo el más reciente"""
+        if solicitud_id != self.solicitud_render_vivo or not self.render_vivo_activo:
+            return
+        
+        # El PDF generado tiene una sola página: se superpone a la primera de la plantilla
+        lbl_imagen = self.obtener_label_pagina(0)
+        if not lbl_imagen:
+            return
+        
+        if self.overlay_render_vivo is None or self.overlay_render_vivo.parent() is not lbl_imagen:
+            self.overlay_render_vivo = QLabel(lbl_imagen)
+            self.overlay_render_vivo.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+            self.overlay_render_vivo.setStyleSheet("background: transparent;")
+        
+        pixmap = QPixmap.fromImage(imagen)
+        self.overlay_render_vivo.setPixmap(pixmap)
+        self.overlay_render_vivo.setGeometry(0, 0, pixmap.width(), pixmap.height())
+        self.overlay_render_vivo.show()
+        self.overlay_render_vivo.raise_()
+        
+        self.barra_estado.setText(
+            f"🎯 Salida real - Registro {self.registro_actual_idx + 1}/{len(self.registros_reales)} "
+            f"({segundos * 1000:.0f} ms)"
+        )
+    
+    def ocultar_render_vivo(self):
+        self.timer_render_vivo.stop()
+        self.solicitud_render_vivo += 1  # Descarta renders en curso
+        if self.overlay_render_vivo is not None:
+            self.overlay_render_vivo.hide()
+    
+    def detener_render_vivo(self):
+        self.ocultar_render_vivo()
+        self.overlay_render_vivo = None  # Se destruye junto con su página
+        if self.thread_render_vivo:
+            self.thread_render_vivo.detener()
+            self.thread_render_vivo.wait(2000)
+            self.thread_render_vivo = None
+    
     def mouseMoveEvent(self, event: QMouseEvent):
         """Dibuja rectángulo de arrastre"""
         if self.arrastrando:
@@ -582,7 +1015,17 @@ class PreviewPDF(QFrame):
             self.container_paginas.removeWidget(widget)
             widget.deleteLater()
         
+        self.detener_prefetch()
+        self.detener_render_vivo()
+        self.timer_rerender.stop()
+        self.cache_pixmaps.limpiar()
+        if self.doc:
+            with LOCK_FITZ:
+                self.doc.close()
+            self.doc = None
         self.imagenes_paginas = []
+        self.total_paginas = 0
+        self.pagina_actual = 0
     
     def deseleccionar_todos_los_campos(self):
         """Deselecciona ABSOLUTAMENTE TODOS los campos"""
@@ -699,10 +1142,6 @@ class PreviewPDF(QFrame):
             datos_actuales = self.registros_reales[self.registro_actual_idx]
             if hasattr(campo_widget, 'set_datos_preview_real'):
                 campo_widget.set_datos_preview_real(datos_actuales)
-        
-        campo_widget.show()
-        self.campos.append(campo_widget)
-        self.seleccionar_campo(campo_widget)
     
     def seleccionar_campo(self, campo):
         """Selecciona un campo - VERSIÓN MEJORADA CON DESELECCIÓN GLOBAL"""
@@ -752,6 +1191,12 @@ class PreviewPDF(QFrame):
     def mostrar_registro(self, registro_idx: int):
         """Muestra un registro específico"""
         if 0 <= registro_idx < len(self.registros_reales):
+            try:
+                self.registros_reales[registro_idx]  # Trae su página (o corrige un total estimado)
+            except IndexError:
+                registro_idx = len(self.registros_reales) - 1
+                if registro_idx < 0:
+                    return False
             self.registro_actual_idx = registro_idx
             self.actualizar_vista_preview()
             return True
@@ -780,6 +1225,7 @@ class PreviewPDF(QFrame):
 
     def actualizar_vista_preview(self):
         """Muestra datos REALES del registro actual - VERSIÓN MEJORADA"""
+        self.asegurar_columnas_preview()
         if not self.registros_reales or self.registro_actual_idx >= len(self.registros_reales):
             self.barra_estado.setText("⚠️ No hay datos para vista previa")
             return
@@ -819,6 +1265,7 @@ class PreviewPDF(QFrame):
             
             # Actualizar barra de navegación
             self.actualizar_barra_navegacion()
+            self.solicitar_render_vivo()
             
             # Actualizar barra de estado con información útil
             total = len(self.registros_reales)
@@ -924,6 +1371,12 @@ class PreviewPDF(QFrame):
         self.btn_ultimo.clicked.connect(lambda: self.ir_a_registro(len(self.registros_reales)))
         self.btn_ultimo.setToolTip("Ir al último registro")
         
+        # Búsqueda en el padrón (filtro del lado del servidor)
+        self.txt_buscar_padron = QLineEdit()
+        self.txt_buscar_padron.setPlaceholderText("🔍 Buscar en padrón...")
+        self.txt_buscar_padron.setFixedWidth(180)
+        self.txt_buscar_padron.returnPressed.connect(self.buscar_en_padron)
+        
         # Botón Actualizar datos
         self.btn_actualizar = QPushButton("🔄 Actualizar")
         self.btn_actualizar.clicked.connect(self.recargar_datos)
@@ -935,6 +1388,15 @@ class PreviewPDF(QFrame):
         layout_nav.addWidget(self.btn_siguiente)
         layout_nav.addWidget(self.btn_ultimo)
         layout_nav.addStretch()
+        layout_nav.addWidget(self.txt_buscar_padron)
+        
+        # Salida real superpuesta
+        self.btn_render_vivo = QPushButton("🎯 Salida real")
+        self.btn_render_vivo.setCheckable(True)
+        self.btn_render_vivo.setChecked(self.render_vivo_activo)
+        self.btn_render_vivo.setToolTip("Superponer el PDF que genera el motor de emisión para este registro")
+        self.btn_render_vivo.toggled.connect(self.activar_render_vivo)
+        layout_nav.addWidget(self.btn_render_vivo)
         layout_nav.addWidget(self.btn_actualizar)
         
         self.barra_navegacion.setLayout(layout_nav)
@@ -955,9 +1417,16 @@ class PreviewPDF(QFrame):
         self.spin_registro.blockSignals(True)  # Evitar señal durante actualización
         self.spin_registro.setMaximum(max(1, total))
         self.spin_registro.setValue(actual)
+        # Tras un salto en un padrón grande la posición es una estimación
+        posicion_aproximada = getattr(self.registros_reales, 'posicion_aproximada', None)
+        aproximada = bool(total) and posicion_aproximada is not None and \
+            posicion_aproximada(self.registro_actual_idx)
+        self.spin_registro.setPrefix("~" if aproximada else "")
+        self.spin_registro.setToolTip("Posición aproximada" if aproximada else "")
         self.spin_registro.blockSignals(False)
         
-        self.lbl_total.setText(f"/ {total}")
+        estimado = getattr(self.registros_reales, 'total_estimado', False)
+        self.lbl_total.setText(f"/ ~{total:,}" if estimado else f"/ {total:,}")
         
         # Actualizar estado de botones
         self.btn_primero.setEnabled(actual > 1)
@@ -968,6 +1437,33 @@ class PreviewPDF(QFrame):
         # Actualizar tooltips
         self.btn_actualizar.setToolTip(f"Recargar datos ({total} registros cargados)")
 
+    def columnas_referenciadas_preview(self) -> Optional[List[str]]:
+        """Columnas del padrón que usan los campos actuales (None = todas)"""
+        referenciadas = PlantillaService.columnas_de_campos(campo.config for campo in self.campos)
+        columnas = [c for c in referenciadas if c in self.columnas_tabla_padron]
+        return columnas or None
+    
+    def asegurar_columnas_preview(self):
+        """Si un campo nuevo usa una columna no cargada, recarga con la proyección ampliada"""
+        registros = self.registros_reales
+        if not isinstance(registros, RegistrosPadronPaginados) or registros.columnas is None:
+            return
+        
+        necesarias = self.columnas_referenciadas_preview()
+        if necesarias and not set(necesarias) <= set(registros.columnas):
+            columnas = list(dict.fromkeys(registros.columnas + necesarias))
+            self.registros_reales = RegistrosPadronPaginados(
+                registros.uuid_padron, registros.tamano_pagina, columnas, registros.busqueda
+            )
+    
+    def buscar_en_padron(self):
+        """Filtra los registros de la vista previa por el texto de búsqueda"""
+        texto = self.txt_buscar_padron.text().strip()
+        self.busqueda_padron = texto or None
+        self.recargar_datos()
+        if not self.registros_reales and self.busqueda_padron:
+            self.barra_estado.setText(f"⚠️ Sin coincidencias para '{texto}'")
+    
     def recargar_datos(self):
         """Recarga los datos del padrón"""
         if self.proyecto_id:
@@ -1002,6 +1498,7 @@ class PreviewPDF(QFrame):
             
             # IMPORTANTE: Cambiar TODOS los campos a modo plantilla
             self.actualizar_vista_plantilla()
+            self.ocultar_render_vivo()
             
         else:  # preview
             self.btn_modo_plantilla.setChecked(False)
@@ -604,6 +604,7 @@ class EditorPlantillas(QWidget):
     def on_campo_modificado(self, cambios):
         """Cuando se modifica un campo"""
         print(f"Campo modificado: {cambios}")
+        self.preview_pdf.solicitar_render_vivo()
     
     def on_propiedades_cambiadas(self, propiedades):
         """Cuando cambian propiedades en el panel"""
@@ -617,6 +618,8 @@ class EditorPlantillas(QWidget):
                 self.campo_seleccionado.actualizar_texto()
             if hasattr(self.campo_seleccionado, 'actualizar_vista'):
                 self.campo_seleccionado.actualizar_vista()
+            
+            self.preview_pdf.solicitar_render_vivo()
     
     def eliminar_campo(self, campo):
         """Elimina un campo"""
@@ -630,6 +633,7 @@ class EditorPlantillas(QWidget):
             self.preview_pdf.eliminar_campo(campo)
             if campo in self.campos:
                 self.campos.remove(campo)
+            self.preview_pdf.solicitar_render_vivo()
             
             if self.campo_seleccionado == campo:
                 self.campo_seleccionado = None
@@ -1,11 +1,12 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QFrame, QMessageBox, QTextEdit,
-                             QProgressBar, QGroupBox)
+                             QProgressBar, QGroupBox, QCheckBox)
 from PyQt6.QtCore import Qt, pyqtSignal, QThread
 from PyQt6.QtGui import QFont
-from config.database import SessionLocal
+from config.database import SessionLocal, SessionBulk
 from core.csv_service import CSVService
 from ui.components.csv_uploader import CSVUploader
+from ui.components.monitor_trabajo import MonitorTrabajo
 import uuid
 
 class ProcesamientoCSVThread(QThread):
@@ -20,40 +21,68 @@ class ProcesamientoCSVThread(QThread):
         self.usuario_id = usuario_id
         self.sesion_id = sesion_id
         self.csv_service = None
+        self.metricas = None
     
     def run(self):
+        from core.metricas_pipeline import MetricasPipeline
+        
+        self.metricas = MetricasPipeline('carga_csv', self.sesion_id)
         try:
-            db = SessionLocal()
+            db = SessionBulk()  # Ingesta y match masivos: sin statement_timeout
             self.csv_service = CSVService(db)
             
-            self.progreso.emit(10, "Validando estructura del CSV...")
+            self.progreso.emit(2, "Validando estructura del CSV...")
             es_valido, campos, erroes = self.csv_service.validar_estructura_csv(self.file_path)
             
             if not es_valido:
                 self.terminado.emit(False, 0, erroes)
                 return
             
-            self.progreso.emit(30, "Procesando registros...")
+            # Ingesta: 5% - 60% según filas insertadas
+            self.progreso.emit(5, "Procesando registros...")
+            self.metricas.iniciar_etapa('ingesta')
             exito, registros, erroes = self.csv_service.procesar_csv(
-                self.file_path, self.proyecto_id, self.usuario_id, self.sesion_id
+                self.file_path, self.proyecto_id, self.usuario_id, self.sesion_id,
+                callback_progreso=self.avance_ingesta
             )
+            self.metricas.terminar_etapa('ingesta', registros, errores=len(erroes))
             
             if not exito:
                 self.terminado.emit(False, registros, erroes)
                 return
             
-            self.progreso.emit(70, "Realizando match con padrón...")
+            self.progreso.emit(60, f"Realizando match con padrón ({registros:,} registros)...")
+            self.metricas.iniciar_etapa('match', total=registros)
             exito_match, registros_match, erroes_match = self.csv_service.hacer_match_padron(
-                self.proyecto_id, self.sesion_id
+                self.proyecto_id, self.sesion_id, callback_progreso=self.avance_match
             )
+            self.metricas.terminar_etapa('match', registros, match_ok=registros_match)
             
-            self.progreso.emit(100, "Procesamiento completado")
+            self.progreso.emit(100, f"Procesamiento completado: ingesta {self.metricas.tasa('ingesta'):,.0f} filas/s, "
+                                    f"match {self.metricas.tasa('match'):,.0f} registros/s")
+            self.escribir_reporte_metricas()
             self.terminado.emit(True, registros, erroes + erroes_match)
             
         except Exception as e:
             self.terminado.emit(False, 0, [f"Error en procesamiento: {str(e)}"])
         finally:
             db.close()
+    
+    def avance_ingesta(self, procesados: int, total: int):
+        self.metricas.avance('ingesta', procesados, total)
+        porcentaje = 5 + int(procesados * 55 / total) if total else 5
+        self.progreso.emit(porcentaje, f"Procesando registros: {self.metricas.texto_avance('ingesta')}")
+    
+    def avance_match(self, procesados: int, total: int):
+        self.metricas.avance('match', procesados, total)
+        porcentaje = 60 + int(procesados * 35 / total) if total else 60
+        self.progreso.emit(porcentaje, f"Realizando match con padrón: {self.metricas.texto_avance('match')}")
+    
+    def escribir_reporte_metricas(self):
+        try:
+            self.metricas.escribir_reporte()
+        except OSError as e:
+            print(f"⚠️ No se pudo escribir el reporte de métricas: {e}")
 
 class CargadorCSV(QWidget):
     """Interfaz para carga y procesamiento de archivos CSV"""
@@ -66,6 +95,7 @@ class CargadorCSV(QWidget):
         self.plantilla_id = plantilla_id
         self.sesion_id = str(uuid.uuid4())
         self.thread_procesamiento = None
+        self.monitor_trabajo = None
         self.setup_ui()
     
     def setup_ui(self):
@@ -83,6 +113,11 @@ class CargadorCSV(QWidget):
         self.csv_uploader.archivo_cargado.connect(self.on_archivo_cargado)
         layout.addWidget(self.csv_uploader)
         
+        # Ejecutar en worker (la ruta del CSV debe ser accesible desde el servidor)
+        self.check_cola = QCheckBox("Procesar en servidor (cola de trabajos)")
+        self.check_cola.setToolTip("El procesamiento continúa aunque se cierre la aplicación")
+        layout.addWidget(self.check_cola)
+        
         # Área de progreso (oculta inicialmente)
         self.grupo_progreso = QGroupBox("Progreso de Procesamiento")
         self.grupo_progreso.setVisible(False)
@@ -147,7 +182,25 @@ class CargadorCSV(QWidget):
             }
         """)
         
+        self.btn_revisar = QPushButton("🔍 Revisar sin match")
+        self.btn_revisar.setToolTip("Busca en el padrón candidatos por similitud para los registros sin match")
+        self.btn_revisar.clicked.connect(self.revisar_sin_match)
+        self.btn_revisar.setEnabled(False)
+        self.btn_revisar.setStyleSheet("""
+            QPushButton {
+                background-color: #17a2b8;
+                color: white;
+                border: none;
+                padding: 12px 24px;
+                border-radius: 6px;
+            }
+            QPushButton:disabled {
+                background-color: #6c757d;
+            }
+        """)
+        
         button_layout.addWidget(self.btn_procesar)
+        button_layout.addWidget(self.btn_revisar)
         button_layout.addStretch()
         button_layout.addWidget(self.btn_limpiar)
         
@@ -176,6 +229,10 @@ class CargadorCSV(QWidget):
         self.texto_log.clear()
         self.agregar_log("🚀 Iniciando procesamiento...")
         
+        if self.check_cola.isChecked():
+            self.encolar_procesamiento()
+            return
+        
         # Crear y ejecutar hilo de procesamiento
         self.thread_procesamiento = ProcesamientoCSVThread(
             self.file_path, self.proyecto_id, self.usuario.id, self.sesion_id
@@ -184,6 +241,43 @@ class CargadorCSV(QWidget):
         self.thread_procesamiento.terminado.connect(self.procesamiento_terminado)
         self.thread_procesamiento.start()
     
+    def encolar_procesamiento(self):
+        """Envía la ingesta y el match a la cola de trabajos y sigue su avance"""
+        from core.cola_trabajos_service import ColaTrabajosService
+        db = SessionLocal()
+        try:
+            trabajo = ColaTrabajosService(db).encolar(
+                'ingesta',
+                {
+                    'file_path': self.file_path,
+                    'proyecto_id': self.proyecto_id,
+                    'usuario_id': self.usuario.id,
+                    'sesion_id': self.sesion_id
+                },
+                usuario_id=self.usuario.id,
+                proyecto_id=self.proyecto_id
+            )
+            trabajo_id = trabajo.id
+        except Exception as e:
+            self.procesamiento_terminado(False, 0, [f"No se pudo encolar el trabajo: {str(e)}"])
+            return
+        finally:
+            db.close()
+        
+        self.agregar_log(f"📬 Trabajo {trabajo_id} enviado a la cola")
+        self.monitor_trabajo = MonitorTrabajo(trabajo_id, parent=self)
+        self.monitor_trabajo.progreso.connect(self.actualizar_progreso)
+        self.monitor_trabajo.terminado.connect(self.trabajo_terminado)
+        self.monitor_trabajo.iniciar()
+    
+    def trabajo_terminado(self, estado: str, resultado: dict):
+        """Cuando el worker termina la ingesta"""
+        self.procesamiento_terminado(
+            estado == 'completado',
+            resultado.get('registros', 0),
+            resultado.get('errores', [])
+        )
+    
     def actualizar_progreso(self, porcentaje: int, mensaje: str):
         """Actualizar barra de progreso"""
         self.progress_bar.setValue(porcentaje)
@@ -201,6 +295,7 @@ class CargadorCSV(QWidget):
                 f"Session ID: {self.sesion_id}"
             )
             self.procesamiento_completado.emit(self.sesion_id)
+            self.btn_revisar.setEnabled(True)
         else:
             self.agregar_log("❌ Procesamiento fallido")
             erroes_str = "\n".join(erroes[:10])  # Mostrar solo primeros 10 errores
@@ -216,6 +311,14 @@ class CargadorCSV(QWidget):
         self.btn_procesar.setEnabled(True)
         self.csv_uploader.setEnabled(True)
     
+    def revisar_sin_match(self):
+        """Abre la revisión de candidatos por similitud de la sesión actual"""
+        from ui.modules.procesamiento.revision_candidatos import DialogoRevisionCandidatos
+        dialogo = DialogoRevisionCandidatos(
+            self.usuario, self.proyecto_id, self.sesion_id, self.plantilla_id, parent=self
+        )
+        dialogo.exec()
+    
     def agregar_log(self, mensaje: str):
         """Agregar mensaje al log"""
         self.texto_log.append(f"{mensaje}")
@@ -229,6 +332,7 @@ class CargadorCSV(QWidget):
         self.csv_uploader.resetear()
         self.grupo_progreso.setVisible(False)
         self.btn_procesar.setEnabled(False)
+        self.btn_revisar.setEnabled(False)
         self.progress_bar.setValue(0)
         self.texto_log.clear()
         
@@ -236,4 +340,8 @@ class CargadorCSV(QWidget):
             del self.file_path
         
         if self.thread_procesamiento and self.thread_procesamiento.isRunning():
-            self.thread_procesamiento.terminate()
\ No newline at end of file
+            self.thread_procesamiento.terminate()
+        
+        if self.monitor_trabajo:
+            self.monitor_trabajo.detener()
+            self.monitor_trabajo = None
\ No newline at end of file
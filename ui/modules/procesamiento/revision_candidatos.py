@@ -0,0 +1,192 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
+                             QDoubleSpinBox, QSpinBox, QAbstractItemView)
+from PyQt6.QtCore import pyqtSignal, QThread
+from PyQt6.QtGui import QFont, QColor
+from config.database import SessionLocal, SessionBulk
+from core.csv_service import CSVService
+
+
+class BusquedaCandidatosThread(QThread):
+    """Segunda pasada de match (similitud) en segundo plano"""
+    terminado = pyqtSignal(bool, int, list)
+
+    def __init__(self, proyecto_id: int, sesion_id: str, limite: int, umbral: float):
+        super().__init__()
+        self.proyecto_id = proyecto_id
+        self.sesion_id = sesion_id
+        self.limite = limite
+        self.umbral = umbral
+
+    def run(self):
+        db = SessionBulk()  # Puede construir índices GiST: sin statement_timeout
+        try:
+            exito, registros, errores = CSVService(db).buscar_candidatos_similares(
+                self.proyecto_id, self.sesion_id, self.limite, self.umbral
+            )
+            self.terminado.emit(exito, registros, errores)
+        except Exception as e:
+            self.terminado.emit(False, 0, [f"Error buscando candidatos: {str(e)}"])
+        finally:
+            db.close()
+
+
+class DialogoRevisionCandidatos(QDialog):
+    """Revisión de candidatos por similitud para registros sin match"""
+
+    def __init__(self, usuario, proyecto_id: int, sesion_id: str, plantilla_id=None, parent=None):
+        super().__init__(parent)
+        self.usuario = usuario
+        self.proyecto_id = proyecto_id
+        self.sesion_id = sesion_id
+        self.plantilla_id = plantilla_id
+        self.candidatos = []
+        self.thread_busqueda = None
+        self.setWindowTitle("🔍 Revisión de registros sin match")
+        self.resize(900, 550)
+        self.setup_ui()
+        self.cargar_candidatos()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        titulo = QLabel("Candidatos del padrón para registros sin match")
+        titulo.setFont(QFont("Arial", 13, QFont.Weight.Bold))
+        layout.addWidget(titulo)
+
+        # ===== BÚSQUEDA =====
+        busqueda_layout = QHBoxLayout()
+        self.spin_umbral = QDoubleSpinBox()
+        self.spin_umbral.setRange(0.1, 0.95)
+        self.spin_umbral.setSingleStep(0.05)
+        self.spin_umbral.setValue(0.3)
+        self.spin_umbral.setPrefix("Similitud mínima: ")
+
+        self.spin_limite = QSpinBox()
+        self.spin_limite.setRange(1, 10)
+        self.spin_limite.setValue(3)
+        self.spin_limite.setPrefix("Candidatos por registro: ")
+
+        self.btn_buscar = QPushButton("🔍 Buscar candidatos")
+        self.btn_buscar.clicked.connect(self.buscar_candidatos)
+        self.btn_buscar.setStyleSheet("background-color: #17a2b8; color: white; padding: 6px;")
+
+        busqueda_layout.addWidget(self.spin_umbral)
+        busqueda_layout.addWidget(self.spin_limite)
+        busqueda_layout.addWidget(self.btn_buscar)
+        busqueda_layout.addStretch()
+        layout.addLayout(busqueda_layout)
+
+        # ===== TABLA =====
+        self.tabla = QTableWidget()
+        self.tabla.setColumnCount(6)
+        self.tabla.setHorizontalHeaderLabels(
+            ["Cuenta", "Código afiliado", "Columna", "Valor buscado", "Valor en padrón", "Similitud"]
+        )
+        self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.tabla)
+
+        self.lbl_resumen = QLabel("")
+        self.lbl_resumen.setStyleSheet("color: #6c757d;")
+        layout.addWidget(self.lbl_resumen)
+
+        # ===== ACCIONES =====
+        acciones_layout = QHBoxLayout()
+        btn_aceptar = QPushButton("✅ Aceptar match")
+        btn_aceptar.clicked.connect(lambda: self.resolver_seleccion(True))
+        btn_aceptar.setStyleSheet("background-color: #28a745; color: white; padding: 6px;")
+
+        btn_rechazar = QPushButton("❌ Rechazar")
+        btn_rechazar.clicked.connect(lambda: self.resolver_seleccion(False))
+        btn_rechazar.setStyleSheet("background-color: #dc3545; color: white; padding: 6px;")
+
+        btn_cerrar = QPushButton("Cerrar")
+        btn_cerrar.clicked.connect(self.accept)
+
+        acciones_layout.addWidget(btn_aceptar)
+        acciones_layout.addWidget(btn_rechazar)
+        acciones_layout.addStretch()
+        acciones_layout.addWidget(btn_cerrar)
+        layout.addLayout(acciones_layout)
+
+        self.setLayout(layout)
+
+    def cargar_candidatos(self):
+        """Candidatos pendientes de la sesión"""
+        db = SessionLocal()
+        try:
+            self.candidatos = CSVService(db).obtener_candidatos_sesion(self.sesion_id)
+        finally:
+            db.close()
+
+        self.tabla.setRowCount(len(self.candidatos))
+        registro_anterior = None
+        for fila, candidato in enumerate(self.candidatos):
+            # Los datos del registro solo en su primer candidato (mejor rango)
+            es_nuevo = candidato['emision_temp_id'] != registro_anterior
+            registro_anterior = candidato['emision_temp_id']
+            valores = [
+                (candidato['cuenta'] or '') if es_nuevo else '',
+                (candidato['codigo_afiliado'] or '') if es_nuevo else '',
+                candidato['columna'],
+                candidato['valor_buscado'] or '',
+                candidato['valor_padron'] or '',
+                f"{candidato['similitud']:.0%}",
+            ]
+            for columna, valor in enumerate(valores):
+                item = QTableWidgetItem(str(valor))
+                if candidato['rango'] == 1:
+                    item.setBackground(QColor("#e8f5e9"))
+                self.tabla.setItem(fila, columna, item)
+
+        registros = len({c['emision_temp_id'] for c in self.candidatos})
+        self.lbl_resumen.setText(f"{registros} registros con {len(self.candidatos)} candidatos pendientes")
+
+    def buscar_candidatos(self):
+        if self.thread_busqueda and self.thread_busqueda.isRunning():
+            return
+        self.btn_buscar.setEnabled(False)
+        self.lbl_resumen.setText("🔍 Buscando candidatos en el padrón...")
+
+        self.thread_busqueda = BusquedaCandidatosThread(
+            self.proyecto_id, self.sesion_id, self.spin_limite.value(), self.spin_umbral.value()
+        )
+        self.thread_busqueda.terminado.connect(self.on_busqueda_terminada)
+        self.thread_busqueda.start()
+
+    def on_busqueda_terminada(self, exito: bool, registros: int, errores: list):
+        self.btn_buscar.setEnabled(True)
+        if not exito:
+            QMessageBox.warning(self, "Búsqueda", "\n".join(errores[:10]))
+        self.cargar_candidatos()
+
+    def resolver_seleccion(self, aceptar: bool):
+        filas = sorted({index.row() for index in self.tabla.selectedIndexes()})
+        if not filas:
+            QMessageBox.information(self, "Revisión", "Seleccione uno o más candidatos")
+            return
+
+        db = SessionLocal()
+        errores = []
+        try:
+            csv_service = CSVService(db)
+            for fila in filas:
+                exito, mensaje = csv_service.resolver_candidato(
+                    self.candidatos[fila]['id'], aceptar, self.usuario.id, self.plantilla_id
+                )
+                if not exito:
+                    errores.append(mensaje)
+        finally:
+            db.close()
+
+        if errores:
+            QMessageBox.warning(self, "Revisión", "\n".join(errores[:10]))
+        self.cargar_candidatos()
+
+    def done(self, resultado: int):
+        """Cerrar, Escape y la X de la ventana pasan por aquí: esperar la búsqueda en curso"""
+        if self.thread_busqueda and self.thread_busqueda.isRunning():
+            self.thread_busqueda.wait()
+        super().done(resultado)
@@ -6,7 +6,6 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont, QPixmap
 from ui.components.project_card import ProjectCard
-from ui.modules.proyectos.formulario_proyecto import FormularioProyecto
 from core.project_service import ProjectService
 from core.padron_service import PadronService
 from config.database import SessionLocal
@@ -437,6 +436,7 @@ class DashboardProyectos(QWidget):
         
         if self.stacked_widget:
             try:
+                from ui.modules.proyectos.formulario_proyecto import FormularioProyecto
                 formulario = FormularioProyecto(self.usuario, proyecto_id, self.stacked_widget)
                 formulario.proyecto_guardado.connect(self.on_proyecto_guardado)
                 
@@ -499,6 +499,7 @@ class DashboardProyectos(QWidget):
         
         if self.stacked_widget:
             try:
+                from ui.modules.proyectos.formulario_proyecto import FormularioProyecto
                 formulario = FormularioProyecto(self.usuario, None, self.stacked_widget)
                 formulario.proyecto_guardado.connect(self.on_proyecto_guardado)
                 
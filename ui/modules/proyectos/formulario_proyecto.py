@@ -4,15 +4,32 @@ from PyQt6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog,
     QProgressBar, QComboBox, QCheckBox, QSpinBox, QGroupBox
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QTimer
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QThread
 from PyQt6.QtGui import QFont, QPixmap
 from core.project_service import ProjectService
 from core.padron_service import PadronService
-from config.database import SessionLocal
+from config.database import SessionLocal, SessionBulk
 import os
-import pandas as pd
 import tempfile
 
+class OperacionPadronThread(QThread):
+    """Operación pesada sobre el padrón (carga delta, cambios de esquema) fuera del hilo de la interfaz"""
+    terminado = pyqtSignal(bool, object, list)
+    
+    def __init__(self, operacion):
+        super().__init__()
+        self.operacion = operacion  # operacion(padron_service) -> (éxito, resultado, errores)
+    
+    def run(self):
+        db = SessionBulk()  # Perfil masivo: sin statement_timeout para COPY y ALTER largos
+        try:
+            exito, resultado, errores = self.operacion(PadronService(db))
+            self.terminado.emit(exito, resultado, errores)
+        except Exception as e:
+            self.terminado.emit(False, None, [f"Error en operación sobre el padrón: {str(e)}"])
+        finally:
+            db.close()
+
 class FormularioProyecto(QWidget):
     """Wizard de 3 pasos para crear/editar proyectos con padrón dinámico"""
     proyecto_guardado = pyqtSignal()
@@ -28,12 +45,13 @@ class FormularioProyecto(QWidget):
         self.estructura_columnas = []
         self.uuid_padron = None
         self.nombre_tabla = None
+        self.thread_padron = None
         
-        # Cargar proyecto si estamos editando
+        self.setup_ui()
+        
+        # Cargar proyecto si estamos editando (después de crear los controles que llena)
         if proyecto_id:
             self.cargar_proyecto_existente()
-        
-        self.setup_ui()
     
     def setup_ui(self):
         """Configura el wizard de 3 pasos"""
@@ -123,9 +141,16 @@ class FormularioProyecto(QWidget):
         self.btn_cancelar.clicked.connect(self.cancelar)
         self.btn_cancelar.setStyleSheet(self.get_button_style("#ffabab"))
         
+        # Edición: guarda datos básicos y normalización sin recrear el padrón
+        self.btn_guardar_cambios = QPushButton("💾 Guardar Cambios")
+        self.btn_guardar_cambios.clicked.connect(self.guardar_cambios_proyecto)
+        self.btn_guardar_cambios.setStyleSheet(self.get_button_style("#99b898"))
+        self.btn_guardar_cambios.setVisible(bool(self.proyecto_id))
+        
         botones_layout.addWidget(self.btn_anterior)
         botones_layout.addStretch()
         botones_layout.addWidget(self.btn_cancelar)
+        botones_layout.addWidget(self.btn_guardar_cambios)
         botones_layout.addWidget(self.btn_siguiente)
         
         layout.addLayout(botones_layout)
@@ -451,9 +476,93 @@ class FormularioProyecto(QWidget):
         grupo_columnas.setLayout(layout_columnas)
         layout.addWidget(grupo_columnas)
         
+        # PARTICIONADO (padrones de millones de registros)
+        grupo_particion = QGroupBox("3. Particionado (opcional, para padrones muy grandes)")
+        grupo_particion.setFont(QFont("Jura", 11))
+        layout_particion = QHBoxLayout()
+        
+        self.combo_tipo_particion = QComboBox()
+        self.combo_tipo_particion.addItem("Sin particionar", None)
+        self.combo_tipo_particion.addItem("Hash (reparto uniforme)", 'hash')
+        self.combo_tipo_particion.addItem("Lista (por valores, ej. región)", 'lista')
+        self.combo_tipo_particion.currentIndexChanged.connect(self.on_tipo_particion_cambiado)
+        
+        self.combo_columna_particion = QComboBox()
+        self.combo_columna_particion.setToolTip("Columna que define la partición de cada registro")
+        
+        self.spin_particiones = QSpinBox()
+        self.spin_particiones.setRange(2, 256)
+        self.spin_particiones.setValue(8)
+        self.spin_particiones.setPrefix("Particiones: ")
+        
+        self.txt_grupos_particion = QLineEdit()
+        self.txt_grupos_particion.setPlaceholderText("norte=N1,N2; sur=S1,S2 (el resto va a 'otros')")
+        
+        layout_particion.addWidget(self.combo_tipo_particion)
+        layout_particion.addWidget(self.combo_columna_particion)
+        layout_particion.addWidget(self.spin_particiones)
+        layout_particion.addWidget(self.txt_grupos_particion, 1)
+        grupo_particion.setLayout(layout_particion)
+        layout.addWidget(grupo_particion)
+        self.on_tipo_particion_cambiado()
+        
+        # NORMALIZACIÓN DE CLAVES (cuenta / codigo_afiliado al hacer match)
+        from core.normalizacion_claves import REGLAS_NORMALIZACION, DESCRIPCION_REGLAS
+        grupo_normalizacion = QGroupBox("4. Normalización de claves para el match")
+        grupo_normalizacion.setFont(QFont("Jura", 11))
+        layout_normalizacion = QHBoxLayout()
+        
+        self.checks_normalizacion = {}
+        for regla in REGLAS_NORMALIZACION:
+            check = QCheckBox(DESCRIPCION_REGLAS[regla])
+            check.setChecked(regla == 'trim')
+            self.checks_normalizacion[regla] = check
+            layout_normalizacion.addWidget(check)
+        
+        grupo_normalizacion.setLayout(layout_normalizacion)
+        layout.addWidget(grupo_normalizacion)
+        
         widget.setLayout(layout)
         return widget
     
+    def on_tipo_particion_cambiado(self):
+        """Muestra solo los controles del tipo de partición elegido"""
+        tipo = self.combo_tipo_particion.currentData()
+        self.combo_columna_particion.setEnabled(tipo is not None)
+        self.spin_particiones.setVisible(tipo == 'hash')
+        self.txt_grupos_particion.setVisible(tipo == 'lista')
+    
+    def obtener_config_particion(self):
+        """Configuración de partición para crear_tabla_padron_dinamica (None = tabla normal)"""
+        tipo = self.combo_tipo_particion.currentData()
+        if not tipo:
+            return None
+        
+        config = {'tipo': tipo, 'columna': self.combo_columna_particion.currentData()}
+        if tipo == 'hash':
+            config['particiones'] = self.spin_particiones.value()
+            return config
+        
+        grupos = []
+        for definicion in self.txt_grupos_particion.text().split(';'):
+            if not definicion.strip():
+                continue
+            if '=' not in definicion:
+                raise ValueError(f"Grupo sin valores: '{definicion.strip()}' (formato nombre=valor1,valor2)")
+            nombre, valores = definicion.split('=', 1)
+            grupos.append({
+                'nombre': nombre.strip(),
+                'valores': [v.strip() for v in valores.split(',') if v.strip()]
+            })
+        if not grupos:
+            raise ValueError("Define al menos un grupo de valores para la partición por lista")
+        config['grupos'] = grupos
+        return config
+    
+    def obtener_reglas_normalizacion(self):
+        """Reglas marcadas, en el orden de aplicación"""
+        return [regla for regla, check in self.checks_normalizacion.items() if check.isChecked()]
+    
     def crear_paso3(self):
         """Paso 3: Carga inicial de datos"""
         widget = QWidget()
@@ -496,16 +605,16 @@ class FormularioProyecto(QWidget):
         lbl_subir_nuevo = QLabel("Seleccionar nuevo archivo CSV:")
         lbl_subir_nuevo.setFont(QFont("Jura", 10))
         
-        btn_seleccionar_nuevo = QPushButton("📂 Buscar Archivo CSV")
-        btn_seleccionar_nuevo.clicked.connect(self.seleccionar_nuevo_csv)
-        btn_seleccionar_nuevo.setStyleSheet(self.get_button_style("#ffdaab"))
+        self.btn_seleccionar_nuevo = QPushButton("📂 Buscar Archivo CSV")
+        self.btn_seleccionar_nuevo.clicked.connect(self.seleccionar_nuevo_csv)
+        self.btn_seleccionar_nuevo.setStyleSheet(self.get_button_style("#ffdaab"))
         
         self.lbl_nuevo_csv_info = QLabel("")
         self.lbl_nuevo_csv_info.setFont(QFont("Jura", 9))
         self.lbl_nuevo_csv_info.setStyleSheet("color: #28a745;")
         
         layout_nuevo_csv.addWidget(lbl_subir_nuevo)
-        layout_nuevo_csv.addWidget(btn_seleccionar_nuevo)
+        layout_nuevo_csv.addWidget(self.btn_seleccionar_nuevo)
         layout_nuevo_csv.addWidget(self.lbl_nuevo_csv_info)
         self.frame_nuevo_csv.setLayout(layout_nuevo_csv)
         
@@ -663,6 +772,12 @@ class FormularioProyecto(QWidget):
             self.mostrar_error(f"Columnas obligatorias faltantes: {', '.join(faltantes)}")
             return False
         
+        try:
+            self.obtener_config_particion()
+        except ValueError as e:
+            self.mostrar_error(f"Configuración de partición inválida: {e}")
+            return False
+        
         return True
     
     def mostrar_error(self, mensaje):
@@ -784,6 +899,13 @@ class FormularioProyecto(QWidget):
             
             # Tipo detectado
             item_tipo_det = QTableWidgetItem(columna['tipo_sugerido'])
+            if 'confianza' in columna:
+                detalle = f"Confianza: {columna['confianza'] * 100:.0f}% · longitud máx.: {columna['longitud_max']}"
+                if columna.get('tipo_alternativo'):
+                    detalle += f"\n⚠️ Casi todo es {columna['tipo_alternativo']}; atípicos: {', '.join(map(str, columna['atipicos']))}"
+                if columna.get('formato_fecha'):
+                    detalle += f"\nFormato: {columna['formato_fecha']}"
+                item_tipo_det.setToolTip(detalle)
             self.tabla_columnas.setItem(i, 2, item_tipo_det)
             
             # Tipo SQL (editable)
@@ -798,6 +920,14 @@ class FormularioProyecto(QWidget):
             ejemplos = columna['ejemplos'][:3] if columna['ejemplos'] else []
             item_ejemplo = QTableWidgetItem(", ".join(map(str, ejemplos))[:50])
             self.tabla_columnas.setItem(i, 5, item_ejemplo)
+        
+        # Columnas candidatas para particionar
+        self.combo_columna_particion.clear()
+        for columna in columnas:
+            self.combo_columna_particion.addItem(columna['nombre_limpio'], columna['nombre_limpio'])
+        indice_cuenta = self.combo_columna_particion.findData('cuenta')
+        if indice_cuenta >= 0:
+            self.combo_columna_particion.setCurrentIndex(indice_cuenta)
     
     def agregar_columna_manual(self):
         """Agrega una columna manualmente a la tabla"""
@@ -899,6 +1029,11 @@ class FormularioProyecto(QWidget):
         )
         
         if file_path:
+            # Edición: cambios de esquema del CSV y luego solo las diferencias contra el padrón
+            if self.proyecto and self.proyecto.tabla_padron:
+                self.ofrecer_evolucion_esquema(file_path)
+                return
+            
             # Validar que coincida con estructura
             if not self.validar_csv_con_estructura(file_path):
                 return
@@ -951,6 +1086,137 @@ class FormularioProyecto(QWidget):
             QMessageBox.critical(self, "Error", f"Error validando CSV: {str(e)}")
             return False
     
+    def ofrecer_evolucion_esquema(self, csv_path):
+        """Compara el CSV contra la tabla del padrón, ofrece los cambios aditivos y sigue con el delta.
+        Los ALTER (algunos reescriben la tabla) corren en segundo plano."""
+        db = SessionLocal()
+        try:
+            exito, cambios, incompatibles, avisos = PadronService(db).planificar_evolucion_esquema(
+                self.proyecto.tabla_padron, csv_path
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error validando CSV: {str(e)}")
+            return
+        finally:
+            db.close()
+        
+        if not exito:
+            QMessageBox.critical(self, "Error", "\n".join(avisos))
+            return
+        
+        if incompatibles:
+            QMessageBox.warning(
+                self, "Estructura Incompatible",
+                "El CSV no se puede cargar: estas columnas cambian a un tipo incompatible.\n\n" +
+                "\n".join(incompatible['mensaje'] for incompatible in incompatibles) +
+                "\n\nNo se aplicó ningún cambio al padrón."
+            )
+            return
+        
+        if not cambios:
+            if avisos:
+                QMessageBox.information(self, "Estructura del CSV", "\n".join(avisos))
+            self.aplicar_delta_padron(csv_path)
+            return
+        
+        detalle = []
+        for cambio in cambios:
+            if cambio['accion'] == 'agregar_columna':
+                detalle.append(f"➕ {cambio['columna']}: nueva columna {cambio['tipo_nuevo']}")
+            else:
+                detalle.append(f"↔️ {cambio['columna']}: {cambio['tipo_actual']} → {cambio['tipo_nuevo']}")
+            if not cambio['solo_catalogo']:
+                detalle[-1] += " (reescribe la tabla)"
+        
+        respuesta = QMessageBox.question(
+            self, "Cambios de Estructura",
+            "El CSV trae cambios respecto al padrón actual:\n\n" +
+            "\n".join(detalle + avisos) +
+            "\n\n¿Aplicar los cambios a la tabla del padrón?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if respuesta != QMessageBox.StandardButton.Yes:
+            return
+        
+        uuid_padron = self.proyecto.tabla_padron
+        self.lbl_nuevo_csv_info.setText("⏳ Aplicando cambios de estructura al padrón...")
+        self.iniciar_operacion_padron(
+            lambda servicio: servicio.aplicar_evolucion_esquema(uuid_padron, cambios),
+            lambda exito, aplicados, errores: self.evolucion_esquema_aplicada(csv_path, exito, aplicados, errores)
+        )
+    
+    def evolucion_esquema_aplicada(self, csv_path, exito, aplicados, errores):
+        if not exito:
+            self.lbl_nuevo_csv_info.setText("")
+            QMessageBox.critical(self, "Error", "\n".join(errores))
+            return
+        
+        QMessageBox.information(self, "Éxito", f"✅ {aplicados} cambios aplicados al padrón")
+        self.aplicar_delta_padron(csv_path)
+    
+    def iniciar_operacion_padron(self, operacion, al_terminar):
+        """Corre operacion(padron_service) en segundo plano; al_terminar(éxito, resultado, errores)"""
+        if self.thread_padron:
+            self.thread_padron.wait()  # La anterior ya emitió su resultado: solo falta que termine
+        self.btn_seleccionar_nuevo.setEnabled(False)
+        self.thread_padron = OperacionPadronThread(operacion)
+        self.thread_padron.terminado.connect(al_terminar)
+        self.thread_padron.finished.connect(lambda: self.btn_seleccionar_nuevo.setEnabled(True))
+        self.thread_padron.start()
+    
+    def aplicar_delta_padron(self, csv_path):
+        """Actualiza el padrón con las diferencias del CSV.
+        Primero una vista previa (sin aplicar); el resumen se confirma sin transacción abierta
+        y la aplicación corre en otro hilo con una comparación nueva."""
+        uuid_padron = self.proyecto.tabla_padron
+        self.lbl_nuevo_csv_info.setText("⏳ Comparando CSV contra el padrón...")
+        self.iniciar_operacion_padron(
+            lambda servicio: servicio.actualizar_padron_delta(
+                uuid_padron, csv_path, servicio.mapeo_desde_csv(csv_path), confirmar=lambda resumen: False
+            ),
+            lambda exito, resumen, errores: self.confirmar_delta_padron(csv_path, exito, resumen, errores)
+        )
+    
+    def confirmar_delta_padron(self, csv_path, exito, resumen, errores):
+        if not exito:
+            self.lbl_nuevo_csv_info.setText("")
+            QMessageBox.critical(self, "Error", "\n".join(errores))
+            return
+        
+        respuesta = QMessageBox.question(
+            self, "Actualizar Padrón",
+            "Diferencias del CSV contra el padrón actual:\n\n"
+            f"➕ Nuevos: {resumen['nuevos']:,}\n"
+            f"↔️ Actualizados: {resumen['actualizados']:,}\n"
+            f"✔️ Sin cambios: {resumen['sin_cambios']:,}\n"
+            f"🔁 Llaves repetidas en el CSV (gana la última): {resumen['duplicados']:,}\n"
+            f"🚫 Filas sin llave (se omiten): {resumen['sin_clave']:,}\n\n"
+            "¿Aplicar los cambios al padrón?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if respuesta != QMessageBox.StandardButton.Yes:
+            self.lbl_nuevo_csv_info.setText("Actualización cancelada; el padrón quedó sin cambios")
+            return
+        
+        uuid_padron = self.proyecto.tabla_padron
+        self.lbl_nuevo_csv_info.setText("⏳ Aplicando cambios al padrón...")
+        self.iniciar_operacion_padron(
+            lambda servicio: servicio.actualizar_padron_delta(
+                uuid_padron, csv_path, servicio.mapeo_desde_csv(csv_path)
+            ),
+            self.delta_padron_aplicado
+        )
+    
+    def delta_padron_aplicado(self, exito, resumen, errores):
+        if not exito:
+            self.lbl_nuevo_csv_info.setText("")
+            QMessageBox.critical(self, "Error", "\n".join(errores))
+            return
+        
+        mensaje = f"✅ Padrón actualizado: {resumen['nuevos']:,} nuevos, {resumen['actualizados']:,} actualizados"
+        self.lbl_nuevo_csv_info.setText(mensaje)
+        QMessageBox.information(self, "Éxito", mensaje)
+    
     def actualizar_preview_datos(self, csv_path=None):
         """Actualiza la previsualización de datos en la tabla"""
         if not csv_path:
@@ -1022,7 +1288,7 @@ class FormularioProyecto(QWidget):
     def ejecutar_creacion_proyecto(self):
         """Ejecuta la creación del proyecto paso a paso"""
         try:
-            db = SessionLocal()
+            db = SessionBulk()  # Creación y carga inicial del padrón: sin statement_timeout
             
             # PASO 1: Crear tabla de padrón dinámica
             self.progress_bar.setValue(10)
@@ -1036,7 +1302,7 @@ class FormularioProyecto(QWidget):
             
             # Crear tabla dinámica
             exito, uuid_padron, nombre_tabla, errores = padron_service.crear_tabla_padron_dinamica(
-                nombre_proyecto, self.estructura_columnas
+                nombre_proyecto, self.estructura_columnas, self.obtener_config_particion()
             )
             
             if not exito:
@@ -1091,9 +1357,13 @@ class FormularioProyecto(QWidget):
                 descripcion=self.txt_descripcion.toPlainText().strip(),
                 tabla_padron=uuid_padron,  # Guardamos el UUID
                 usuario=self.usuario,
-                logo=logo_path
+                logo=logo_path,
+                config_json={'normalizacion_claves': self.obtener_reglas_normalizacion()}
             )
             
+            # Índices funcionales para el match con claves normalizadas
+            self.crear_indices_normalizados(uuid_padron, self.obtener_reglas_normalizacion())
+            
             self.proyecto = proyecto
             
             self.progress_bar.setValue(100)
@@ -1144,6 +1414,11 @@ class FormularioProyecto(QWidget):
                     if proyecto.descripcion:
                         self.txt_descripcion.setText(proyecto.descripcion)
                     
+                    from core.normalizacion_claves import obtener_reglas
+                    reglas = obtener_reglas(proyecto.config_json)
+                    for regla, check in self.checks_normalizacion.items():
+                        check.setChecked(regla in reglas)
+                    
                     if proyecto.logo:
                         self.logo_path = proyecto.logo
                         pixmap = QPixmap(proyecto.logo)
@@ -1160,6 +1435,53 @@ class FormularioProyecto(QWidget):
         finally:
             db.close()
     
+    def guardar_cambios_proyecto(self):
+        """Modo edición: guarda nombre, descripción, logo y reglas de normalización.
+        Con reglas nuevas crea sus índices funcionales y descarta el caché de match de esa firma."""
+        from core.cache_match import invalidar_cache_match
+        from core.normalizacion_claves import firma_reglas
+        
+        if not self.validar_paso1():
+            return
+        
+        reglas = self.obtener_reglas_normalizacion()
+        db = SessionLocal()
+        try:
+            proyecto = ProjectService(db).actualizar_proyecto(self.proyecto_id, {
+                'nombre': self.txt_nombre.text().strip(),
+                'descripcion': self.txt_descripcion.toPlainText().strip(),
+                'logo': getattr(self, 'logo_path', None),
+                'config_json': {'normalizacion_claves': reglas},
+            }, self.usuario)
+            
+            if proyecto.tabla_padron:
+                invalidar_cache_match(db, proyecto.tabla_padron, firma_reglas(reglas))
+                db.commit()
+                self.crear_indices_normalizados(proyecto.tabla_padron, reglas)
+            
+            self.proyecto = proyecto
+            self.mostrar_exito("Cambios del proyecto guardados")
+            self.on_proyecto_creado_exito()
+            
+        except PermissionError as e:
+            db.rollback()
+            self.mostrar_error(str(e))
+        except Exception as e:
+            db.rollback()
+            self.mostrar_error(f"Error guardando cambios: {str(e)}")
+        finally:
+            db.close()
+    
+    def crear_indices_normalizados(self, uuid_padron, reglas):
+        """Índices de las reglas con sesión masiva (sin statement_timeout; CONCURRENTLY puede tardar)"""
+        db_bulk = SessionBulk()
+        try:
+            exito, errores = PadronService(db_bulk).crear_indices_normalizados(uuid_padron, reglas)
+            if not exito:
+                print(f"⚠️ {' '.join(errores)}")
+        finally:
+            db_bulk.close()
+    
     def resetear_csv_ui(self):
         """Resetea la UI de CSV"""
         self.lbl_csv_icono.setText("📁")
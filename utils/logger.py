@@ -1,4 +1,9 @@
+import atexit
+import datetime
 import logging
+import os
+import queue
+import threading
 from core.models import Bitacora
 
 # Configurar logging
@@ -13,23 +18,119 @@ logging.basicConfig(
 
 logger = logging.getLogger('correspondencia_app')
 
+
+# ===== ESCRITOR DE BITÁCORA EN SEGUNDO PLANO =====
+
+class EscritorAuditoria:
+    """Cola en memoria de eventos de bitácora, escrita por lotes en su propia conexión.
+
+    El lote se escribe al juntar AUDIT_BATCH_SIZE eventos o tras AUDIT_FLUSH_SECONDS,
+    lo que ocurra primero; al salir del proceso se escribe lo pendiente (atexit).
+    """
+
+    def __init__(self, tamano_lote: int, intervalo: float):
+        self.tamano_lote = max(1, tamano_lote)
+        self.intervalo = intervalo
+        self.cola = queue.Queue()
+        self.detenido = threading.Event()
+        self.lock_escritura = threading.Lock()
+        self.hilo = threading.Thread(target=self._bucle, name="escritor-auditoria", daemon=True)
+        self.hilo.start()
+
+    def encolar(self, evento: dict):
+        self.cola.put(evento)
+
+    def _bucle(self):
+        while not self.detenido.is_set():
+            lote = self._tomar_lote(bloquear=True)
+            if lote:
+                self._escribir(lote)
+
+    def _tomar_lote(self, bloquear: bool) -> list:
+        """Hasta tamano_lote eventos; espera como máximo el intervalo por el primero"""
+        lote = []
+        try:
+            if bloquear:
+                lote.append(self.cola.get(timeout=self.intervalo))
+            while len(lote) < self.tamano_lote:
+                lote.append(self.cola.get_nowait())
+        except queue.Empty:
+            pass
+        return lote
+
+    def _escribir(self, lote: list):
+        """Un INSERT de varias filas por lote (la sesión del llamador no interviene)"""
+        from config.database import get_engine
+
+        with self.lock_escritura:
+            try:
+                with get_engine().begin() as conexion:
+                    conexion.execute(Bitacora.__table__.insert(), lote)
+            except Exception as e:
+                logger.error(f"Error en auditoría: no se escribieron {len(lote)} eventos: {e}")
+
+    def vaciar(self):
+        """Escribe todo lo pendiente en el hilo actual"""
+        while True:
+            lote = self._tomar_lote(bloquear=False)
+            if not lote:
+                return
+            self._escribir(lote)
+
+    def detener(self, timeout: float = 10.0):
+        self.detenido.set()
+        self.hilo.join(timeout)
+        self.vaciar()
+
+
+_escritor = None
+_pid_escritor = None
+_lock_escritor = threading.Lock()
+
+
+def _obtener_escritor() -> EscritorAuditoria:
+    """Un escritor por proceso (los workers hijos no heredan el hilo del padre)"""
+    global _escritor, _pid_escritor
+    with _lock_escritor:
+        if _escritor is None or _pid_escritor != os.getpid():
+            from config.settings import settings
+            _escritor = EscritorAuditoria(settings.AUDIT_BATCH_SIZE, settings.AUDIT_FLUSH_SECONDS)
+            _pid_escritor = os.getpid()
+        return _escritor
+
+
+def vaciar_auditoria():
+    """Escritura durable de los eventos pendientes (cierre de sesión, fin de proceso)"""
+    if _escritor is not None and _pid_escritor == os.getpid():
+        _escritor.vaciar()
+
+
+@atexit.register
+def _detener_escritor():
+    if _escritor is not None and _pid_escritor == os.getpid():
+        _escritor.detener()
+
+
 def auditoria(db, usuario_id, accion, modulo, detalles=None, ip_address=None, user_agent=None):
-    """Registra evento en bitácora de base de datos"""
+    """Registra evento en bitácora de base de datos.
+
+    El evento se encola y lo escribe el escritor en segundo plano: no hace commit
+    en la sesión del llamador (db se conserva por compatibilidad).
+    """
     try:
-        registro = Bitacora(
-            usuario_id=usuario_id,
-            accion=accion,
-            modulo=modulo,
-            detalles=detalles,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
-        db.add(registro)
-        db.commit()
-        
+        _obtener_escritor().encolar({
+            'usuario_id': usuario_id,
+            'accion': accion,
+            'modulo': modulo,
+            'detalles': detalles,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            # Hora del evento, no la de escritura del lote
+            'fecha_evento': datetime.datetime.now(datetime.timezone.utc),
+        })
+
         # También log en archivo
         logger.info(f"AUDITORIA - {modulo}.{accion} - Usuario: {usuario_id}")
-        
+
     except Exception as e:
         logger.error(f"Error en auditoría: {e}")
-        db.rollback()
\ No newline at end of file
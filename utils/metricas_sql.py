@@ -0,0 +1,150 @@
+"""Métricas de SQL por sentencia y registro de consultas lentas.
+
+Los eventos before/after_cursor_execute de SQLAlchemy miden cada sentencia. Las
+sentencias se agrupan normalizadas (literales, listas IN / VALUES y nombres de
+tabla de padrón reemplazados) para que el SQL dinámico del padrón cuente como
+una sola entrada.
+
+Uso:
+    with medir_sql('procesar_csv') as medicion:
+        ...
+    # o como decorador: @medir_sql('procesar_csv')
+
+Al salir se registra el top settings.SQL_TOP_N por tiempo total. Las sentencias
+que superan settings.SQL_SLOW_MS se registran siempre (logger correspondencia_app.sql).
+Lo que se ejecuta con el cursor de psycopg2 directamente (COPY, execute_values)
+no pasa por estos eventos.
+"""
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List
+
+logger_sql = logging.getLogger('correspondencia_app.sql')
+
+_locales = threading.local()
+
+PATRONES_NORMALIZACION = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|%s"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\bpadron_completo_\w+", re.IGNORECASE), "padron_completo_*"),
+    (re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE), "IN (?...)"),
+    (re.compile(r"(\bVALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE), r"\1, ..."),
+    (re.compile(r"\s+"), " "),
+]
+
+
+@lru_cache(maxsize=4096)
+def normalizar_sentencia(sentencia: str) -> str:
+    """Forma canónica de la sentencia para agruparla"""
+    for patron, reemplazo in PATRONES_NORMALIZACION:
+        sentencia = patron.sub(reemplazo, sentencia)
+    return sentencia.strip()
+
+
+class MedicionSQL:
+    """Acumulado por sentencia normalizada durante un trabajo"""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.sentencias: Dict[str, Dict] = {}
+        self.inicio = time.perf_counter()
+
+    def registrar(self, sentencia: str, segundos: float, filas: int):
+        datos = self.sentencias.get(sentencia)
+        if datos is None:
+            datos = self.sentencias[sentencia] = {'llamadas': 0, 'total_s': 0.0, 'max_s': 0.0, 'filas': 0}
+        datos['llamadas'] += 1
+        datos['total_s'] += segundos
+        datos['max_s'] = max(datos['max_s'], segundos)
+        if filas > 0:
+            datos['filas'] += filas
+
+    @property
+    def total_s(self) -> float:
+        return sum(d['total_s'] for d in self.sentencias.values())
+
+    @property
+    def llamadas(self) -> int:
+        return sum(d['llamadas'] for d in self.sentencias.values())
+
+    def top(self, n: int = 10) -> List[Dict]:
+        """Sentencias con más tiempo total"""
+        ordenadas = sorted(self.sentencias.items(), key=lambda item: item[1]['total_s'], reverse=True)
+        return [{'sentencia': sentencia, **datos} for sentencia, datos in ordenadas[:n]]
+
+    def resumen(self, n: int = 10) -> str:
+        duracion = time.perf_counter() - self.inicio
+        lineas = [f"📊 SQL de '{self.nombre}': {self.llamadas} sentencias, "
+                  f"{self.total_s:.2f} s en base de datos de {duracion:.2f} s"]
+        for datos in self.top(n):
+            promedio_ms = datos['total_s'] / datos['llamadas'] * 1000
+            lineas.append(
+                f"  {datos['total_s']:8.3f} s  {datos['llamadas']:7d} x  {promedio_ms:8.2f} ms prom  "
+                f"{datos['max_s'] * 1000:8.1f} ms máx  {datos['filas']:9d} filas  {datos['sentencia'][:160]}"
+            )
+        return "\n".join(lineas)
+
+
+def _mediciones_activas() -> List[MedicionSQL]:
+    if not hasattr(_locales, 'mediciones'):
+        _locales.mediciones = []
+    return _locales.mediciones
+
+
+@contextmanager
+def medir_sql(nombre: str, top: int = None):
+    """Mide el SQL ejecutado en este hilo mientras dure el bloque"""
+    from config.settings import settings
+
+    medicion = MedicionSQL(nombre)
+    activas = _mediciones_activas()
+    activas.append(medicion)
+    try:
+        yield medicion
+    finally:
+        activas.remove(medicion)
+        if settings.SQL_METRICS_ENABLED and medicion.llamadas:
+            logger_sql.info(medicion.resumen(top or settings.SQL_TOP_N))
+
+
+def instalar_metricas_sql(engine, umbral_lento_ms: float):
+    """Registra los eventos de medición en el engine"""
+    from sqlalchemy import event
+
+    umbral_lento_s = umbral_lento_ms / 1000.0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('inicios_sql', []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get('inicios_sql')
+        if not inicios:
+            return
+        segundos = time.perf_counter() - inicios.pop()
+
+        activas = _mediciones_activas()
+        if not activas and segundos < umbral_lento_s:
+            return
+
+        sentencia = normalizar_sentencia(statement)
+        filas = cursor.rowcount if cursor.rowcount is not None else -1
+        for medicion in activas:
+            medicion.registrar(sentencia, segundos, filas)
+
+        if segundos >= umbral_lento_s:
+            logger_sql.warning(f"🐢 SQL lento ({segundos * 1000:.0f} ms, {filas} filas): {sentencia[:500]}")
+
+    @event.listens_for(engine, "handle_error")
+    def _error(contexto):
+        # La sentencia falló: descartar su inicio para no desfasar la pila
+        if contexto.connection is not None:
+            inicios = contexto.connection.info.get('inicios_sql')
+            if inicios:
+                inicios.pop()
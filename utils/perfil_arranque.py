@@ -0,0 +1,83 @@
+"""Reporte de tiempos de importación del arranque (estilo python -X importtime).
+
+Uso:
+    python main.py --perfil-arranque
+    python -m utils.perfil_arranque --modulo main --top 30
+
+Ejecuta la importación en un proceso nuevo (caché de módulos fría) y compara el
+total contra settings.STARTUP_BUDGET_MS. Sale con código 1 si se excede.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def medir_importaciones(modulo: str = 'main') -> Tuple[List[Dict], float]:
+    """Importa el módulo con -X importtime y regresa (módulos, total_ms)"""
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        cwd=RAIZ_PROYECTO, capture_output=True, text=True
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{resultado.stderr[-2000:]}")
+
+    modulos = []
+    for linea in resultado.stderr.splitlines():
+        # Formato: "import time: self [us] | cumulative | imported package"
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        try:
+            propio, acumulado, nombre = linea[len('import time:'):].split('|', 2)
+            modulos.append({
+                'modulo': nombre.strip(),
+                'nivel': (len(nombre) - len(nombre.lstrip())) // 2,
+                'propio_ms': int(propio) / 1000.0,
+                'acumulado_ms': int(acumulado) / 1000.0,
+            })
+        except ValueError:
+            continue
+
+    # El total es la suma de los módulos de primer nivel (su acumulado incluye a los hijos)
+    nivel_minimo = min((m['nivel'] for m in modulos), default=0)
+    total_ms = sum(m['acumulado_ms'] for m in modulos if m['nivel'] == nivel_minimo)
+    return modulos, total_ms
+
+
+def reporte_importaciones(modulo: str = 'main', top: int = 25, presupuesto_ms: float = None) -> int:
+    """Imprime los módulos más costosos y regresa 0/1 según el presupuesto"""
+    if presupuesto_ms is None:
+        from config.settings import settings
+        presupuesto_ms = settings.STARTUP_BUDGET_MS
+
+    modulos, total_ms = medir_importaciones(modulo)
+
+    print(f"⏱️  Importación de '{modulo}': {total_ms:.1f} ms (presupuesto {presupuesto_ms:.0f} ms)")
+    print(f"{'acumulado ms':>12} {'propio ms':>10}  módulo")
+    for m in sorted(modulos, key=lambda m: m['acumulado_ms'], reverse=True)[:top]:
+        print(f"{m['acumulado_ms']:>12.1f} {m['propio_ms']:>10.1f}  {'  ' * m['nivel']}{m['modulo']}")
+
+    pesados = [m['modulo'] for m in modulos
+               if m['modulo'].split('.')[0] in ('pandas', 'matplotlib', 'fitz', 'reportlab', 'numpy')
+               and m['modulo'].count('.') == 0]
+    if pesados:
+        print(f"⚠️ Módulos pesados cargados al arranque: {', '.join(pesados)}")
+
+    if total_ms > presupuesto_ms:
+        print(f"❌ Arranque fuera de presupuesto por {total_ms - presupuesto_ms:.1f} ms")
+        return 1
+    print("✅ Arranque dentro del presupuesto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.append(RAIZ_PROYECTO)
+    parser = argparse.ArgumentParser(description="Reporte de tiempos de importación")
+    parser.add_argument('--modulo', default='main')
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--presupuesto-ms', type=float, default=None)
+    args = parser.parse_args()
+    sys.exit(reporte_importaciones(args.modulo, args.top, args.presupuesto_ms))
@@ -1,5 +1,6 @@
 import bcrypt
 import re
+from typing import List, Optional
 
 def validar_fortaleza_password(password):
     """
@@ -19,11 +20,45 @@ def validar_fortaleza_password(password):
     
     return True, "Contraseña válida"
 
-def generar_hash_password(password):
-    """Genera hash seguro de contraseña"""
-    salt = bcrypt.gensalt(rounds=12)
+def _rondas_configuradas() -> int:
+    from config.settings import settings
+    return settings.BCRYPT_ROUNDS
+
+def generar_hash_password(password, rondas: Optional[int] = None):
+    """Genera hash seguro de contraseña (costo de settings.BCRYPT_ROUNDS)"""
+    salt = bcrypt.gensalt(rounds=rondas or _rondas_configuradas())
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 def verificar_password(password, password_hash):
     """Verifica si la contraseña coincide con el hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
\ No newline at end of file
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except Exception:
+        return False
+
+def rondas_hash(password_hash) -> Optional[int]:
+    """Costo con el que se generó un hash bcrypt ($2b$12$...)"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def requiere_rehash(password_hash) -> bool:
+    """True si el hash se generó con un costo distinto al configurado"""
+    return rondas_hash(password_hash) != _rondas_configuradas()
+
+def generar_hashes_password(passwords: List[str], procesos: Optional[int] = None) -> List[str]:
+    """Hashes de muchas contraseñas en paralelo (importaciones masivas de usuarios).
+
+    bcrypt es CPU puro: un pool de procesos escala con los núcleos. Para pocas
+    contraseñas no compensa arrancar el pool.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+
+    rondas = _rondas_configuradas()
+    if len(passwords) < 4:
+        return [generar_hash_password(p, rondas) for p in passwords]
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return list(pool.map(partial(generar_hash_password, rondas=rondas), passwords, chunksize=8))
@@ -0,0 +1,120 @@
+"""Worker sin interfaz que procesa la cola de trabajos (cola_trabajos).
+
+Uso:
+    python worker.py                 # un proceso
+    python worker.py --workers 4     # cuatro procesos drenando la cola en paralelo
+    python worker.py --tipos emision archivo
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import time
+import traceback
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.cola_trabajos_service import TIPOS_TRABAJO
+
+
+def bucle_worker(worker_id: str, tipos=None, intervalo: float = 2.0, una_vez: bool = False):
+    """Reclama y ejecuta trabajos hasta que se detenga el proceso"""
+    from config.database import SessionLocal, SessionBulk, configurar_engine, engine_bulk
+    from core.cola_trabajos_service import ColaTrabajosService, LatidoTrabajo
+    from core.ejecutor_trabajos import EjecutorTrabajos
+    from utils.logger import logger
+
+    # Cada proceso abre sus propias conexiones (no compartir el pool heredado) y aplica
+    # las opciones de pool guardadas en el panel (vigentes hasta reiniciar el worker)
+    configurar_engine().dispose()
+    engine_bulk.dispose()
+
+    ultima_recuperacion = 0.0
+    print(f"🚀 Worker {worker_id} iniciado")
+
+    while True:
+        db_cola = SessionLocal()
+        db_trabajo = SessionBulk()  # Perfil masivo: no compite con el pool interactivo
+        try:
+            cola = ColaTrabajosService(db_cola)
+
+            if time.monotonic() - ultima_recuperacion > 60:
+                recuperados = cola.recuperar_trabajos_abandonados()
+                if recuperados:
+                    logger.info(f"Worker {worker_id}: {recuperados} trabajos recuperados")
+                ultima_recuperacion = time.monotonic()
+
+            trabajo = cola.reclamar_trabajo(worker_id, tipos)
+            if not trabajo:
+                if una_vez:
+                    return
+                time.sleep(intervalo)
+                continue
+
+            print(f"📝 Worker {worker_id}: trabajo {trabajo.id} ({trabajo.tipo})")
+            try:
+                with LatidoTrabajo(trabajo.id, worker_id):
+                    resultado = EjecutorTrabajos(db_trabajo).ejecutar(
+                        trabajo,
+                        reportar=lambda porcentaje, mensaje: cola.actualizar_progreso(trabajo.id, porcentaje, mensaje)
+                    )
+                if resultado.get('estado') == 'error':
+                    errores = resultado.get('errores') or [resultado.get('mensaje', 'Error')]
+                    cola.fallar(trabajo.id, "; ".join(str(e) for e in errores[:3]))
+                else:
+                    cola.completar(trabajo.id, resultado, resultado.get('estado', 'completado'))
+                print(f"✅ Worker {worker_id}: trabajo {trabajo.id} -> {resultado.get('estado')}")
+            except Exception as e:
+                db_trabajo.rollback()
+                traceback.print_exc()
+                cola.fallar(trabajo.id, f"Error inesperado: {str(e)}")
+                print(f"❌ Worker {worker_id}: trabajo {trabajo.id} falló: {e}")
+
+        except KeyboardInterrupt:
+            return
+        except Exception as e:
+            # Sin conexión a BD u otro error de infraestructura: esperar y reintentar
+            print(f"⚠️ Worker {worker_id}: {e}")
+            time.sleep(intervalo)
+        finally:
+            db_trabajo.close()
+            db_cola.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de la cola de trabajos")
+    parser.add_argument('--workers', type=int, default=1, help="Número de procesos worker")
+    parser.add_argument('--tipos', nargs='*', choices=TIPOS_TRABAJO, help="Tipos de trabajo a atender")
+    parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos de espera cuando no hay trabajos")
+    parser.add_argument('--una-vez', action='store_true', help="Terminar cuando la cola quede vacía")
+    args = parser.parse_args()
+
+    base_id = f"{socket.gethostname()}-{os.getpid()}"
+
+    if args.workers <= 1:
+        bucle_worker(f"{base_id}-0", args.tipos, args.intervalo, args.una_vez)
+        return
+
+    procesos = []
+    for i in range(args.workers):
+        proceso = multiprocessing.Process(
+            target=bucle_worker,
+            args=(f"{base_id}-{i}", args.tipos, args.intervalo, args.una_vez),
+            daemon=False
+        )
+        proceso.start()
+        procesos.append(proceso)
+
+    try:
+        for proceso in procesos:
+            proceso.join()
+    except KeyboardInterrupt:
+        print("🛑 Deteniendo workers...")
+        for proceso in procesos:
+            proceso.terminate()
+            proceso.join()
+
+
+if __name__ == "__main__":
+    main()